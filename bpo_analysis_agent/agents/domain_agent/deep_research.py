@@ -8,6 +8,7 @@ from google.adk.agents import BaseAgent, LlmAgent, LoopAgent, SequentialAgent
 from google.adk.events import Event, EventActions
 # from google.adk.tools import google_search
 from shared.tools.web_search_tool import duckduckgo_search
+from shared.genai_client import adk_model
 from google.adk import Runner
 from google.adk.sessions import InMemorySessionService
 from google.genai import types as genai_types
@@ -34,7 +35,7 @@ class Feedback(BaseModel):
 
 # 1. Plan Generator (Simplified for HR Context)
 plan_generator = LlmAgent(
-    model=config.worker_model,
+    model=adk_model(config.worker_model),
     name="plan_generator",
     description="Genera un plan de investigación para una empresa específica.",
     instruction="""
@@ -55,7 +56,7 @@ plan_generator = LlmAgent(
 
 # 2. Researcher (Executes the plan)
 section_researcher = LlmAgent(
-    model=config.worker_model,
+    model=adk_model(config.worker_model),
     name="section_researcher",
     description="Ejecuta el plan de investigación.",
     instruction="""
@@ -78,7 +79,7 @@ section_researcher = LlmAgent(
 
 # 3. Evaluator (Checks quality)
 research_evaluator = LlmAgent(
-    model=config.critic_model,
+    model=adk_model(config.critic_model),
     name="research_evaluator",
     description="Evalúa la calidad de la investigación.",
     instruction="""
@@ -105,7 +106,7 @@ class EscalationChecker(BaseAgent):
 
 # 5. Enhanced Searcher (Fixes gaps)
 enhanced_search_executor = LlmAgent(
-    model=config.worker_model,
+    model=adk_model(config.worker_model),
     name="enhanced_search_executor",
     instruction="""
     Eres un Investigador de Profundidad.
@@ -0,0 +1,361 @@
+import os
+import sqlite3
+import json
+import hashlib
+import threading
+import time
+
+# Lives next to hr_agent_data.db (both paths are relative to the working dir)
+DEFAULT_CACHE_PATH = "search_cache.db"
+DEFAULT_LLM_CACHE_PATH = "llm_cache.db"
+
+# TTL (seconds) per query family. News goes stale quickly, market rankings barely move.
+DEFAULT_TTLS = {
+    "news": 6 * 3600,
+    "profile": 24 * 3600,
+    "discovery": 7 * 24 * 3600,
+}
+
+# TTL (seconds) per LLM caller. Keys are content-addressed, so classification answers stay
+# valid as long as the snippets are identical; reports and leader lists age with the market.
+DEFAULT_LLM_TTLS = {
+    "classification": 7 * 24 * 3600,
+    "leader_detection": 24 * 3600,
+    "report": 24 * 3600,
+}
+DEFAULT_LLM_TTL = 24 * 3600
+DEFAULT_LLM_MAX_BYTES = 50 * 1024 * 1024
+
+NEWS_KEYWORDS = ("noticias", "lanzamiento", "nuevo servicio", "nueva funcionalidad", "adquisición", "fusión")
+DISCOVERY_KEYWORDS = ("ranking", "startups", "principales empresas")
+
+
+def normalize_query(query):
+    """
+    Lowercases and collapses whitespace so trivially different queries share a cache entry.
+    """
+    return " ".join(str(query).lower().split())
+
+
+def classify_query(query):
+    """
+    Maps a search query to its TTL family: discovery, news or profile.
+    """
+    q = normalize_query(query)
+    if any(k in q for k in DISCOVERY_KEYWORDS):
+        return "discovery"
+    if any(k in q for k in NEWS_KEYWORDS):
+        return "news"
+    return "profile"
+
+
+class SearchCache:
+    """
+    On-disk cache for grounded search results.
+    Entries are keyed by (normalized query, num_results, model), expire per query family
+    and are evicted least-recently-used once the cache exceeds `max_entries`.
+    """
+    def __init__(self, db_path=DEFAULT_CACHE_PATH, max_entries=2000, ttls=None, enabled=True):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+        if self.enabled:
+            self._init_db()
+
+    def _get_connection(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _init_db(self):
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS search_cache (
+                cache_key TEXT PRIMARY KEY,
+                query TEXT,
+                family TEXT,
+                results_json TEXT,
+                created_at REAL,
+                expires_at REAL,
+                last_access REAL
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_search_cache_access ON search_cache (last_access)")
+        conn.commit()
+        conn.close()
+
+    def _count(self, stat, n=1):
+        with self._lock:
+            self._stats[stat] += n
+
+    @staticmethod
+    def make_key(query, num_results, model):
+        raw = json.dumps([normalize_query(query), int(num_results), model])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, query, num_results, model, record_stats=True):
+        """
+        Returns the cached result list, or None on a miss or an expired entry.
+        `record_stats=False` is for internal re-checks that should not skew the hit/miss counters.
+        """
+        if not self.enabled:
+            return None
+
+        key = self.make_key(query, num_results, model)
+        now = time.time()
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT results_json, expires_at FROM search_cache WHERE cache_key = ?", (key,))
+        row = cursor.fetchone()
+
+        if row and row[1] > now:
+            cursor.execute("UPDATE search_cache SET last_access = ? WHERE cache_key = ?", (now, key))
+            conn.commit()
+            conn.close()
+            if record_stats:
+                self._count("hits")
+            return json.loads(row[0])
+
+        if row:
+            cursor.execute("DELETE FROM search_cache WHERE cache_key = ?", (key,))
+            conn.commit()
+            self._count("expired")
+        conn.close()
+        if record_stats:
+            self._count("misses")
+        return None
+
+    def set(self, query, num_results, model, results):
+        if not self.enabled:
+            return
+
+        key = self.make_key(query, num_results, model)
+        family = classify_query(query)
+        now = time.time()
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO search_cache (cache_key, query, family, results_json, created_at, expires_at, last_access)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(cache_key) DO UPDATE SET
+                results_json=excluded.results_json, created_at=excluded.created_at,
+                expires_at=excluded.expires_at, last_access=excluded.last_access
+        """, (key, normalize_query(query), family, json.dumps(results, ensure_ascii=False), now, now + self.ttls[family], now))
+
+        # LRU eviction once over capacity
+        cursor.execute("SELECT COUNT(*) FROM search_cache")
+        overflow = cursor.fetchone()[0] - self.max_entries
+        if overflow > 0:
+            cursor.execute("""
+                DELETE FROM search_cache WHERE cache_key IN (
+                    SELECT cache_key FROM search_cache ORDER BY last_access ASC LIMIT ?
+                )
+            """, (overflow,))
+            self._count("evictions", overflow)
+        conn.commit()
+        conn.close()
+
+    def clear(self):
+        if not self.enabled:
+            return
+        conn = self._get_connection()
+        conn.execute("DELETE FROM search_cache")
+        conn.commit()
+        conn.close()
+
+    def stats(self):
+        """
+        Returns hit/miss/eviction counters for this process plus the current entry count.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["size"] = 0
+        if self.enabled:
+            conn = self._get_connection()
+            stats["size"] = conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+            conn.close()
+        return stats
+
+
+class LLMResponseCache:
+    """
+    On-disk cache for LLM responses, content-addressed by hash of (model, prompt, generation config).
+    Entries expire per caller (see DEFAULT_LLM_TTLS) and the least-recently-used ones are
+    evicted once the stored text exceeds `max_bytes`. Callers listed in `bypass`
+    (LLM_CACHE_BYPASS, comma-separated) neither read nor write the cache.
+    """
+    def __init__(self, db_path=DEFAULT_LLM_CACHE_PATH, max_bytes=DEFAULT_LLM_MAX_BYTES, ttls=None, enabled=True, bypass=None):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.ttls = {**DEFAULT_LLM_TTLS, **(ttls or {})}
+        self.enabled = enabled
+        self.bypass = set(bypass or [])
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "bypassed": 0, "rejected": 0}
+        if self.enabled:
+            self._init_db()
+
+    def _get_connection(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _init_db(self):
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                cache_key TEXT PRIMARY KEY,
+                model TEXT,
+                caller TEXT,
+                response_text TEXT,
+                size_bytes INTEGER,
+                created_at REAL,
+                expires_at REAL,
+                last_access REAL
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache (last_access)")
+        conn.commit()
+        conn.close()
+
+    def _count(self, stat, n=1):
+        with self._lock:
+            self._stats[stat] += n
+
+    @staticmethod
+    def make_key(model, prompt, config=None):
+        raw = json.dumps([model, prompt, _config_fingerprint(config)], ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def active_for(self, caller):
+        """
+        False when the cache is disabled or `caller` bypasses it (counted as bypassed).
+        """
+        if not self.enabled:
+            return False
+        if caller in self.bypass:
+            self._count("bypassed")
+            return False
+        return True
+
+    def get(self, model, prompt, config=None):
+        """
+        Returns the cached response text, or None on a miss or an expired entry.
+        """
+        key = self.make_key(model, prompt, config)
+        now = time.time()
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT response_text, expires_at FROM llm_cache WHERE cache_key = ?", (key,))
+        row = cursor.fetchone()
+
+        if row and row[1] > now:
+            cursor.execute("UPDATE llm_cache SET last_access = ? WHERE cache_key = ?", (now, key))
+            conn.commit()
+            conn.close()
+            self._count("hits")
+            return row[0]
+
+        if row:
+            cursor.execute("DELETE FROM llm_cache WHERE cache_key = ?", (key,))
+            conn.commit()
+            self._count("expired")
+        conn.close()
+        self._count("misses")
+        return None
+
+    def set(self, model, prompt, text, config=None, caller="default"):
+        key = self.make_key(model, prompt, config)
+        size = len(text.encode("utf-8"))
+        now = time.time()
+        ttl = self.ttls.get(caller, DEFAULT_LLM_TTL)
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO llm_cache (cache_key, model, caller, response_text, size_bytes, created_at, expires_at, last_access)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(cache_key) DO UPDATE SET
+                response_text=excluded.response_text, size_bytes=excluded.size_bytes,
+                created_at=excluded.created_at, expires_at=excluded.expires_at, last_access=excluded.last_access
+        """, (key, model, caller, text, size, now, now + ttl, now))
+
+        # LRU eviction once the stored text exceeds max_bytes
+        total = cursor.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM llm_cache").fetchone()[0]
+        if total > self.max_bytes:
+            victims, freed = [], 0
+            for victim_key, victim_size in cursor.execute("SELECT cache_key, size_bytes FROM llm_cache ORDER BY last_access ASC").fetchall():
+                if freed >= total - self.max_bytes:
+                    break
+                victims.append((victim_key,))
+                freed += victim_size
+            cursor.executemany("DELETE FROM llm_cache WHERE cache_key = ?", victims)
+            self._count("evictions", len(victims))
+        conn.commit()
+        conn.close()
+
+    def delete(self, model, prompt, config=None):
+        """
+        Drops a cached answer its caller rejected (counted as rejected), so the next request
+        goes to the model instead of replaying it.
+        """
+        conn = self._get_connection()
+        conn.execute("DELETE FROM llm_cache WHERE cache_key = ?", (self.make_key(model, prompt, config),))
+        conn.commit()
+        conn.close()
+        self._count("rejected")
+
+    def clear(self):
+        if not self.enabled:
+            return
+        conn = self._get_connection()
+        conn.execute("DELETE FROM llm_cache")
+        conn.commit()
+        conn.close()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["size"], stats["bytes"] = 0, 0
+        if self.enabled:
+            conn = self._get_connection()
+            stats["size"], stats["bytes"] = conn.execute("SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM llm_cache").fetchone()
+            conn.close()
+        return stats
+
+
+def _config_fingerprint(config):
+    if config is None:
+        return None
+    try:
+        return config.model_dump(mode="json", exclude_none=True)
+    except Exception:
+        # Pydantic classes as response_schema do not serialize; key on their JSON schema instead
+        schema = getattr(config, "response_schema", None)
+        if hasattr(schema, "model_json_schema"):
+            return [repr(config), schema.model_json_schema()]
+        return repr(config)
+
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+def get_llm_cache():
+    """
+    Process-wide LLMResponseCache configured from LLM_CACHE_ENABLED, LLM_CACHE_MAX_BYTES
+    and LLM_CACHE_BYPASS.
+    """
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            bypass = [c.strip() for c in os.getenv("LLM_CACHE_BYPASS", "").split(",") if c.strip()]
+            _llm_cache = LLMResponseCache(
+                max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", str(DEFAULT_LLM_MAX_BYTES))),
+                enabled=os.getenv("LLM_CACHE_ENABLED", "1") == "1",
+                bypass=bypass,
+            )
+        return _llm_cache
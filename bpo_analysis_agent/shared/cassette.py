@@ -0,0 +1,346 @@
+import io
+import os
+import re
+import csv
+import json
+import time
+import asyncio
+import hashlib
+import threading
+
+# GENAI_CASSETTE_MODE: off | record | replay
+#   record: real calls go out and every response is appended to the cassette file
+#   replay: answers come from the cassette only; no client is built and no network is used
+# GENAI_CASSETTE_LATENCY: "recorded" (replay the measured latency) or fixed seconds per call
+# GENAI_CASSETTE_LATENCY_SCALE: multiplier applied to the injected latency
+DEFAULT_CASSETTE_PATH = "cassettes/genai.jsonl"
+MODES = ("off", "record", "replay")
+
+# Request text that changes between the recording and the replay without changing what is
+# asked: dates (the report date of the CODI prompt) and table columns computed from the
+# local score history. Dates are masked and those columns removed before hashing.
+DATE_RE = re.compile(r"\b(?:\d{1,2}[-/]\d{1,2}[-/]\d{4}|\d{4}-\d{2}-\d{2})\b")
+VOLATILE_COLUMNS = ("Tendencia_Polaridad",)
+MASK = "<volátil>"
+
+
+class CassetteMissError(Exception):
+    """
+    Raised in replay mode when a request was never recorded.
+    """
+
+
+def _strip_ids(value):
+    # ADK assigns random ids to function calls/responses; they must not change the key
+    if isinstance(value, dict):
+        return {k: _strip_ids(v) for k, v in value.items() if k != "id"}
+    if isinstance(value, list):
+        return [_strip_ids(v) for v in value]
+    return value
+
+
+def _drop_cell(line, index, markdown):
+    # The line without its cell at `index`, or None when it has no such cell (end of table)
+    if markdown:
+        cells = line.split("|")
+        if len(cells) <= index + 2:
+            return None
+        return "|".join(cells[:index + 1] + cells[index + 2:])
+    cells = next(csv.reader([line]), [])
+    if len(cells) <= index:
+        return None
+    out = io.StringIO()
+    csv.writer(out, lineterminator="").writerow(cells[:index] + cells[index + 1:])
+    return out.getvalue()
+
+
+def _drop_columns(text):
+    """
+    Removes VOLATILE_COLUMNS (header, cells and legend line) from CSV or markdown tables.
+    The column disappears entirely because the table omits it when it is empty.
+    """
+    lines = []
+    column = None
+    for line in text.split("\n"):
+        stripped = line.strip()
+        if not stripped:
+            column = None
+        elif any(stripped.startswith(f"{name}:") for name in VOLATILE_COLUMNS):
+            continue
+        elif column is not None:
+            dropped = _drop_cell(stripped, *column)
+            if dropped is not None:
+                line = dropped
+            else:
+                column = None
+        else:
+            markdown = stripped.startswith("|")
+            header = [c.strip() for c in (stripped.strip("|").split("|") if markdown else next(csv.reader([stripped]), []))]
+            names = [name for name in VOLATILE_COLUMNS if name in header]
+            if names:
+                column = (header.index(names[0]), markdown)
+                line = _drop_cell(stripped, *column)
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def mask_volatile(value):
+    """
+    `value` (dumped request contents) with the volatile text masked in every string.
+    """
+    if isinstance(value, str):
+        return _drop_columns(DATE_RE.sub(MASK, value))
+    if isinstance(value, dict):
+        return {k: mask_volatile(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [mask_volatile(v) for v in value]
+    return value
+
+
+def _dump(value):
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True)
+    if isinstance(value, (list, tuple)):
+        return [_dump(v) for v in value]
+    return value
+
+
+class Cassette:
+    """
+    JSON Lines file of recorded model interactions, one per line:
+    {"key", "kind", "model", "request", "latency", "response"}.
+    Requests are keyed by a hash of (model, contents, config), with dates and history-derived
+    columns masked (see mask_volatile). Repeated identical requests
+    replay their recordings in order and then keep returning the last one, so a replayed
+    run is deterministic regardless of thread or task scheduling.
+    """
+    def __init__(self, path=DEFAULT_CASSETTE_PATH, mode="replay", latency="recorded", latency_scale=1.0):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode '{mode}' (expected one of {MODES})")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._cursor = {}
+        self._stats = {"recorded": 0, "replayed": 0, "misses": 0}
+        if mode == "replay":
+            self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"Cassette not found: {self.path}")
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries.setdefault(entry["key"], []).append(entry)
+        print(f"[Cassette] Replaying {sum(len(v) for v in self._entries.values())} interactions from {self.path}")
+
+    @staticmethod
+    def make_key(kind, model, contents, config=None):
+        config = _dump(config)
+        if isinstance(config, dict):
+            # Transport options (the per-attempt HTTP timeout) do not change the answer
+            config.pop("http_options", None)
+            config = config or None
+        contents = mask_volatile(_dump(contents))
+        payload = _strip_ids({"kind": kind, "model": model, "contents": contents, "config": config})
+        raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def record(self, key, kind, model, contents, response, latency):
+        entry = {
+            "key": key,
+            "kind": kind,
+            "model": model,
+            "request": str(contents)[:200],
+            "latency": round(latency, 3),
+            "response": response,
+        }
+        line = json.dumps(entry, ensure_ascii=False, default=str)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self._stats["recorded"] += 1
+
+    def replay(self, key):
+        """
+        Returns (response, delay) for the next recording of `key`.
+        """
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self._stats["misses"] += 1
+                raise CassetteMissError(f"No recorded interaction for key {key[:12]} in {self.path}")
+            index = self._cursor.get(key, 0)
+            self._cursor[key] = index + 1
+            self._stats["replayed"] += 1
+        entry = entries[min(index, len(entries) - 1)]
+        return entry["response"], self._delay(entry)
+
+    def _delay(self, entry):
+        base = entry.get("latency", 0.0) if self.latency == "recorded" else float(self.latency)
+        return max(0.0, base * self.latency_scale)
+
+    def stats(self):
+        with self._lock:
+            return {"mode": self.mode, "path": self.path, **self._stats}
+
+
+# --- genai.Client proxy (WebSearchTool, SentimentTool, duckduckgo_search) ---
+
+class _CassetteModels:
+    def __init__(self, models, cassette):
+        self._models = models
+        self._cassette = cassette
+
+    def generate_content(self, *, model, contents, config=None, **kwargs):
+        from google.genai import types
+        key = Cassette.make_key("generate_content", model, contents, config)
+        if self._cassette.mode == "replay":
+            response, delay = self._cassette.replay(key)
+            time.sleep(delay)
+            return types.GenerateContentResponse.model_validate(response)
+        start = time.monotonic()
+        response = self._models.generate_content(model=model, contents=contents, config=config, **kwargs)
+        self._cassette.record(key, "generate_content", model, contents, _dump(response), time.monotonic() - start)
+        return response
+
+    def generate_content_stream(self, *, model, contents, config=None, **kwargs):
+        from google.genai import types
+        key = Cassette.make_key("generate_content_stream", model, contents, config)
+        if self._cassette.mode == "replay":
+            responses, delay = self._cassette.replay(key)
+            # The recorded latency is spread evenly over the chunks
+            for response in responses:
+                time.sleep(delay / max(1, len(responses)))
+                yield types.GenerateContentResponse.model_validate(response)
+            return
+        start = time.monotonic()
+        recorded = []
+        for response in self._models.generate_content_stream(model=model, contents=contents, config=config, **kwargs):
+            recorded.append(_dump(response))
+            yield response
+        self._cassette.record(key, "generate_content_stream", model, contents, recorded, time.monotonic() - start)
+
+
+class _AsyncCassetteModels:
+    def __init__(self, models, cassette):
+        self._models = models
+        self._cassette = cassette
+
+    async def generate_content(self, *, model, contents, config=None, **kwargs):
+        from google.genai import types
+        # Same key as the sync path: a recording from either path replays in both
+        key = Cassette.make_key("generate_content", model, contents, config)
+        if self._cassette.mode == "replay":
+            response, delay = self._cassette.replay(key)
+            await asyncio.sleep(delay)
+            return types.GenerateContentResponse.model_validate(response)
+        start = time.monotonic()
+        response = await self._models.generate_content(model=model, contents=contents, config=config, **kwargs)
+        self._cassette.record(key, "generate_content", model, contents, _dump(response), time.monotonic() - start)
+        return response
+
+
+class _AsyncCassetteClient:
+    def __init__(self, aio, cassette):
+        self.models = _AsyncCassetteModels(aio.models if aio is not None else None, cassette)
+
+
+class CassetteClient:
+    """
+    Stands in for genai.Client: `models.generate_content` and `aio.models.generate_content`
+    record through `client` or replay from the cassette (`client` is None in replay mode).
+    """
+    def __init__(self, client, cassette):
+        self._client = client
+        self.models = _CassetteModels(client.models if client is not None else None, cassette)
+        self.aio = _AsyncCassetteClient(client.aio if client is not None else None, cassette)
+
+
+# --- ADK model (chat agent, deep research) ---
+_gemini_class = None
+
+def cassette_gemini(model_name, **kwargs):
+    """
+    ADK Gemini model whose calls go through the active cassette. ADK builds its own client,
+    so the cassette wraps `generate_content_async` and stores the LlmResponse objects.
+    """
+    global _gemini_class
+    if _gemini_class is None:
+        _gemini_class = _build_gemini_class()
+    return _gemini_class(model=model_name, **kwargs)
+
+
+def _build_gemini_class():
+    from google.adk.models import Gemini
+    from google.adk.models.llm_response import LlmResponse
+
+    class CassetteGemini(Gemini):
+        async def generate_content_async(self, llm_request, stream=False):
+            cassette = get_cassette()
+            if cassette is None:
+                async for llm_response in super().generate_content_async(llm_request, stream):
+                    yield llm_response
+                return
+
+            # Keyed before ADK adds tracking headers to the request
+            config = llm_request.config.model_copy(update={"http_options": None}) if llm_request.config else None
+            model = llm_request.model or self.model
+            key = Cassette.make_key("adk", model, llm_request.contents, config)
+            if cassette.mode == "replay":
+                responses, delay = cassette.replay(key)
+                await asyncio.sleep(delay)
+                for response in responses:
+                    yield LlmResponse.model_validate(response)
+                return
+
+            start = time.monotonic()
+            recorded = []
+            async for llm_response in super().generate_content_async(llm_request, stream):
+                recorded.append(_dump(llm_response))
+                yield llm_response
+            cassette.record(key, "adk", model, llm_request.contents[-1:], recorded, time.monotonic() - start)
+
+    return CassetteGemini
+
+
+# --- Process-wide cassette ---
+_cassette = None
+_configured = False
+_lock = threading.RLock()
+
+def configure_cassette(mode=None, path=None, latency=None, latency_scale=None):
+    """
+    Activates a cassette for this process (defaults come from the GENAI_CASSETTE_* env vars).
+    Must run before tools and agents are built, since they capture their clients at init.
+    """
+    global _cassette, _configured
+    mode = mode or os.getenv("GENAI_CASSETTE_MODE", "off")
+    with _lock:
+        _configured = True
+        if mode == "off":
+            _cassette = None
+            return None
+        _cassette = Cassette(
+            path=path or os.getenv("GENAI_CASSETTE_PATH", DEFAULT_CASSETTE_PATH),
+            mode=mode,
+            latency=latency if latency is not None else os.getenv("GENAI_CASSETTE_LATENCY", "recorded"),
+            latency_scale=latency_scale if latency_scale is not None else float(os.getenv("GENAI_CASSETTE_LATENCY_SCALE", "1.0")),
+        )
+        print(f"[Cassette] Mode '{mode}' using {_cassette.path}")
+        return _cassette
+
+def get_cassette():
+    with _lock:
+        if not _configured:
+            configure_cassette()
+        return _cassette
+
+def get_cassette_metrics():
+    cassette = get_cassette()
+    return cassette.stats() if cassette else {"mode": "off"}
@@ -0,0 +1,104 @@
+import os
+import asyncio
+import threading
+
+from shared.cassette import get_cassette, CassetteClient, cassette_gemini
+
+# Connection pool shared by every request made through one client (keep-alive avoids a TLS
+# handshake per short tool call). Tunable via env for larger fan-outs.
+MAX_CONNECTIONS = int(os.getenv("GENAI_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("GENAI_MAX_KEEPALIVE_CONNECTIONS", "10"))
+KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("GENAI_KEEPALIVE_EXPIRY", "60"))
+
+_clients = {}
+_loop_clients = {}
+_lock = threading.Lock()
+
+
+def resolve_settings(vertexai=None, project=None, location=None, api_key=None):
+    """
+    Fills unset connection settings from the environment (GOOGLE_GENAI_USE_VERTEXAI,
+    GOOGLE_CLOUD_PROJECT, GOOGLE_CLOUD_LOCATION, GOOGLE_API_KEY).
+    """
+    if vertexai is None:
+        vertexai = os.getenv("GOOGLE_GENAI_USE_VERTEXAI", "0") == "1"
+    if vertexai:
+        return {
+            "vertexai": True,
+            "project": project or os.getenv("GOOGLE_CLOUD_PROJECT"),
+            "location": location or os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1"),
+        }
+    return {"api_key": api_key or os.getenv("GOOGLE_API_KEY")}
+
+
+def client_kwargs():
+    """
+    genai.Client keyword arguments carrying the pooled HTTP settings.
+    """
+    import httpx
+    from google.genai import types
+
+    limits = httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+    )
+    return {"http_options": types.HttpOptions(client_args={"limits": limits}, async_client_args={"limits": limits})}
+
+
+def _build_client(settings):
+    cassette = get_cassette()
+    if cassette is not None and cassette.mode == "replay":
+        # Offline: answers come from the cassette, no credentials or network needed
+        return CassetteClient(None, cassette)
+
+    from google import genai
+    client = genai.Client(**settings, **client_kwargs())
+    backend = "Vertex AI" if settings.get("vertexai") else "Gemini API Key"
+    print(f"[GenAIClient] Initialized shared client with {backend}.")
+    return CassetteClient(client, cassette) if cassette is not None else client
+
+
+def _registry_key(settings):
+    return (settings.get("vertexai", False), settings.get("project") or settings.get("api_key"), settings.get("location"))
+
+
+def get_client(vertexai=None, project=None, location=None, api_key=None):
+    """
+    Returns the process-wide genai.Client for these settings, building it on first use.
+    Keyed by (vertex/api-key, project, location); safe to call from any thread.
+    """
+    settings = resolve_settings(vertexai, project, location, api_key)
+    key = _registry_key(settings)
+    with _lock:
+        if key not in _clients:
+            _clients[key] = _build_client(settings)
+        return _clients[key]
+
+
+def get_async_client(vertexai=None, project=None, location=None, api_key=None):
+    """
+    Returns `client.aio` for the running event loop. Async HTTP connections are bound to the
+    loop that opened them, so each loop gets its own client; entries of closed loops are dropped.
+    """
+    settings = resolve_settings(vertexai, project, location, api_key)
+    loop = asyncio.get_running_loop()
+    key = (_registry_key(settings), loop)
+    with _lock:
+        for stale in [k for k in _loop_clients if k[1].is_closed()]:
+            del _loop_clients[stale]
+        if key not in _loop_clients:
+            _loop_clients[key] = _build_client(settings)
+        return _loop_clients[key].aio
+
+
+def adk_model(model_name):
+    """
+    Gemini model for ADK agents configured like the registry clients. ADK keeps one client
+    per event loop itself, so it receives the same settings rather than a pinned client.
+    """
+    kwargs = {"client_kwargs": {**resolve_settings(), **client_kwargs()}}
+    if get_cassette() is not None:
+        return cassette_gemini(model_name, **kwargs)
+    from google.adk.models import Gemini
+    return Gemini(model=model_name, **kwargs)
@@ -0,0 +1,196 @@
+import os
+import re
+import time
+import random
+import asyncio
+import threading
+
+# Defaults per model; override with GEMINI_RATE_LIMIT_RPM / GEMINI_MAX_CONCURRENCY
+DEFAULT_RPM = int(os.getenv("GEMINI_RATE_LIMIT_RPM", "120"))
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+DEFAULT_MAX_RETRIES = int(os.getenv("GEMINI_RATE_LIMIT_RETRIES", "4"))
+
+
+class RateLimitError(Exception):
+    """
+    Raised when Gemini keeps answering 429 / RESOURCE_EXHAUSTED after all retries.
+    Callers should surface it instead of substituting placeholder data.
+    """
+
+
+def is_rate_limit_error(e):
+    if isinstance(e, RateLimitError):
+        return True
+    if getattr(e, "code", None) == 429 or getattr(e, "status_code", None) == 429:
+        return True
+    text = str(e)
+    return "RESOURCE_EXHAUSTED" in text or re.search(r"\b429\b", text) is not None or "Quota exceeded" in text
+
+
+def retry_after_seconds(e):
+    """
+    Server-suggested wait: the Retry-After header or the retryDelay in the error details.
+    """
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        if value:
+            return float(value)
+    except (TypeError, ValueError, AttributeError):
+        pass
+    match = re.search(r"retryDelay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s", str(e))
+    return float(match.group(1)) if match else None
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket (requests per minute) combined with an AIMD concurrency window:
+    each success widens the window additively, each 429 halves it and pauses new calls
+    for the server's retry-after (or a jittered backoff) before retrying.
+    """
+    def __init__(self, name, rpm=DEFAULT_RPM, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 min_concurrency=1, max_retries=DEFAULT_MAX_RETRIES, max_backoff=60.0):
+        self.name = name
+        self.rate = rpm / 60.0
+        self.capacity = max(1.0, float(max_concurrency))
+        self.max_concurrency = float(max_concurrency)
+        self.min_concurrency = float(min_concurrency)
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._limit = float(max_concurrency)
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._stats = {"calls": 0, "throttled": 0, "retries": 0, "failures": 0, "wait_seconds": 0.0}
+
+    def _try_acquire(self):
+        """
+        Takes a token and a concurrency slot; returns 0 on success or the seconds to wait.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self._in_flight >= int(self._limit):
+                return 0.05
+            if self._tokens < 1:
+                return (1 - self._tokens) / self.rate
+            self._tokens -= 1
+            self._in_flight += 1
+            return 0
+
+    def try_acquire(self):
+        """
+        Takes a slot only if one is free right now; for speculative requests (hedges) that
+        must not wait for quota. Pair a successful call with `release`.
+        """
+        return self._try_acquire() == 0
+
+    def release(self, throttled=False, delay=None):
+        self._release(throttled=throttled, delay=delay)
+
+    def _release(self, throttled=False, delay=None, attempt=0):
+        with self._lock:
+            self._in_flight -= 1
+            if throttled:
+                self._limit = max(self.min_concurrency, self._limit / 2)
+                backoff = delay if delay is not None else min(self.max_backoff, 2 ** attempt) * random.uniform(0.5, 1.5)
+                self._paused_until = max(self._paused_until, time.monotonic() + backoff)
+                self._stats["throttled"] += 1
+            else:
+                self._limit = min(self.max_concurrency, self._limit + 1 / self._limit)
+
+    def _record_wait(self, seconds):
+        with self._lock:
+            self._stats["wait_seconds"] += seconds
+
+    def call(self, fn):
+        """
+        Runs `fn()` under the limiter, retrying rate-limit errors. Other errors propagate.
+        """
+        with self._lock:
+            self._stats["calls"] += 1
+        for attempt in range(self.max_retries + 1):
+            while (wait := self._try_acquire()) > 0:
+                self._record_wait(min(wait, 1.0))
+                time.sleep(min(wait, 1.0))
+            try:
+                result = fn()
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    self._release()
+                    raise
+                self._release(throttled=True, delay=retry_after_seconds(e), attempt=attempt)
+                self._count_retry(attempt)
+                print(f"[RateLimiter:{self.name}] 429 received, window={self._limit:.1f} (attempt {attempt + 1})")
+                continue
+            except BaseException:
+                self._release()
+                raise
+            self._release()
+            return result
+        raise RateLimitError(f"Gemini quota exhausted for {self.name} after {self.max_retries + 1} attempts")
+
+    async def acall(self, coro_fn):
+        """
+        Async counterpart of `call`; `coro_fn` returns a fresh coroutine per attempt.
+        """
+        with self._lock:
+            self._stats["calls"] += 1
+        for attempt in range(self.max_retries + 1):
+            while (wait := self._try_acquire()) > 0:
+                self._record_wait(min(wait, 1.0))
+                await asyncio.sleep(min(wait, 1.0))
+            try:
+                result = await coro_fn()
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    self._release()
+                    raise
+                self._release(throttled=True, delay=retry_after_seconds(e), attempt=attempt)
+                self._count_retry(attempt)
+                print(f"[RateLimiter:{self.name}] 429 received, window={self._limit:.1f} (attempt {attempt + 1})")
+                continue
+            except BaseException:
+                self._release()
+                raise
+            self._release()
+            return result
+        raise RateLimitError(f"Gemini quota exhausted for {self.name} after {self.max_retries + 1} attempts")
+
+    def _count_retry(self, attempt):
+        with self._lock:
+            if attempt < self.max_retries:
+                self._stats["retries"] += 1
+            else:
+                self._stats["failures"] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["concurrency_limit"] = round(self._limit, 2)
+            stats["in_flight"] = self._in_flight
+        stats["wait_seconds"] = round(stats["wait_seconds"], 2)
+        return stats
+
+
+# --- Process-wide registry (quotas are per model) ---
+_limiters = {}
+_registry_lock = threading.Lock()
+
+def get_rate_limiter(model):
+    with _registry_lock:
+        if model not in _limiters:
+            _limiters[model] = AdaptiveRateLimiter(model)
+        return _limiters[model]
+
+def get_rate_limiter_metrics():
+    with _registry_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.stats() for limiter in limiters}
@@ -0,0 +1,981 @@
+import sys
+import os
+import time
+import uuid
+from concurrent.futures import Future
+import threading
+from datetime import datetime
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Add the project root to path to import shared tools
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from shared.tools.search_tool import WebSearchTool, LeaderList
+from shared.tools.sentiment_tool import SentimentTool, SentimentTopic, snippet_scores, DEFAULT_BATCH_TOKENS
+from shared.tools.news_tool import NewsMonitorTool
+from services.db_service import DatabaseService
+from shared.single_flight import get_single_flight_metrics
+from shared.visibility import compute_visibility, SCORE_VERSION
+from shared.rate_limiter import RateLimitError, get_rate_limiter_metrics
+from shared.resilience import get_resilience_metrics
+from shared.model_router import get_model_router, clean_names
+from shared.snippet_packer import pack_snippets, describe_packing, snippet_fingerprint, DEFAULT_TOKEN_BUDGET
+from shared.startup import timed_init
+from shared.report_sections import SectionedReport
+from shared.prompt_table import serialize_table, describe_serialization
+from shared.task_graph import TaskGraph, stage_workers, describe_stages, create_stage_pools
+from shared.sentiment_trends import label_polarity, weighted_polarity, sentiment_trends, LABEL_CONFIDENCE
+from shared.snippet_stream import SnippetBuffer, stream_search, astream_search, DEFAULT_MIN_SNIPPETS, DEFAULT_STRAGGLER_BUDGET
+
+PROFILES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'config', 'profiles')
+
+# Profile keys read into DomainAgent attributes (see config/profiles/<domain>.yaml)
+PROFILE_ATTRIBUTES = (
+    "domain", "analysis_title", "report_type", "report_prefix", "chat_instruction", "discover_sector",
+    "leader_log", "leader_prompt", "leader_max_name_length", "visibility_floor",
+    "search_templates", "mock_templates", "mock_link",
+)
+
+def load_config(config_path):
+    import yaml
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f)
+
+def load_profile(domain, profiles_dir=PROFILES_DIR):
+    """
+    The profile of `domain` (config/profiles/<domain>.yaml): competitor config, analysis
+    settings, prompts and the domain specifics (search queries, leader prompt, chat instruction, ...).
+    """
+    path = os.path.join(profiles_dir, f"{domain}.yaml")
+    if not os.path.exists(path):
+        raise ValueError(f"No profile for domain '{domain}' in {os.path.normpath(profiles_dir)}")
+    return load_config(path)
+
+def load_profiles(profiles_dir=PROFILES_DIR, domains=None):
+    """
+    {domain: profile} for `domains`, or for every profile in `profiles_dir`.
+    """
+    if domains is None:
+        domains = sorted(os.path.splitext(f)[0] for f in os.listdir(profiles_dir) if f.endswith('.yaml'))
+    return {domain: load_profile(domain, profiles_dir) for domain in domains}
+
+def unique_targets(targets):
+    """
+    `targets` without repeated names (compared case-insensitively), first occurrence kept.
+    Run checkpoints are keyed by entity name, so every target must be unique.
+    """
+    seen = set()
+    unique = []
+    for target in targets:
+        if target['name'].lower() not in seen:
+            seen.add(target['name'].lower())
+            unique.append(target)
+    return unique
+
+# from google.adk.tools import google_search
+import asyncio
+
+class DomainAgent:
+    """
+    Competitive-analysis agent for one domain. Everything domain-specific comes from the
+    domain's profile (config/profiles/<domain>.yaml), so HR, financial consulting, payroll and
+    BPO run on this one implementation: the deployments' agents (HRAgent, FinAgent, ...) only
+    name their profile, and DomainEngine serves all of them from one process.
+    """
+    # Profile loaded when none is passed; set by the per-deployment subclasses
+    domain = None
+
+    def __init__(self, config=None, db=None, search_tool=None, sentiment_tool=None, news_tool=None, stage_pools=None):
+        """
+        `config` is a domain profile (default: load_profile(self.domain)). The tools and stage
+        pools can be passed in to share them between agents in one process (see DomainEngine);
+        by default each agent builds its own.
+        """
+        if config is None:
+            config = load_profile(self.domain)
+        for key in PROFILE_ATTRIBUTES:
+            setattr(self, key, config[key])
+        self.prompts = config['prompts']
+        self.config = config
+        self.db = db or DatabaseService(config['db_path']) # The profile's SQLite DB
+        self.search_tool = search_tool or WebSearchTool()
+        self.sentiment_tool = sentiment_tool or SentimentTool()
+        self.news_tool = news_tool or NewsMonitorTool(search_tool=self.search_tool)
+        self.stage_pools = stage_pools
+        self.competitors = config.get('competitors', [])
+        self.my_company = config.get('my_company', {})
+        
+        # Chat agent, session service and runner are built on first use (see _chat_components)
+        self._chat = None
+        self._chat_lock = threading.Lock()
+
+    @property
+    def _chat_app(self):
+        return f"{self.domain}_chat_app"
+
+    def _prompt(self, key):
+        """
+        Prompt template by name (BATCH_ANALYSIS_PROMPT, CODI_REPORT_PROMPT, ...) from the profile.
+        """
+        if key not in self.prompts:
+            raise KeyError(f"Profile '{self.domain}' has no prompt {key}")
+        return self.prompts[key]
+
+    def _build_chat(self):
+        from google.adk.agents import LlmAgent
+        from google.adk import Runner
+        from google.adk.sessions import InMemorySessionService
+        from shared.tools.web_search_tool import duckduckgo_search
+        from shared.genai_client import adk_model
+
+        chat_agent = LlmAgent(
+            name=f"{self.domain}_chat_assistant",
+            model=adk_model(get_model_router().models("chat")[0]),
+            instruction=self.chat_instruction,
+            tools=[duckduckgo_search],
+            output_key="chat_message_output"
+        )
+        session_service = InMemorySessionService()
+        return chat_agent, session_service, Runner(agent=chat_agent, app_name=self._chat_app, session_service=session_service)
+
+    def _chat_components(self):
+        """
+        (chat_agent, session_service, runner), built on first use: analysis-only sessions
+        (Streamlit tabs, API runs) never pay for importing google.adk or building the model.
+        """
+        with self._chat_lock:
+            if self._chat is None:
+                with timed_init(self._chat_app):
+                    self._chat = self._build_chat()
+            return self._chat
+
+    @property
+    def chat_agent(self):
+        return self._chat_components()[0]
+
+    @property
+    def chat_session_service(self):
+        return self._chat_components()[1]
+
+    @property
+    def chat_runner(self):
+        return self._chat_components()[2]
+
+    def chat(self, user_input):
+        """
+        Processes a chat message using the ADK agent with web search.
+        """
+        import nest_asyncio
+        nest_asyncio.apply()
+        
+        async def _run_chat():
+            from google.genai import types
+            
+            # Ensure session exists
+            session_id = f"{self.domain}_chat_session"
+            user_id = f"{self.domain}_chat_user"
+            session = await self.chat_session_service.get_session(session_id=session_id, app_name=self._chat_app, user_id=user_id)
+            if not session:
+                await self.chat_session_service.create_session(
+                    app_name=self._chat_app,
+                    session_id=session_id,
+                    user_id=user_id
+                )
+            
+            # Run the agent and consume events
+            async for _ in self.chat_runner.run_async(
+                user_id=user_id,
+                session_id=session_id, 
+                new_message=types.Content(parts=[types.Part(text=user_input)])
+            ):
+                pass # Consuming events
+            
+            # Retrieve the session to get the state output
+            session = await self.chat_session_service.get_session(session_id=session_id, app_name=self._chat_app, user_id=user_id)
+            if session and session.state:
+                 return session.state.get("chat_message_output", "No response captured in state.")
+            return "No session found."
+
+        start = time.monotonic()
+        try:
+            return asyncio.run(asyncio.wait_for(_run_chat(), timeout=get_model_router().latency_budget("chat")))
+        except asyncio.TimeoutError:
+            return f"Error en chat: sin respuesta en {get_model_router().latency_budget('chat'):.0f}s"
+        except Exception as e:
+            return f"Error en chat: {e}"
+        finally:
+            get_model_router().record("chat", get_model_router().models("chat")[0], time.monotonic() - start)
+
+    def monitor_news(self, extra_competitors=None):
+        """
+        Scans news for all competitors + self + extras.
+        """
+        current_competitors = self.competitors.copy()
+        if extra_competitors:
+            for extra in extra_competitors:
+                current_competitors.append({"name": extra})
+                
+        all_entities = current_competitors + [self.my_company]
+        return self.news_tool.scan_news(all_entities)
+
+    def discover_new_competitors(self):
+        """
+        Uses Search Tool to find potential new players.
+        """
+        return self.search_tool.search_competitors(sector=self.discover_sector, location="España")
+
+    def generate_codi_report(self, df, use_cache=True):
+        """
+        Generates a strategic report using Gemini.
+        Now supports DB persistence and dynamic prompts.
+        """
+        if df.empty:
+            return "No data available to generate report."
+            
+        prompt = self._codi_prompt(df)
+        
+        try:
+            # use_cache=False regenerates even when the same data was already reported
+            report_text = self._report_engine().generate(prompt, title=self._codi_title(), use_cache=use_cache)
+            
+            # Save to DB History
+            self.db.save_report(
+                report_type=self.report_type,
+                target_entity=self.my_company['name'],
+                content=report_text,
+                raw_data=df.to_dict(orient='records')
+            )
+            
+            return report_text
+        except Exception as e:
+            return f"Error generating CODI report: {e}"
+
+    def _codi_prompt(self, df):
+        # Compact CSV/markdown table instead of the padded to_string dump (shared/prompt_table.py)
+        table_format = self.config.get('analysis_settings', {}).get('report_table_format', 'csv')
+        # Arrastrado is run bookkeeping (analysis reused), not data for the report
+        data_str, stats = serialize_table(df.drop(columns=["Arrastrado"], errors="ignore"), fmt=table_format)
+        print(f"[Serializer] {describe_serialization(stats)}")
+        
+        # Load Prompt from DB (or use the default template, see _prompt)
+        effective_prompt_template = self.db.get_prompt("CODI_REPORT_PROMPT", default_value=self._prompt("CODI_REPORT_PROMPT"))
+        
+        # Replace placeholders
+        current_date_str = datetime.now().strftime("%d-%m-%Y")
+        return effective_prompt_template.replace("{my_company}", self.my_company['name']).replace("{data}", data_str).replace("{date}", current_date_str)
+
+    def _codi_title(self):
+        return f"Informe Estratégico CODI: {self.my_company['name']} ({datetime.now().strftime('%d-%m-%Y')})"
+
+    def _report_engine(self):
+        # The report's sections are generated concurrently and stitched (shared/report_sections.py)
+        sectioned = self.config.get('analysis_settings', {}).get('sectioned_report', True)
+        return SectionedReport(self.sentiment_tool, sectioned=sectioned)
+
+    def generate_codi_report_stream(self, df, use_cache=True):
+        """
+        Streaming variant of generate_codi_report for the UI: yields the report in chunks as
+        the model writes it and saves the full text to the report history once it completes.
+        A failed section ends the stream with the error, and nothing is saved.
+        """
+        if df.empty:
+            yield "No data available to generate report."
+            return
+
+        parts = []
+        try:
+            for chunk in self._report_engine().stream(self._codi_prompt(df), title=self._codi_title(), use_cache=use_cache):
+                parts.append(chunk)
+                yield chunk
+        except Exception as e:
+            yield f"\n\nError generating CODI report: {e}"
+            return
+
+        self.db.save_report(
+            report_type=self.report_type,
+            target_entity=self.my_company['name'],
+            content="".join(parts),
+            raw_data=df.to_dict(orient='records')
+        )
+
+    def perform_deep_research(self, company_name):
+        """
+        Executes the ADK Deep Research pipeline for a specific company.
+        """
+        # Lazy import to ensure env vars are set
+        from agents.domain_agent.deep_research import DeepResearchRunner
+        runner = DeepResearchRunner()
+        # The runner handles the async loop internally for sync calls, 
+        # but since we are in Streamlit which might be async, we can try to await if possible,
+        # or use the runner's sync wrapper.
+        
+        # Actually, Streamlit is sync. So we should use the synchronous run method of the runner.
+        # But wait, I defined `run` in DeepResearchRunner to be sync.
+        
+        print(f"Starting Deep Research for {company_name}...")
+        return runner.run(company_name)
+    
+    def _detect_leaders(self, prompt, max_name_length=40):
+        """
+        Grounded leader names through the model router, as a typed LeaderList: flash first,
+        pro when the answer does not validate or holds no usable names. Kept out of the chat
+        session history. Returns the cleaned names.
+        """
+        def validate(result):
+            return bool(clean_names(result.names, max_name_length))
+
+        leaders = get_model_router().run(
+            "leader_detection",
+            lambda model: self.search_tool.answer_structured(prompt, LeaderList, model=model, validate=validate),
+            validate=validate,
+        )
+        return clean_names(leaders.names, max_name_length)
+
+    def _build_analysis_targets(self, extra_competitors, log, detect_leaders=True):
+        """
+        Returns the entities to analyse: my_company, configured and extra competitors, and
+        (unless `detect_leaders` is false) detected market leaders.
+        """
+        # 1. Base Competitors from Config
+        current_competitors = self.competitors.copy()
+        
+        # 2. Extra user-defined competitors
+        if extra_competitors:
+            current_competitors += [{"name": extra} for extra in extra_competitors]
+
+        # 3. Include My Company (it wins over a competitor of the same name)
+        my_comp_entry = self.my_company.copy()
+        my_comp_entry['type'] = 'Propia'
+        analysis_targets = unique_targets([my_comp_entry] + current_competitors)
+        if detect_leaders:
+            analysis_targets += self._new_leaders(analysis_targets, log)
+        return analysis_targets
+
+    def _new_leaders(self, known_targets, log):
+        """
+        Market leaders from the grounded leader query (see _detect_leaders) that are not in
+        `known_targets` yet.
+        """
+        # Auto-detect Market Leaders
+        log(self.leader_log)
+        leaders = []
+        
+        try:
+            for clean_name in self._detect_leaders(self.leader_prompt, max_name_length=self.leader_max_name_length):
+                if not any(c['name'].lower() == clean_name.lower() for c in known_targets + leaders):
+                    leaders.append({"name": clean_name})
+                    log(f"-> Líder detectado: {clean_name}")
+        except Exception as e:
+            log(f"⚠️ Error detectando líderes: {e}. Continuando con lista manual.")
+        return leaders
+
+    def _search_queries(self, name):
+        return [template.replace("{name}", name) for template in self.search_templates]
+
+    def _mock_results(self, name):
+        mock_snippets = [template.replace("{name}", name) for template in self.mock_templates]
+        return [{"snippet": s, "link": self.mock_link, "title": "Reporte Interno"} for s in mock_snippets]
+
+    def _snippet_buffer(self):
+        """
+        Buffer for the per-query pipeline: analysis_settings.min_snippets distinct snippets
+        (default 6) unlock the analysis, slower queries get analysis_settings.straggler_budget_seconds
+        (default 3) more before they are dropped.
+        """
+        settings = self.config.get('analysis_settings', {})
+        return SnippetBuffer(
+            min_snippets=settings.get('min_snippets', DEFAULT_MIN_SNIPPETS),
+            straggler_budget=settings.get('straggler_budget_seconds', DEFAULT_STRAGGLER_BUDGET),
+        )
+
+    def _gather_search_results(self, name):
+        """
+        Returns the search results for one entity. With batch_search enabled
+        (analysis_settings.batch_search, default true) all profile queries go out
+        as a single grounded request. Otherwise the queries stream into a SnippetBuffer
+        and analysis starts once enough snippets are in (see _snippet_buffer).
+        """
+        search_queries = self._search_queries(name)
+        if not self.config.get('analysis_settings', {}).get('batch_search', True):
+            buffer = self._snippet_buffer()
+            for query, results in stream_search(self.search_tool, search_queries, buffer, num_results=3, strict=True):
+                buffer.add(query, results)
+            print(f"[Pipeline] {name}: {buffer.summary()}")
+            return buffer.results
+
+        batch = self.search_tool.search_batch(search_queries, num_results=3, strict=True)
+        return [r for q in search_queries for r in batch[q]]
+
+    async def _agather_search_results(self, name, bounded):
+        search_queries = self._search_queries(name)
+        if not self.config.get('analysis_settings', {}).get('batch_search', True):
+            buffer = self._snippet_buffer()
+            async for query, results in astream_search(self.search_tool, search_queries, buffer, bounded, num_results=3, strict=True):
+                buffer.add(query, results)
+            print(f"[Pipeline] {name}: {buffer.summary()}")
+            return buffer.results
+
+        batch = await bounded(self.search_tool.asearch_batch(search_queries, num_results=3, strict=True))
+        return [r for q in search_queries for r in batch[q]]
+
+    def _score_visibility(self, name, search_results):
+        """
+        Visibility from the results already gathered (no extra API call), plus the delta
+        against the scores stored in competitor_snapshots on the same scale (SCORE_VERSION).
+        """
+        history = [
+            h['visibility_score'] for h in self.db.get_competitor_history(name)
+            if h.get('visibility_version') == SCORE_VERSION
+        ]
+        return compute_visibility(search_results, history=history)
+
+    def _visibility_log(self, name, visibility):
+        trend = f", {visibility['delta']:+.1f} vs. histórico" if visibility['delta'] is not None else ""
+        return f"{name}: visibilidad {visibility['score']} ({visibility['domains']} dominios, {visibility['news']} medios, {visibility['forums']} foros{trend})"
+
+    def _packed(self, entity):
+        """
+        The entity's snippets, deduplicated and ranked by relevance to its name within
+        analysis_settings.snippet_token_budget (see shared/snippet_packer.py). Packed once and
+        kept on the entity: the fingerprint, the prompt and the score range all use this list.
+        """
+        if 'snippets' not in entity:
+            budget = self.config.get('analysis_settings', {}).get('snippet_token_budget', DEFAULT_TOKEN_BUDGET)
+            entity['snippets'], stats = pack_snippets(entity['search_results'], entity['name'], max_tokens=budget)
+            if stats['input']:
+                print(f"[Packer] {entity['name']}: {describe_packing(stats)}")
+        return entity['snippets']
+
+    def _analysis_text(self, entity):
+        # Numbered so the model can score each snippet (SnippetScore.indice)
+        return "\n\n".join(f"{i}. {snippet}" for i, snippet in enumerate(self._packed(entity), 1))
+
+    def _build_analysis_prompt(self, entity):
+        combined_text = self._analysis_text(entity)
+        if not combined_text:
+            return None
+        return self._prompt("BATCH_ANALYSIS_PROMPT").replace("{company}", entity['name']).replace("{text}", combined_text)
+
+    def _analysis_values(self, analysis):
+        # SentimentTopic from schema-constrained generation; None only when every model tier failed
+        return (analysis.sentimiento, analysis.tema, snippet_scores(analysis.fragmentos)) if analysis else ("Neutro", "General", {})
+
+    def _build_row(self, name, type_label, vis_score, avg_sentiment, avg_topic, search_results, polarity=None, carried_forward=False):
+        return {
+            "Entidad": name,
+            "Tipo": type_label,
+            "Visibilidad": vis_score if vis_score > 0 else self.visibility_floor,
+            "Sentimiento": avg_sentiment,
+            "Polaridad": round(polarity, 2) if polarity is not None else None,
+            "Tema_Dominante": avg_topic,
+            "Arrastrado": carried_forward,
+            "Fuente_Top": search_results[0]['link'] if search_results else "No Web Results"
+        }
+
+    def _build_error_row(self, name, type_label, e):
+        return {
+            "Entidad": name,
+            "Tipo": type_label,
+            "Visibilidad": 0,
+            "Sentimiento": "Error",
+            "Polaridad": None,
+            "Tema_Dominante": "Error",
+            "Arrastrado": False,
+            "Fuente_Top": str(e)
+        }
+
+    # --- Analysis stages (search -> sentiment/topic -> persistence) ---
+
+    def _new_entity(self, comp):
+        name = comp['name']
+        type_label = "Propia" if comp.get('type') == 'Propia' else "Competidor"
+        return {"name": name, "type_label": type_label, "logs": [f"Analizando: {name}..."]}
+
+    def _collect_entity(self, comp):
+        """
+        Stage 1: searches and visibility for one target. Failures are kept on the entity
+        (`error`) and turned into an error row at the end.
+        """
+        entity = self._new_entity(comp)
+        try:
+            self._attach_results(entity, self._gather_search_results(entity['name']))
+        except Exception as e:
+            entity['error'] = e
+        return entity
+
+    async def _acollect_entity(self, comp, bounded):
+        entity = self._new_entity(comp)
+        try:
+            self._attach_results(entity, await self._agather_search_results(entity['name'], bounded))
+        except Exception as e:
+            entity['error'] = e
+        return entity
+
+    def _attach_results(self, entity, search_results):
+        name = entity['name']
+        visibility = self._score_visibility(name, search_results)
+        entity['vis_score'] = visibility['score']
+        entity['logs'].append(self._visibility_log(name, visibility))
+
+        # FALLBACK: If search returns NOTHING (0 results), use Mock Data so the report doesn't fail
+        if not search_results:
+            entity['logs'].append(f"⚠️ Sin resultados online para {name}. Usando datos simulados de respaldo.")
+            search_results = self._mock_results(name)
+        entity['search_results'] = search_results
+        self._check_unchanged(entity)
+
+    def _check_unchanged(self, entity):
+        """
+        Incremental re-analysis: fingerprints the packed snippet set and, when it matches the
+        last model-scored snapshot (analysis_settings.incremental_analysis, default true) and that
+        analysis is younger than analysis_settings.incremental_max_age_days, marks the entity
+        `carried_forward` with the stored sentiment/topic and per-snippet scores so no model
+        call is made for it. Carried rows never reset the age, so the model re-scores the
+        entity once the original analysis expires.
+        """
+        settings = self.config.get('analysis_settings', {})
+        entity['fingerprint'] = snippet_fingerprint(self._packed(entity))
+        if not settings.get('incremental_analysis', True):
+            return
+        previous = self.db.get_latest_scored_snapshot(entity['name'])
+        if not previous or previous['fingerprint'] != entity['fingerprint'] or previous['polarity'] is None:
+            return
+        age = datetime.now() - datetime.fromisoformat(str(previous['timestamp']))
+        if age.days >= settings.get('incremental_max_age_days', 7):
+            return
+        scores = self.db.get_sentiment_scores(entity['name'], previous['timestamp']) or {0: (previous['polarity'], 1.0)}
+        entity['carried_forward'] = (previous['sentiment'], previous['topic'], scores)
+
+    def _batch_texts(self, entities):
+        settings = self.config.get('analysis_settings', {})
+        if not settings.get('batch_analysis', True):
+            return []
+        texts = [(e['name'], self._analysis_text(e)) for e in entities if 'carried_forward' not in e]
+        texts = [(name, text) for name, text in texts if text]
+        return texts if len(texts) > 1 else []
+
+    def _analyze_batch(self, *entities):
+        """
+        LLM stage, batched: with analysis_settings.batch_analysis (default true) the collected
+        entities share structured requests, split by analysis_settings.analysis_batch_tokens.
+        Returns {name: (sentiment, topic, scores) or RateLimitError}; entities left out fall back
+        to one request each in _analysis_for.
+        """
+        texts = self._batch_texts([e for e in entities if 'error' not in e])
+        if not texts:
+            return {}
+        max_tokens = self.config.get('analysis_settings', {}).get('analysis_batch_tokens', DEFAULT_BATCH_TOKENS)
+        try:
+            return self.sentiment_tool.analyze_batch(texts, self._prompt("MULTI_ENTITY_ANALYSIS_PROMPT"), max_tokens=max_tokens)
+        except RateLimitError as e:
+            return {name: e for name, _ in texts}
+
+    def _analysis_for(self, entity, batch=None):
+        """
+        LLM stage, per entity: the batched answer when there is one, otherwise a single request.
+        """
+        if 'error' in entity:
+            return None
+        if batch and entity['name'] in batch:
+            return batch[entity['name']]
+        return self._analyze_entity(entity)
+
+    def _schedule_entities(self, graph, run_id, pending):
+        """
+        Builds the run_analysis DAG: search -> analysis -> persistence (snapshot + checkpoint)
+        per pending (position, target). Without batching each analysis starts as soon as its own
+        search is done; with batching the batch waits for every search and the per-entity
+        fallbacks follow it. Returns the persistence futures in target order.
+        """
+        searches = [graph.submit("search", self._collect_entity, c) for _, c in pending]
+        batch = None
+        if len(searches) > 1 and self.config.get('analysis_settings', {}).get('batch_analysis', True):
+            batch = graph.submit("llm", self._analyze_batch, after=searches)
+        finals = []
+        for (position, _), search in zip(pending, searches):
+            analysis = graph.submit("llm", self._analysis_for, after=[search] + ([batch] if batch else []))
+            finals.append(graph.submit("persistence", self._finalize_checkpoint, run_id, position, after=[search, analysis]))
+        return finals
+
+    async def _aanalyze_entities(self, entities, bounded):
+        analyses = {}
+        texts = self._batch_texts(entities)
+        if texts:
+            max_tokens = self.config.get('analysis_settings', {}).get('analysis_batch_tokens', DEFAULT_BATCH_TOKENS)
+            try:
+                analyses.update(await bounded(
+                    self.sentiment_tool.aanalyze_batch(texts, self._prompt("MULTI_ENTITY_ANALYSIS_PROMPT"), max_tokens=max_tokens)
+                ))
+            except RateLimitError as e:
+                analyses.update({name: e for name, _ in texts})
+
+        missing = [e for e in entities if e['name'] not in analyses]
+        results = await asyncio.gather(*(self._aanalyze_entity(e, bounded) for e in missing))
+        analyses.update(zip([e['name'] for e in missing], results))
+        return analyses
+
+    def _analyze_entity(self, entity):
+        if 'carried_forward' in entity:
+            return entity['carried_forward']
+        prompt = self._build_analysis_prompt(entity)
+        if not prompt:
+            return ("Neutro", "General", {})
+        try:
+            return self._analysis_values(self.sentiment_tool.analyze_structured(prompt, SentimentTopic))
+        except RateLimitError as e:
+            return e
+        except Exception as e:
+            print(f"Error analysis {entity['name']}: {e}")
+            return ("Neutro", "General", {})
+
+    async def _aanalyze_entity(self, entity, bounded):
+        if 'carried_forward' in entity:
+            return entity['carried_forward']
+        prompt = self._build_analysis_prompt(entity)
+        if not prompt:
+            return ("Neutro", "General", {})
+        try:
+            return self._analysis_values(await bounded(self.sentiment_tool.aanalyze_structured(prompt, SentimentTopic)))
+        except RateLimitError as e:
+            return e
+        except Exception as e:
+            print(f"Error analysis {entity['name']}: {e}")
+            return ("Neutro", "General", {})
+
+    def _finalize_entity(self, entity, analysis):
+        """
+        Stage 3: stores the snapshot and builds the report row ({"data", "logs", "error"}).
+        """
+        name, type_label = entity['name'], entity['type_label']
+        try:
+            error = entity.get('error') or (analysis if isinstance(analysis, Exception) else None)
+            if error:
+                raise error
+            avg_sentiment, avg_topic, scores = analysis
+            carried = 'carried_forward' in entity
+            if not carried:
+                # Snippets are numbered from 1; scores for numbers the prompt did not contain are dropped
+                scores = {i: score for i, score in scores.items() if 1 <= i <= len(entity.get('snippets', ()))}
+            # Only model-scored analyses keep the fingerprint, so a failed call is never carried forward
+            fingerprint = entity.get('fingerprint') if scores else None
+            # Without per-snippet scores the label's polarity stands in (index 0), so every run is numeric
+            if not scores and label_polarity(avg_sentiment) is not None:
+                scores = {0: (label_polarity(avg_sentiment), LABEL_CONFIDENCE)}
+            polarity = weighted_polarity(scores.values())
+            timestamp = datetime.now()
+            self.db.save_competitor_snapshot(name, entity['vis_score'], avg_sentiment, avg_topic, polarity=polarity, timestamp=timestamp,
+                                             fingerprint=fingerprint, carried_forward=carried, visibility_version=SCORE_VERSION)
+            self.db.save_sentiment_scores(name, scores, timestamp=timestamp)
+            if carried:
+                entity['logs'].append(f"↺ {name}: fragmentos sin cambios, se reutiliza el análisis anterior")
+            entity['logs'].append(f"✅ {name}: Completado ({len(entity['search_results'])} resultados)")
+            return {
+                "data": self._build_row(name, type_label, entity['vis_score'], avg_sentiment, avg_topic, entity['search_results'], polarity, carried),
+                "logs": entity['logs'],
+                "error": False
+            }
+        except Exception as e:
+            return {
+                "data": self._build_error_row(name, type_label, e),
+                "logs": [f"❌ Error analizando {name}: {e}"],
+                "error": True
+            }
+
+    # --- Checkpointed runs (resumable after an interruption) ---
+
+    def _start_run(self, extra_competitors, run_id, log, detect_leaders=True):
+        """
+        Returns (run_id, targets, pending, leaders_pending) with pending = [(position, target)]
+        still to process. A new run builds its targets (leader detection included unless
+        `detect_leaders` is false) and stores them; resuming `run_id` reuses the stored targets
+        and skips entities checkpointed without error. `leaders_pending` is true while the run's
+        leader detection has not been recorded (see _append_leaders), so the caller runs it.
+        """
+        if run_id is None:
+            analysis_targets = self._build_analysis_targets(extra_competitors, log, detect_leaders=detect_leaders)
+            run_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+            self.db.create_run(run_id, analysis_targets, leaders_done=detect_leaders)
+            log(f"Ejecución {run_id}: {len(analysis_targets)} entidades")
+            return run_id, analysis_targets, list(enumerate(analysis_targets)), not detect_leaders
+
+        run = self.db.get_run(run_id)
+        if run is None:
+            raise ValueError(f"Unknown analysis run '{run_id}'")
+        targets = unique_targets(run['targets'])
+        done = {c['name'].lower() for c in self.db.get_checkpoints(run_id) if c['status'] == 'done'}
+        pending = [(i, t) for i, t in enumerate(targets) if t['name'].lower() not in done]
+        leaders_pending = not run['leaders_done']
+        log(f"Reanudando ejecución {run_id}: {len(targets) - len(pending)} entidades completadas, {len(pending)} pendientes"
+            + (", detección de líderes pendiente" if leaders_pending else ""))
+        return run_id, targets, pending, leaders_pending
+
+    def _append_leaders(self, run_id, analysis_targets, leaders):
+        # Detected leaders join the run after its base targets; returns them as pending entries.
+        # Storing the targets also records the leader stage, so a resume does not repeat it.
+        start = len(analysis_targets)
+        analysis_targets.extend(unique_targets(analysis_targets + leaders)[start:])
+        self.db.update_run_targets(run_id, analysis_targets)
+        return list(enumerate(analysis_targets[start:], start))
+
+    def _schedule_leaders(self, graph, run_id, analysis_targets, log):
+        """
+        Speculative leader detection: the grounded leader query (search_tool.answer_structured
+        through the model router) runs on the "leaders" stage while the base targets are already
+        being searched and analysed, and the leaders it finds are scheduled on the same pools as
+        soon as it returns. Returns a future with their persistence futures.
+        """
+        scheduled = Future()
+
+        def feed(detection):
+            try:
+                pending = self._append_leaders(run_id, analysis_targets, detection.result())
+                scheduled.set_result(self._schedule_entities(graph, run_id, pending))
+            except Exception as e:
+                scheduled.set_exception(e)
+
+        graph.submit("leaders", self._new_leaders, list(analysis_targets), log).add_done_callback(feed)
+        return scheduled
+
+    def _finalize_checkpoint(self, run_id, position, entity, analysis):
+        # Persistence stage: snapshot, then the run checkpoint with the finished row
+        result = self._finalize_entity(entity, analysis)
+        status = 'error' if result['error'] else 'done'
+        self.db.save_checkpoint(run_id, entity['name'], position, status, result['data'], result['logs'])
+        return result
+
+    def _log_result(self, future, log):
+        try:
+            result = future.result()
+        except Exception as e:
+            log(f"Error fatal en thread: {e}")
+            return
+        for l in result['logs']:
+            log(l)
+
+    def _finish_run(self, run_id, targets):
+        # A run stays resumable until every scheduled target is checkpointed without error
+        done = {c['name'].lower() for c in self.db.get_checkpoints(run_id) if c['status'] == 'done'}
+        if all(t['name'].lower() in done for t in targets):
+            self.db.finish_run(run_id)
+        return self.assemble_run(run_id)
+
+    def assemble_run(self, run_id):
+        """
+        The report DataFrame of a run rebuilt from its stored checkpoints, in target order.
+        The run ID travels in `df.attrs['run_id']`.
+        """
+        import pandas as pd
+        df = self._with_trends(pd.DataFrame([c['row'] for c in self.db.get_checkpoints(run_id)]))
+        df.attrs['run_id'] = run_id
+        return df
+
+    def resume_analysis(self, run_id=None, status_callback=None):
+        """
+        Continues an interrupted run (default: the most recent unfinished one), processing only
+        the entities without a successful checkpoint, and returns the DataFrame assembled from
+        all of the run's checkpoints. Returns None when there is nothing to resume.
+        """
+        if run_id is None:
+            unfinished = self.db.get_unfinished_runs(limit=1)
+            if not unfinished:
+                return None
+            run_id = unfinished[0]['run_id']
+        return self.run_analysis(status_callback=status_callback, run_id=run_id)
+
+    def _with_trends(self, df):
+        """
+        Adds the polarity change against each entity's previous run (Tendencia_Polaridad),
+        computed from the stored score history (shared/sentiment_trends.py), not by the model.
+        A run with no rows (every entity failed or was skipped) is returned as is.
+        """
+        if df.empty or "Entidad" not in df:
+            return df
+        try:
+            trends = sentiment_trends(self.db.load_sentiment_scores())
+        except Exception as e:
+            print(f"[Trends] Could not compute sentiment trends: {e}")
+            return df
+        df["Tendencia_Polaridad"] = df["Entidad"].str.lower().map(trends["delta"])
+        return df
+
+    def _log_run_metrics(self, log):
+        cache_stats = self.search_tool.cache.stats()
+        log(f"Caché de búsqueda: {cache_stats['hits']} aciertos / {cache_stats['misses']} fallos ({cache_stats['size']} entradas)")
+        llm_stats = self.sentiment_tool.cache.stats()
+        log(f"Caché LLM: {llm_stats['hits']} aciertos / {llm_stats['misses']} fallos ({llm_stats['bytes'] // 1024} KB)")
+        saved_calls = sum(m['saved_calls'] for m in get_single_flight_metrics().values())
+        log(f"Búsquedas coalescidas (llamadas ahorradas): {saved_calls}")
+        throttled = sum(m['throttled'] for m in get_rate_limiter_metrics().values())
+        if throttled:
+            log(f"⚠️ Gemini limitó {throttled} llamadas (429); el limitador redujo la concurrencia.")
+        escalations = sum(m['escalations'] for m in get_model_router().stats().values())
+        if escalations:
+            log(f"Escalados a modelo superior (validación/errores): {escalations}")
+        resilience = get_resilience_metrics().values()
+        retries = sum(m['retries'] for m in resilience)
+        hedges = sum(m['hedges'] for m in resilience)
+        if retries or hedges:
+            log(f"Reintentos: {retries} | Peticiones de cobertura (hedge): {hedges}, ganadas: {sum(m['hedge_wins'] for m in resilience)}")
+
+    def run_analysis(self, extra_competitors=None, status_callback=None, run_id=None):
+        """
+        Analyses my_company, the configured/extra competitors and the detected leaders. Each
+        finished entity is checkpointed under the run's ID; passing the `run_id` of an
+        interrupted run (see resume_analysis) processes only what is missing.
+        """
+        def log(msg):
+             print(msg)
+             if status_callback:
+                 status_callback(msg)
+
+        log(f"Iniciando {self.analysis_title}...")
+        # Leader detection overlaps the base analysis (analysis_settings.overlap_leader_detection)
+        overlap = self.config.get('analysis_settings', {}).get('overlap_leader_detection', True)
+        run_id, analysis_targets, pending, leaders_pending = self._start_run(extra_competitors, run_id, log, detect_leaders=not overlap)
+
+        # Run Analysis DAG: separately sized pools for search, LLM analysis and persistence
+        workers = stage_workers(self.config.get('analysis_settings', {}).get('worker_pools'))
+        if self.stage_pools:
+            # Pools shared with other domains (DomainEngine) keep their own sizes
+            workers = {stage: pool.workers for stage, pool in self.stage_pools.items()}
+        log(f"Procesamiento en paralelo de {len(pending)} entidades ({', '.join(f'{k}={v}' for k, v in workers.items())})...")
+        with TaskGraph(f"{self.domain}_analysis", workers, pools=self.stage_pools) as graph:
+            finals = self._schedule_entities(graph, run_id, pending)
+            leader_finals = self._schedule_leaders(graph, run_id, analysis_targets, log) if leaders_pending else None
+            for future in finals:
+                self._log_result(future, log)
+            for future in (leader_finals.result() if leader_finals else []):
+                self._log_result(future, log)
+        log(f"Etapas: {describe_stages(graph.stats())}")
+
+        self._log_run_metrics(log)
+
+        return self._finish_run(run_id, analysis_targets)
+
+    async def run_analysis_async(self, extra_competitors=None, status_callback=None, max_concurrency=None, run_id=None):
+        """
+        Asyncio variant of run_analysis. Every (competitor x query) search, visibility lookup and
+        analysis call is scheduled on one event loop under a shared semaphore, so wall-clock time
+        tracks the slowest call instead of the number of queries per competitor.
+        Concurrency comes from `max_concurrency` or analysis_settings.max_concurrency (default 10).
+        Entities are checkpointed as in run_analysis, and `run_id` resumes an interrupted run.
+        """
+        def log(msg):
+             print(msg)
+             if status_callback:
+                 status_callback(msg)
+
+        log(f"Iniciando {self.analysis_title}...")
+        # Run setup and leader detection are blocking calls (SQLite, the sync grounded query), so
+        # they run in worker threads and keep this loop free
+        overlap = self.config.get('analysis_settings', {}).get('overlap_leader_detection', True)
+        run_id, analysis_targets, pending, leaders_pending = await asyncio.to_thread(self._start_run, extra_competitors, run_id, log, not overlap)
+
+        if max_concurrency is None:
+            max_concurrency = self.config.get('analysis_settings', {}).get('max_concurrency', 10)
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def bounded(coro):
+            async with semaphore:
+                return await coro
+
+        log(f"Procesamiento asíncrono de {len(pending)} entidades (concurrencia máx. {max_concurrency})...")
+
+        async def collect_leaders():
+            # Runs next to the base searches; the leaders found are searched as soon as it returns
+            if not leaders_pending:
+                return [], []
+            leaders = await asyncio.to_thread(self._new_leaders, list(analysis_targets), log)
+            leader_pending = await asyncio.to_thread(self._append_leaders, run_id, analysis_targets, leaders)
+            return leader_pending, await asyncio.gather(*(self._acollect_entity(c, bounded) for _, c in leader_pending))
+
+        entities, (leader_pending, leader_entities) = await asyncio.gather(
+            asyncio.gather(*(self._acollect_entity(c, bounded) for _, c in pending)), collect_leaders()
+        )
+        pending, entities = pending + leader_pending, list(entities) + list(leader_entities)
+
+        collected = [e for e in entities if 'error' not in e]
+        analyses = await self._aanalyze_entities(collected, bounded)
+        # Snapshot, score and checkpoint writes are blocking SQLite calls: off the event loop
+        for (position, _), entity in zip(pending, entities):
+            result = await asyncio.to_thread(self._finalize_checkpoint, run_id, position, entity, analyses.get(entity['name']))
+            for l in result['logs']:
+                log(l)
+
+        self._log_run_metrics(log)
+
+        return await asyncio.to_thread(self._finish_run, run_id, analysis_targets)
+
+    def generate_report(self, df):
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"{self.report_prefix}_Competitor_Report_{timestamp}.xlsx"
+        
+        print(f"Generating report: {filename}")
+        df.to_excel(filename, index=False)
+        print("Report generated successfully.")
+        return filename
+
+
+class DomainEngine:
+    """
+    Serves several domains from one process. All domains share the web search, sentiment and
+    news tools (and with them the SDK clients, rate limiters, single-flight groups and the
+    search/LLM caches) and one set of stage pools, sized to the largest per-domain
+    analysis_settings.worker_pools. Each domain keeps its own database (profile db_path) and
+    its agent is built on first use.
+
+        engine = DomainEngine()
+        df = engine.agent("fin").run_analysis()
+    """
+    def __init__(self, profiles=None, profiles_dir=PROFILES_DIR, workers=None):
+        self.profiles = profiles if profiles is not None else load_profiles(profiles_dir)
+        with timed_init("domain_engine"):
+            self.search_tool = WebSearchTool()
+            self.sentiment_tool = SentimentTool()
+            self.news_tool = NewsMonitorTool(search_tool=self.search_tool)
+            self.stage_pools = create_stage_pools(workers or self._largest_pools())
+        self._agents = {}
+        self._lock = threading.Lock()
+
+    def _largest_pools(self):
+        workers = {}
+        for profile in self.profiles.values():
+            for stage, count in (profile.get('analysis_settings', {}).get('worker_pools') or {}).items():
+                workers[stage] = max(workers.get(stage, 0), int(count))
+        return workers
+
+    def domains(self):
+        return list(self.profiles)
+
+    def agent(self, domain):
+        if domain not in self.profiles:
+            raise ValueError(f"Unknown domain '{domain}' (expected one of {self.domains()})")
+        with self._lock:
+            if domain not in self._agents:
+                profile = self.profiles[domain]
+                with timed_init(f"{domain}_agent"):
+                    self._agents[domain] = DomainAgent(
+                        profile,
+                        db=DatabaseService(profile['db_path']),
+                        search_tool=self.search_tool,
+                        sentiment_tool=self.sentiment_tool,
+                        news_tool=self.news_tool,
+                        stage_pools=self.stage_pools,
+                    )
+            return self._agents[domain]
+
+    def stats(self):
+        with self._lock:
+            loaded = list(self._agents)
+        return {
+            "domains": self.domains(),
+            "loaded": loaded,
+            "stages": {stage: pool.stats() for stage, pool in self.stage_pools.items()},
+        }
+
+    def close(self):
+        for pool in self.stage_pools.values():
+            pool.shutdown()
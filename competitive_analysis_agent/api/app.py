@@ -2,12 +2,20 @@ from flask import Flask, jsonify, request, send_file
 import threading
 import sys
 import os
-import glob
 
 # Add project root to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from agents.hr_agent.agent import HRAgent, load_config
+from agents.hr_agent.agent import HRAgent
+from shared.single_flight import get_single_flight_metrics
+from shared.rate_limiter import get_rate_limiter_metrics
+from shared.resilience import get_resilience_metrics
+from shared.cassette import get_cassette_metrics
+from shared.model_router import get_model_router_metrics
+from services.cache_service import get_llm_cache
+from shared.startup import get_startup_metrics
+from shared.task_graph import get_task_graph_metrics
+from agents.domain_agent.agent import DomainEngine
 
 app = Flask(__name__)
 
@@ -17,30 +25,54 @@ class AgentState:
         self.is_running = False
         self.last_report = None
         self.status = "Idle"
+        self.run_id = None
+        self._lock = threading.Lock()
 
+    def start(self, resume_run_id=None):
+        """
+        Marks an analysis as running; False if one already is (checked and set atomically).
+        """
+        with self._lock:
+            if self.is_running:
+                return False
+            self.is_running = True
+            self.status = "Running Analysis..."
+            self.run_id = resume_run_id
+            return True
+
+# One state per domain: /api/v1/analyze and /api/v1/domains/hr/analyze both write the HR
+# database, so they share the "hr" state and never run at the same time
 state = AgentState()
+domain_states = {"hr": state}
 
-def run_agent_task():
-    global state
-    state.is_running = True
-    state.status = "Running Analysis..."
-    
+# One DomainEngine serves every domain profile (hr, fin, payroll, bpo) with shared tools and pools
+_engine = None
+_engine_lock = threading.Lock()
+
+def _get_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = DomainEngine()
+            for domain in _engine.domains():
+                domain_states.setdefault(domain, AgentState())
+        return _engine
+
+def _load_agent():
+    # config/profiles/hr.yaml
+    return HRAgent()
+
+def run_agent_task(resume_run_id=None):
+    # `state` was marked running by trigger_analysis
     try:
-        config_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'hr_competitors.yaml')
-        config = load_config(config_path)
-        agent = HRAgent(config)
+        agent = _load_agent()
         
-        # Run Analysis
-        df = agent.run_analysis()
+        # Run Analysis (or continue an interrupted run from its checkpoints)
+        df = agent.run_analysis(run_id=resume_run_id)
+        state.run_id = df.attrs.get('run_id')
         
         # Generate Report
-        agent.generate_report(df)
-        
-        # Find the latest report
-        list_of_files = glob.glob('*.xlsx')
-        if list_of_files:
-            latest_file = max(list_of_files, key=os.path.getctime)
-            state.last_report = latest_file
+        state.last_report = agent.generate_report(df)
             
         state.status = "Completed"
     except Exception as e:
@@ -49,14 +81,33 @@ def run_agent_task():
     finally:
         state.is_running = False
 
+def run_domain_task(domain, resume_run_id=None):
+    domain_state = domain_states[domain]
+    try:
+        agent = _get_engine().agent(domain)
+        df = agent.run_analysis(run_id=resume_run_id)
+        domain_state.run_id = df.attrs.get('run_id')
+        domain_state.last_report = agent.generate_report(df)
+        domain_state.status = "Completed"
+    except Exception as e:
+        domain_state.status = f"Error: {str(e)}"
+        print(f"Error running {domain} agent: {e}")
+    finally:
+        domain_state.is_running = False
+
 @app.route('/', methods=['GET'])
 def index():
     return jsonify({
         "message": "HR Competitive Analysis Agent API is running.",
         "endpoints": [
             "POST /api/v1/analyze",
+            "GET /api/v1/runs",
             "GET /api/v1/status",
-            "GET /api/v1/report/latest"
+            "GET /api/v1/metrics",
+            "GET /api/v1/report/latest",
+            "GET /api/v1/domains",
+            "POST /api/v1/domains/<domain>/analyze",
+            "GET /api/v1/domains/<domain>/status"
         ]
     })
 
@@ -65,19 +116,97 @@ def trigger_analysis():
     if state.is_running:
         return jsonify({"message": "Analysis already running", "status": state.status}), 409
     
-    thread = threading.Thread(target=run_agent_task)
+    # {"resume": true} continues the latest unfinished run, {"run_id": "..."} a specific one
+    body = request.get_json(silent=True) or {}
+    resume_run_id = body.get("run_id")
+    if body.get("resume") and not resume_run_id:
+        unfinished = _load_agent().db.get_unfinished_runs(limit=1)
+        if not unfinished:
+            return jsonify({"message": "No unfinished run to resume"}), 404
+        resume_run_id = unfinished[0]["run_id"]
+
+    if not state.start(resume_run_id):
+        return jsonify({"message": "Analysis already running", "status": state.status}), 409
+    thread = threading.Thread(target=run_agent_task, args=(resume_run_id,))
     thread.start()
     
-    return jsonify({"message": "Analysis started", "status": "Running"}), 202
+    return jsonify({"message": "Analysis started", "status": "Running", "resumed_run_id": resume_run_id}), 202
+
+@app.route('/api/v1/runs', methods=['GET'])
+def get_unfinished_runs():
+    runs = _load_agent().db.get_unfinished_runs()
+    return jsonify([
+        {"run_id": r["run_id"], "created_at": str(r["created_at"]), "done": r["done"], "total": len(r["targets"])}
+        for r in runs
+    ])
 
 @app.route('/api/v1/status', methods=['GET'])
 def get_status():
     return jsonify({
         "is_running": state.is_running,
         "status": state.status,
+        "run_id": state.run_id,
         "last_report": state.last_report
     })
 
+@app.route('/api/v1/metrics', methods=['GET'])
+def get_metrics():
+    return jsonify({
+        "single_flight": get_single_flight_metrics(),
+        "rate_limiter": get_rate_limiter_metrics(),
+        "resilience": get_resilience_metrics(),
+        "cassette": get_cassette_metrics(),
+        "model_router": get_model_router_metrics(),
+        "llm_cache": get_llm_cache().stats(),
+        "startup": get_startup_metrics(),
+        "task_graph": get_task_graph_metrics(),
+        "domain_engine": _engine.stats() if _engine is not None else None
+    })
+
+@app.route('/api/v1/domains', methods=['GET'])
+def list_domains():
+    engine = _get_engine()
+    return jsonify([
+        {"domain": domain, "title": engine.profiles[domain]["analysis_title"], "status": domain_states[domain].status}
+        for domain in engine.domains()
+    ])
+
+@app.route('/api/v1/domains/<domain>/analyze', methods=['POST'])
+def trigger_domain_analysis(domain):
+    engine = _get_engine()
+    if domain not in domain_states:
+        return jsonify({"error": f"Unknown domain '{domain}'", "domains": engine.domains()}), 404
+    if domain_states[domain].is_running:
+        return jsonify({"message": "Analysis already running", "status": domain_states[domain].status}), 409
+
+    body = request.get_json(silent=True) or {}
+    resume_run_id = body.get("run_id")
+    if body.get("resume") and not resume_run_id:
+        unfinished = engine.agent(domain).db.get_unfinished_runs(limit=1)
+        if not unfinished:
+            return jsonify({"message": "No unfinished run to resume"}), 404
+        resume_run_id = unfinished[0]["run_id"]
+
+    if not domain_states[domain].start(resume_run_id):
+        return jsonify({"message": "Analysis already running", "status": domain_states[domain].status}), 409
+    thread = threading.Thread(target=run_domain_task, args=(domain, resume_run_id))
+    thread.start()
+
+    return jsonify({"message": "Analysis started", "domain": domain, "status": "Running", "resumed_run_id": resume_run_id}), 202
+
+@app.route('/api/v1/domains/<domain>/status', methods=['GET'])
+def get_domain_status(domain):
+    if domain not in _get_engine().domains():
+        return jsonify({"error": f"Unknown domain '{domain}'"}), 404
+    domain_state = domain_states[domain]
+    return jsonify({
+        "domain": domain,
+        "is_running": domain_state.is_running,
+        "status": domain_state.status,
+        "run_id": domain_state.run_id,
+        "last_report": domain_state.last_report
+    })
+
 @app.route('/api/v1/report/latest', methods=['GET'])
 def get_latest_report():
     if not state.last_report or not os.path.exists(state.last_report):
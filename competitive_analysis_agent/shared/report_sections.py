@@ -0,0 +1,256 @@
+import re
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Section headings of the CODI prompts ("#### 1. Resumen Ejecutivo (Executive Summary)")
+SECTION_HEADING_RE = re.compile(r"^####\s+(\d+)\.\s+(.+?)\s*$", re.MULTILINE)
+STRUCTURE_MARKER_RE = re.compile(r"^###\s+ESTRUCTURA OBLIGATORIA.*$", re.MULTILINE)
+# Closing format instructions ("**Formato:** ...", "**Idioma:** ...") apply to every section
+FOOTER_RE = re.compile(r"^\*\*(Formato|Idioma)\b", re.MULTILINE)
+_FENCE_OPEN_RE = re.compile(r"^```(?:markdown|md)?$")
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*)$")
+
+SECTION_PROMPT = """{context}
+
+---
+
+### SECCIÓN A REDACTAR
+Este informe se redacta por secciones en paralelo. Redacta ÚNICAMENTE la sección "{number}. {title}".
+Las demás secciones ({others}) las redactan otros analistas: no las repitas ni las resumas.
+Empieza directamente con el encabezado `## {number}. {title}`, sin título general ni introducción del informe.
+
+{instructions}
+
+{footer}
+"""
+
+
+def split_report_prompt(prompt):
+    """
+    Splits a filled-in CODI prompt into (context, sections, footer), where each section is
+    {"number", "title", "instructions"}. Returns None when the prompt has fewer than two
+    "#### N. Title" sections (e.g. an edited prompt), so callers fall back to one call.
+    """
+    headings = list(SECTION_HEADING_RE.finditer(prompt))
+    if len(headings) < 2:
+        return None
+
+    marker = STRUCTURE_MARKER_RE.search(prompt)
+    context_end = marker.start() if marker and marker.start() < headings[0].start() else headings[0].start()
+    context = prompt[:context_end].rstrip().rstrip('-').rstrip()
+
+    footer_match = FOOTER_RE.search(prompt, headings[-1].end())
+    body_end = footer_match.start() if footer_match else len(prompt)
+    footer = prompt[body_end:].strip()
+
+    sections = []
+    for i, heading in enumerate(headings):
+        end = headings[i + 1].start() if i + 1 < len(headings) else body_end
+        sections.append({
+            "number": heading.group(1),
+            "title": heading.group(2),
+            "instructions": prompt[heading.end():end].strip(),
+        })
+    return context, sections, footer
+
+
+def build_section_prompt(context, section, sections, footer):
+    others = ", ".join(f"{s['number']}. {s['title']}" for s in sections if s is not section)
+    return SECTION_PROMPT.format(
+        context=context, footer=footer, others=others, **section
+    ).strip() + "\n"
+
+
+class SectionHarmonizer:
+    """
+    Normalizes one generated section so the stitched report reads as a single document:
+    unwraps a code fence, makes the section start with "## N. Title" (replacing the model's own
+    heading if it wrote one) and demotes any other top-level headings below it. Works on a
+    stream: `feed` takes the model's chunks and returns the text that is final so far (whole
+    lines), `close` returns the rest.
+    """
+    def __init__(self, section):
+        self.section = section
+        self._pending = ""
+        self._lead = True
+        self._fenced = False
+        self._started = False
+        self._held = []
+
+    def heading(self):
+        return f"## {self.section['number']}. {self.section['title']}\n\n"
+
+    def feed(self, chunk):
+        *lines, self._pending = (self._pending + (chunk or "")).split("\n")
+        return "".join(self._line(line) for line in lines)
+
+    def close(self):
+        text = self._line(self._pending)
+        self._pending = ""
+        # Trailing blank lines and a closing fence are dropped
+        self._held = []
+        return text
+
+    def _is_own_heading(self, line):
+        first = _HEADING_RE.match(line.strip())
+        candidate = first.group(2) if first else line.strip()
+        is_heading = first or (candidate.startswith("**") and candidate.endswith("**"))
+        candidate = candidate.strip('*').strip()
+        return is_heading and (candidate.startswith(self.section['number']) or self.section['title'].lower()[:12] in candidate.lower())
+
+    def _line(self, line):
+        stripped = line.strip()
+        if self._lead:
+            # A report title or date line repeated at the top of a section is dropped
+            if not stripped or line.startswith("# ") or line.startswith("**Fecha"):
+                return ""
+            if not self._fenced and _FENCE_OPEN_RE.match(stripped):
+                self._fenced = True
+                return ""
+            self._lead = False
+            # The model's own heading for this section (markdown or a bold line), if it opens with one
+            if self._is_own_heading(line):
+                return ""
+
+        if not stripped or (self._fenced and stripped == "```"):
+            self._held.append(line)
+            return ""
+        match = _HEADING_RE.match(line)
+        if match and len(match.group(1)) <= 2:
+            line = f"### {match.group(2)}"
+        # Blank lines are kept between content lines only
+        text = "".join("\n" + held for held in self._held) + "\n" + line if self._started else line
+        self._held = []
+        self._started = True
+        return text
+
+
+def harmonize_section(section, text):
+    harmonizer = SectionHarmonizer(section)
+    return (harmonizer.heading() + harmonizer.feed(text) + harmonizer.close()).rstrip()
+
+
+class SectionedReport:
+    """
+    Map-reduce report generation: each "#### N. Title" section of the report prompt becomes
+    its own request over the shared context (client profile + competitive data), all
+    sections run concurrently, and the answers are harmonized and stitched in order.
+    Report latency then tracks the slowest section rather than the full report length.
+    With `sectioned=False`, or a prompt that does not split, one request is made as before.
+    A section that fails fails the whole report: no placeholder text is ever returned, so a
+    partial report is never saved or cached.
+    """
+    def __init__(self, sentiment_tool, sectioned=True, route="report"):
+        self.sentiment_tool = sentiment_tool
+        self.sectioned = sectioned
+        self.route = route
+
+    def _plan(self, prompt):
+        if not self.sectioned:
+            return None
+        parts = split_report_prompt(prompt)
+        if parts is None:
+            print("[SectionedReport] Prompt has no numbered sections; generating in one call")
+        return parts
+
+    def _section(self, context, section, sections, footer, use_cache):
+        start = time.monotonic()
+        prompt = build_section_prompt(context, section, sections, footer)
+        text = self.sentiment_tool.generate(prompt, route=self.route, use_cache=use_cache)
+        return harmonize_section(section, text), time.monotonic() - start
+
+    def _stream_section(self, context, section, sections, footer, use_cache, out, stop):
+        """
+        Streams one section's harmonized chunks into the queue `out`, then ("done", seconds).
+        A stream that fails before its first chunk is retried once through `generate` (which
+        escalates across the route's models); any other failure is put as ("error", e).
+        """
+        start = time.monotonic()
+        prompt = build_section_prompt(context, section, sections, footer)
+        harmonizer = SectionHarmonizer(section)
+        out.put(("chunk", harmonizer.heading()))
+        received = False
+        try:
+            try:
+                for chunk in self.sentiment_tool.generate_stream(prompt, route=self.route, use_cache=use_cache):
+                    received = True
+                    out.put(("chunk", harmonizer.feed(chunk)))
+                    if stop.is_set():
+                        return
+            except Exception as e:
+                if received:
+                    raise
+                print(f"[SectionedReport] Section {section['number']} stream failed ({e}); retrying")
+                out.put(("chunk", harmonizer.feed(self.sentiment_tool.generate(prompt, route=self.route, use_cache=use_cache))))
+            out.put(("chunk", harmonizer.close()))
+            out.put(("done", time.monotonic() - start))
+        except Exception as e:
+            out.put(("error", e))
+
+    def _futures(self, executor, parts, use_cache):
+        context, sections, footer = parts
+        return [executor.submit(self._section, context, s, sections, footer, use_cache) for s in sections]
+
+    def _log(self, timings, start):
+        print(f"[SectionedReport] {len(timings)} secciones en {time.monotonic() - start:.1f}s "
+              f"(más lenta {max(timings):.1f}s, suma {sum(timings):.1f}s)")
+
+    def generate(self, prompt, title=None, use_cache=True):
+        parts = self._plan(prompt)
+        if parts is None:
+            return self.sentiment_tool.generate(prompt, route=self.route, use_cache=use_cache)
+
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=len(parts[1])) as executor:
+            results = [f.result() for f in self._futures(executor, parts, use_cache)]
+        self._log([seconds for _, seconds in results], start)
+        return stitch_report([text for text, _ in results], title)
+
+    def stream(self, prompt, title=None, use_cache=True):
+        """
+        Yields the report for progressive rendering: the title, then each section's tokens
+        (through SentimentTool.generate_stream, so time to first token is recorded). Sections
+        run concurrently; the first unfinished section streams live while the later ones
+        buffer, so the output stays in order. Raises if a section fails.
+        Without sections, the single request is streamed chunk by chunk.
+        """
+        parts = self._plan(prompt)
+        if parts is None:
+            yield from self.sentiment_tool.generate_stream(prompt, route=self.route, use_cache=use_cache)
+            return
+
+        start = time.monotonic()
+        context, sections, footer = parts
+        if title:
+            yield f"# {title}\n\n"
+        queues = [queue.Queue() for _ in sections]
+        stop = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=len(sections))
+        try:
+            for section, out in zip(sections, queues):
+                executor.submit(self._stream_section, context, section, sections, footer, use_cache, out, stop)
+            timings = []
+            for i, out in enumerate(queues):
+                if i:
+                    yield "\n\n"
+                while True:
+                    kind, value = out.get()
+                    if kind == "error":
+                        raise value
+                    if kind == "done":
+                        timings.append(value)
+                        break
+                    if value:
+                        yield value
+            self._log(timings, start)
+        finally:
+            # A failed or abandoned report stops the sections still streaming
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def stitch_report(section_texts, title=None):
+    report = "\n\n".join(section_texts)
+    return f"# {title}\n\n{report}" if title else report
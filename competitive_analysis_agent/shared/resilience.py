@@ -0,0 +1,310 @@
+import os
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from shared.rate_limiter import is_rate_limit_error, retry_after_seconds
+
+# Global switches; per-call timeouts are set per policy below
+MAX_RETRIES = int(os.getenv("RESILIENCE_MAX_RETRIES", "2"))
+HEDGING_ENABLED = os.getenv("RESILIENCE_HEDGING", "1") == "1"
+MAX_WORKERS = int(os.getenv("RESILIENCE_MAX_WORKERS", "32"))
+
+# Per-call timeout (seconds) of each wrapped call site
+POLICY_TIMEOUTS = {
+    "web_search": 30.0,
+    "web_search_batch": 60.0,
+    "duckduckgo_search": 30.0,
+    "grounded_answer": 60.0,
+    "sentiment": 90.0,
+    "sentiment_batch": 180.0,
+}
+DEFAULT_TIMEOUT = 60.0
+
+# HTTP statuses worth retrying (429 is handled by the rate limiter, not here)
+TRANSIENT_STATUS = {408, 500, 502, 503, 504}
+TRANSIENT_MARKERS = ("UNAVAILABLE", "DEADLINE_EXCEEDED", "INTERNAL", "Connection reset")
+
+# Sync calls run here so they can be timed out and hedged without blocking the caller's thread
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="resilience")
+
+
+def with_timeout(config, timeout):
+    """
+    `config` (a GenerateContentConfig, or None) with `timeout` seconds as its HTTP timeout,
+    so a request abandoned by the policy is cut off by the SDK instead of running on.
+    """
+    from google.genai import types
+    http_options = types.HttpOptions(timeout=max(1, int(timeout * 1000)))
+    if config is None:
+        return types.GenerateContentConfig(http_options=http_options)
+    return config.model_copy(update={"http_options": http_options})
+
+
+def is_transient_error(e):
+    """
+    True for timeouts, connection failures and 5xx answers. Rate-limit errors are excluded:
+    the limiter has already backed off and retried them.
+    """
+    if is_rate_limit_error(e):
+        return False
+    if isinstance(e, (TimeoutError, ConnectionError)):
+        return True
+    if getattr(e, "code", None) in TRANSIENT_STATUS or getattr(e, "status_code", None) in TRANSIENT_STATUS:
+        return True
+    try:
+        import httpx
+        if isinstance(e, httpx.TransportError):
+            return True
+    except ImportError:
+        pass
+    text = str(e)
+    return any(marker in text for marker in TRANSIENT_MARKERS)
+
+
+class ResiliencePolicy:
+    """
+    Per-call timeout, retries with jittered exponential backoff for transient errors, and
+    hedging: once an attempt runs past the observed p95 latency a duplicate request is sent
+    and whichever answers first wins. Hedging starts after `min_samples` successful calls.
+
+    The wrapped function receives the seconds left in the attempt's budget and must pass them
+    on as the request timeout (see with_timeout). Only the attempt itself counts against the
+    budget: neither waiting for a worker of the shared pool nor, with a rate limiter, waiting
+    for a slot or a 429 retry-after uses it up.
+    """
+    def __init__(self, name, timeout=DEFAULT_TIMEOUT, max_retries=MAX_RETRIES, hedge=HEDGING_ENABLED,
+                 hedge_quantile=0.95, min_samples=20, window=200, base_backoff=1.0, max_backoff=20.0):
+        self.name = name
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.min_samples = min_samples
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self._stats = {"calls": 0, "retries": 0, "timeouts": 0, "hedges": 0, "hedge_wins": 0, "failures": 0}
+
+    # --- Latency tracking ---
+
+    def _record_latency(self, seconds):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def latency_quantile(self):
+        """
+        The `hedge_quantile` (p95) of recent successful latencies, or None until `min_samples`.
+        """
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * self.hedge_quantile))]
+
+    def hedge_delay(self):
+        """
+        Seconds to wait before hedging, or None when hedging is off or not yet calibrated.
+        """
+        return self.latency_quantile() if self.hedge else None
+
+    def _backoff(self, attempt):
+        return min(self.max_backoff, self.base_backoff * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+    # --- Sync ---
+
+    def call(self, fn, limiter=None, timeout=None):
+        """
+        Runs `fn(timeout)` under the policy. The final error is re-raised once retries are
+        exhausted. With `limiter` (an AdaptiveRateLimiter) each attempt runs inside one
+        limiter slot, released before the back-off sleep: 429s are retried by the limiter
+        after its back-off, and a hedge is only sent when the limiter has a spare slot right
+        away. `timeout` lowers the per-attempt timeout for this call (e.g. a model route's
+        latency budget).
+        """
+        timeout = min(self.timeout, timeout) if timeout else self.timeout
+        return self._call(fn, limiter, timeout)
+
+    def _call(self, fn, limiter, timeout):
+        self._count("calls")
+        for attempt in range(self.max_retries + 1):
+            try:
+                if limiter is not None:
+                    return limiter.call(lambda: self._hedged(fn, limiter, timeout))
+                return self._hedged(fn, limiter, timeout)
+            except Exception as e:
+                if not is_transient_error(e) or attempt == self.max_retries:
+                    self._count("failures")
+                    raise
+                self._count("retries")
+                print(f"[Resilience:{self.name}] {type(e).__name__}: {e}; retrying (attempt {attempt + 2})")
+                time.sleep(self._backoff(attempt))
+
+    def _submit(self, fn, timeout=None, deadline=None):
+        """
+        Runs `fn` on the shared pool. The attempt's clock starts when a worker picks it up
+        (`future.started`, `future.clock["start"]`), so time queued behind other calls does
+        not use up its budget: `fn` receives `timeout`, or the seconds then left until `deadline`.
+        """
+        started = threading.Event()
+        clock = {}
+
+        def attempt():
+            clock["start"] = start = time.monotonic()
+            started.set()
+            result = fn(timeout if deadline is None else max(0.0, deadline - start))
+            # Abandoned attempts still report their latency, so the p95 is not biased low
+            self._record_latency(time.monotonic() - start)
+            return result
+
+        future = _executor.submit(attempt)
+        future.started, future.clock = started, clock
+        return future
+
+    def _hedged(self, fn, limiter, timeout):
+        primary = self._submit(fn, timeout=timeout)
+        primary.started.wait()
+        deadline = primary.clock["start"] + timeout
+        pending = {primary}
+        delay = self.hedge_delay()
+        if delay is not None and delay < timeout:
+            done, _ = wait(pending, timeout=delay)
+            if not done and _take_hedge_slot(limiter):
+                self._count("hedges")
+                hedge = self._submit(fn, deadline=deadline)
+                if limiter is not None:
+                    hedge.add_done_callback(lambda f: _release_hedge_slot(limiter, f))
+                pending.add(hedge)
+
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    if future is not primary:
+                        self._count("hedge_wins")
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+                error = future.exception()
+        if pending:
+            for other in pending:
+                other.cancel()
+            self._count("timeouts")
+            raise TimeoutError(f"{self.name} exceeded {timeout:.0f}s")
+        raise error
+
+    # --- Async ---
+
+    async def acall(self, coro_fn, limiter=None, timeout=None):
+        """
+        Async counterpart of `call`; `coro_fn(timeout)` returns a fresh coroutine per attempt.
+        """
+        timeout = min(self.timeout, timeout) if timeout else self.timeout
+        return await self._acall(coro_fn, limiter, timeout)
+
+    async def _acall(self, coro_fn, limiter, timeout):
+        self._count("calls")
+        for attempt in range(self.max_retries + 1):
+            try:
+                if limiter is not None:
+                    return await limiter.acall(lambda: self._ahedged(coro_fn, limiter, timeout))
+                return await self._ahedged(coro_fn, limiter, timeout)
+            except Exception as e:
+                if not is_transient_error(e) or attempt == self.max_retries:
+                    self._count("failures")
+                    raise
+                self._count("retries")
+                print(f"[Resilience:{self.name}] {type(e).__name__}: {e}; retrying (attempt {attempt + 2})")
+                await asyncio.sleep(self._backoff(attempt))
+
+    def _astart(self, coro_fn, timeout):
+        start = time.monotonic()
+        task = asyncio.ensure_future(coro_fn(timeout))
+        task.add_done_callback(
+            lambda t: t.cancelled() or t.exception() is not None or self._record_latency(time.monotonic() - start)
+        )
+        return task
+
+    async def _ahedged(self, coro_fn, limiter, timeout):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        primary = self._astart(coro_fn, timeout)
+        pending = {primary}
+        try:
+            delay = self.hedge_delay()
+            if delay is not None and delay < timeout:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                if not done and _take_hedge_slot(limiter):
+                    self._count("hedges")
+                    hedge = self._astart(coro_fn, deadline - loop.time())
+                    if limiter is not None:
+                        hedge.add_done_callback(lambda t: _release_hedge_slot(limiter, t))
+                    pending.add(hedge)
+
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(0.0, deadline - loop.time()), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            if pending:
+                self._count("timeouts")
+                raise TimeoutError(f"{self.name} exceeded {timeout:.0f}s")
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self):
+        p95 = self.latency_quantile()
+        with self._lock:
+            stats = dict(self._stats)
+            stats["samples"] = len(self._latencies)
+        stats["p95_seconds"] = round(p95, 2) if p95 is not None else None
+        return stats
+
+
+def _take_hedge_slot(limiter):
+    # A hedge is extra load: it never waits for quota, it is only sent on a free slot
+    return limiter is None or limiter.try_acquire()
+
+
+def _release_hedge_slot(limiter, future):
+    error = None if future.cancelled() else future.exception()
+    throttled = error is not None and is_rate_limit_error(error)
+    limiter.release(throttled=throttled, delay=retry_after_seconds(error) if throttled else None)
+
+
+# --- Process-wide registry (one latency profile per call site) ---
+_policies = {}
+_registry_lock = threading.Lock()
+
+def get_policy(name):
+    with _registry_lock:
+        if name not in _policies:
+            _policies[name] = ResiliencePolicy(name, timeout=POLICY_TIMEOUTS.get(name, DEFAULT_TIMEOUT))
+        return _policies[name]
+
+def get_resilience_metrics():
+    with _registry_lock:
+        policies = list(_policies.values())
+    return {policy.name: policy.stats() for policy in policies}
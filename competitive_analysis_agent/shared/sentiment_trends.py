@@ -0,0 +1,63 @@
+# Polarity for sentiment labels, used when a run has no per-snippet scores (legacy
+# snapshots, mock results, failed structured answers). Keys are lower-case labels.
+LABEL_POLARITY = {
+    "positivo": 1.0, "positive": 1.0,
+    "negativo": -1.0, "negative": -1.0,
+    "neutro": 0.0, "neutral": 0.0, "mixto": 0.0, "mixed": 0.0,
+}
+LABEL_CONFIDENCE = 0.5
+DEFAULT_TREND_WINDOW = 3
+
+
+def label_polarity(label):
+    """
+    Polarity for a free-text label, or None for unknown labels such as "Error".
+    """
+    return LABEL_POLARITY.get((label or "").strip().lower())
+
+
+def weighted_polarity(scores):
+    """
+    Confidence-weighted mean of (polarity, confidence) pairs, or None when there is no weight.
+    """
+    total = sum(confidence for _, confidence in scores)
+    if not total:
+        return None
+    return sum(polarity * confidence for polarity, confidence in scores) / total
+
+
+def run_polarity(scores):
+    """
+    Per-(entity, run) confidence-weighted polarity from the per-snippet score frame
+    (columns: timestamp, name, polarity, confidence). One vectorized groupby over all history.
+    """
+    frame = scores.assign(weighted=scores["polarity"] * scores["confidence"])
+    grouped = frame.groupby(["name", "timestamp"], sort=True)[["weighted", "confidence"]].sum()
+    grouped = grouped[grouped["confidence"] > 0]
+    return (grouped["weighted"] / grouped["confidence"]).rename("polarity").reset_index()
+
+
+def sentiment_trends(scores, window=DEFAULT_TREND_WINDOW):
+    """
+    Latest polarity per entity with its change against the previous run and against the
+    rolling mean of the last `window` runs. Returns a frame indexed by lower-case entity
+    name with columns: polarity, previous, delta, rolling_mean, delta_rolling, runs.
+    """
+    import pandas as pd
+
+    if scores.empty:
+        return pd.DataFrame(columns=["polarity", "previous", "delta", "rolling_mean", "delta_rolling", "runs"])
+
+    runs = run_polarity(scores.assign(name=scores["name"].str.lower()))
+    by_entity = runs.groupby("name", sort=False)["polarity"]
+    runs["previous"] = by_entity.shift(1)
+    # Rolling mean over the runs before the current one, so the delta compares against history
+    runs["rolling_mean"] = (
+        runs.groupby("name", sort=False)["previous"].rolling(window, min_periods=1).mean().reset_index(level=0, drop=True)
+    )
+    runs["runs"] = by_entity.cumcount() + 1
+
+    latest = runs.groupby("name", sort=False).tail(1).set_index("name")
+    latest["delta"] = latest["polarity"] - latest["previous"]
+    latest["delta_rolling"] = latest["polarity"] - latest["rolling_mean"]
+    return latest[["polarity", "previous", "delta", "rolling_mean", "delta_rolling", "runs"]].round(3)
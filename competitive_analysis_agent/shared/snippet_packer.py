@@ -0,0 +1,121 @@
+import re
+import math
+import hashlib
+
+from shared.visibility import extract_domain
+
+DEFAULT_TOKEN_BUDGET = 1200
+NEAR_DUPLICATE_THRESHOLD = 0.8
+SHINGLE_SIZE = 3
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def estimate_tokens(text):
+    """
+    Local token estimate (no API call): punctuation marks count as one token and words
+    as one token per ~4 characters, which tracks Gemini's tokenizer closely for Spanish prose.
+    """
+    return sum(1 if not piece[0].isalnum() else max(1, math.ceil(len(piece) / 4))
+               for piece in _TOKEN_RE.findall(text or ""))
+
+
+def _words(text):
+    return _WORD_RE.findall((text or "").lower())
+
+
+def _shingles(words):
+    if len(words) < SHINGLE_SIZE:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def _similarity(a, b):
+    # Containment rather than Jaccard: a short slice of a longer snippet counts as a duplicate
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
+
+
+def _relevance(words, snippet, name_words, name):
+    """
+    Higher for snippets that name the entity (full name first, then partial matches),
+    with a small bonus for longer, more informative text.
+    """
+    score = 0.0
+    if name and name.lower() in snippet.lower():
+        score += 2.0
+    if name_words:
+        score += sum(1 for w in name_words if w in words) / len(name_words)
+    return score + min(len(words), 60) / 120
+
+
+def pack_snippets(results, name, max_tokens=DEFAULT_TOKEN_BUDGET, near_threshold=NEAR_DUPLICATE_THRESHOLD):
+    """
+    Selects snippets from search results for an analysis prompt: drops exact and near-duplicate
+    snippets, ranks the rest by relevance to `name` and fills up to `max_tokens`.
+    The best snippet of every source is placed before second snippets from the same source,
+    so trimming to the budget keeps source coverage.
+    Returns (snippets, stats).
+    """
+    stats = {"input": 0, "exact_duplicates": 0, "near_duplicates": 0, "over_budget": 0,
+             "tokens_in": 0, "tokens_out": 0}
+    name_words = _words(name)
+    seen, kept = set(), []
+    for position, r in enumerate(results):
+        snippet = " ".join((r.get('snippet') or "").split())
+        if not snippet:
+            continue
+        stats["input"] += 1
+        stats["tokens_in"] += estimate_tokens(snippet)
+        key = snippet.lower()
+        if key in seen:
+            stats["exact_duplicates"] += 1
+            continue
+        seen.add(key)
+        words = _words(snippet)
+        shingles = _shingles(words)
+        if any(_similarity(shingles, other["shingles"]) >= near_threshold for other in kept):
+            stats["near_duplicates"] += 1
+            continue
+        kept.append({
+            "snippet": snippet,
+            "shingles": shingles,
+            "source": extract_domain(r) or r.get('link') or "",
+            "score": _relevance(words, snippet, name_words, name),
+            "position": position,
+        })
+
+    # Rank: best of each source first, then the remaining snippets, each by relevance
+    ranked = sorted(kept, key=lambda k: (-k["score"], k["position"]))
+    firsts, rest, sources = [], [], set()
+    for k in ranked:
+        (rest if k["source"] in sources else firsts).append(k)
+        sources.add(k["source"])
+
+    packed, used = [], 0
+    for k in firsts + rest:
+        cost = estimate_tokens(k["snippet"]) + 2
+        if used + cost > max_tokens:
+            stats["over_budget"] += 1
+            continue
+        packed.append(k["snippet"])
+        used += cost
+    stats["tokens_out"] = used
+    return packed, stats
+
+
+def snippet_fingerprint(snippets):
+    """
+    Order-independent hash of a snippet set (case and whitespace normalized), used to tell
+    whether an entity's analysed text changed since the last run.
+    """
+    normalized = sorted({" ".join(s.lower().split()) for s in snippets if s})
+    return hashlib.sha256("\n".join(normalized).encode("utf-8")).hexdigest()
+
+
+def describe_packing(stats):
+    return (f"{stats['input']} → {stats['input'] - stats['exact_duplicates'] - stats['near_duplicates'] - stats['over_budget']} snippets "
+            f"({stats['exact_duplicates']} duplicados, {stats['near_duplicates']} casi duplicados, "
+            f"{stats['over_budget']} fuera de presupuesto), ~{stats['tokens_in']} → {stats['tokens_out']} tokens")
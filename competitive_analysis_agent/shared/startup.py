@@ -0,0 +1,80 @@
+import re
+import sys
+import time
+import threading
+import subprocess
+from contextlib import contextmanager
+
+_started = time.monotonic()
+_inits = {}
+_lock = threading.Lock()
+
+# `python -X importtime` line: "import time:  self [us] | cumulative | imported package"
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)\s*$")
+
+
+@contextmanager
+def timed_init(name):
+    """
+    Times the first construction of a lazily built component (chat runner, SDK client, ...)
+    so the cost shows up in the startup metrics instead of being hidden in a request.
+    """
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        seconds = time.monotonic() - start
+        with _lock:
+            _inits[name] = round(seconds, 3)
+        print(f"[Startup] {name} initialized in {seconds:.2f}s")
+
+
+def get_startup_metrics():
+    with _lock:
+        return {
+            "uptime_seconds": round(time.monotonic() - _started, 1),
+            "lazy_init_seconds": dict(_inits),
+        }
+
+
+def import_time_report(module, top=15, cwd=None):
+    """
+    Imports `module` in a fresh interpreter with `-X importtime` and aggregates the
+    self time per top-level package. Returns {"module", "total_ms", "packages": [(name, ms)]},
+    heaviest first; packages that are never imported simply do not appear.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=cwd,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{(proc.stderr.strip().splitlines() or ['?'])[-1]}")
+
+    packages = {}
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        root = match.group(3).split('.')[0]
+        packages[root] = packages.get(root, 0) + int(match.group(1))
+
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+    return {
+        "module": module,
+        "total_ms": round(sum(packages.values()) / 1000, 1),
+        "packages": [(name, round(us / 1000, 1)) for name, us in ranked[:top]],
+    }
+
+
+def format_import_report(report):
+    lines = [f"Import de {report['module']}: {report['total_ms']} ms"]
+    lines += [f"  {name:<30} {ms:>8.1f} ms" for name, ms in report["packages"]]
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # e.g. python -m shared.startup agents.hr_agent.agent (from the agent's root directory)
+    if len(sys.argv) < 2:
+        print("Usage: python -m shared.startup <module> [top]")
+        sys.exit(1)
+    print(format_import_report(import_time_report(sys.argv[1], top=int(sys.argv[2]) if len(sys.argv) > 2 else 15)))
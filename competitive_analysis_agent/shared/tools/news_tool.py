@@ -7,8 +7,9 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 from shared.tools.search_tool import WebSearchTool
 
 class NewsMonitorTool:
-    def __init__(self):
-        self.search_tool = WebSearchTool()
+    def __init__(self, search_tool=None):
+        # Reuse the agent's search tool so both share one cache and its counters
+        self.search_tool = search_tool or WebSearchTool()
 
     def scan_news(self, competitors, days_back=7):
         """
@@ -1,7 +1,14 @@
-import os
 import json
-from google import genai
-from google.genai import types
+
+from services.cache_service import normalize_query
+from shared.genai_client import get_client
+from shared.single_flight import get_single_flight
+from shared.rate_limiter import get_rate_limiter
+from shared.resilience import get_policy, with_timeout
+
+_inflight = get_single_flight("duckduckgo_search")
+_MODEL = "gemini-2.0-flash"
+_policy = get_policy("duckduckgo_search")
 
 def duckduckgo_search(query: str) -> str:
     """
@@ -14,51 +21,52 @@ def duckduckgo_search(query: str) -> str:
     Returns:
         Un string JSON con una lista de resultados, donde cada resultado tiene 'title', 'href' y 'body'.
     """
-    try:
-        use_vertex = os.getenv("GOOGLE_GENAI_USE_VERTEXAI", "0") == "1"
-        if use_vertex:
-            client = genai.Client(
-                vertexai=True,
-                project=os.getenv("GOOGLE_CLOUD_PROJECT"),
-                location=os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1")
-            )
-        else:
-            client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+    # Concurrent identical queries (chat, deep research, analysis threads) share one Gemini call
+    return _inflight.do(normalize_query(query), lambda: _grounded_search(query))
 
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
+def _build_config():
+    from google.genai import types
+    return types.GenerateContentConfig(
+        tools=[types.Tool(google_search=types.GoogleSearch())],
+        temperature=0.2,
+    )
+
+def _grounded_search(query: str) -> str:
+    try:
+        client = get_client()
+        response = _policy.call(lambda timeout: client.models.generate_content(
+            model=_MODEL,
             contents=f"Busca en la web: {query}. Resume los resultados encontrados en español.",
-            config=types.GenerateContentConfig(
-                tools=[types.Tool(google_search=types.GoogleSearch())],
-                temperature=0.2,
-            )
-        )
+            config=with_timeout(_build_config(), timeout)
+        ), limiter=get_rate_limiter(_MODEL))
+        return _build_results(response)
+    except Exception as e:
+        return json.dumps([{"error": str(e)}])
 
-        # Build results from grounding metadata
-        results = []
-        if response.candidates and response.candidates[0].grounding_metadata:
-            gm = response.candidates[0].grounding_metadata
-            if hasattr(gm, 'grounding_chunks') and gm.grounding_chunks:
-                for chunk in gm.grounding_chunks[:5]:
-                    if hasattr(chunk, 'web') and chunk.web:
-                        results.append({
-                            "title": getattr(chunk.web, 'title', '') or "Resultado",
-                            "href": getattr(chunk.web, 'uri', '') or "",
-                            "body": ""
-                        })
+def _build_results(response) -> str:
+    # Build results from grounding metadata
+    results = []
+    if response.candidates and response.candidates[0].grounding_metadata:
+        gm = response.candidates[0].grounding_metadata
+        if hasattr(gm, 'grounding_chunks') and gm.grounding_chunks:
+            for chunk in gm.grounding_chunks[:5]:
+                if hasattr(chunk, 'web') and chunk.web:
+                    results.append({
+                        "title": getattr(chunk.web, 'title', '') or "Resultado",
+                        "href": getattr(chunk.web, 'uri', '') or "",
+                        "body": ""
+                    })
 
-        # If we got results, use the response text to enrich
-        if results and response.text:
-            # Put the full response as body of the first result
-            results[0]["body"] = response.text[:500]
-        elif response.text:
-            # No grounding chunks, but we have text
-            results.append({
-                "title": "Resultado de búsqueda",
-                "href": "",
-                "body": response.text[:500]
-            })
+    # If we got results, use the response text to enrich
+    if results and response.text:
+        # Put the full response as body of the first result
+        results[0]["body"] = response.text[:500]
+    elif response.text:
+        # No grounding chunks, but we have text
+        results.append({
+            "title": "Resultado de búsqueda",
+            "href": "",
+            "body": response.text[:500]
+        })
 
-        return json.dumps(results, ensure_ascii=False)
-    except Exception as e:
-        return json.dumps([{"error": str(e)}])
+    return json.dumps(results, ensure_ascii=False)
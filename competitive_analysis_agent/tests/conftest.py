@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the deployment's packages (agents, services, shared) from its root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+@pytest.fixture(autouse=True)
+def isolated_workdir(tmp_path, monkeypatch):
+    """
+    Every test runs in an empty directory (the SQLite databases are relative to the working
+    dir) with the search and LLM caches disabled.
+    """
+    import services.cache_service as cache_service
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("SEARCH_CACHE_ENABLED", "0")
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "0")
+    monkeypatch.setattr(cache_service, "_llm_cache", None)
+    return tmp_path
@@ -0,0 +1,104 @@
+import asyncio
+import copy
+import threading
+
+import agents.domain_agent.agent as agent_module
+
+from agents.domain_agent.agent import load_profile
+from agents.hr_agent.agent import HRAgent
+from services.db_service import DatabaseService
+
+
+def offline_agent(leaders=(), competitors=()):
+    """
+    HRAgent for "Acme" with canned searches, one-by-one analysis that never reaches the model,
+    and `leaders` as the detected market leaders.
+    """
+    config = copy.deepcopy(load_profile("hr"))
+    config["my_company"] = {"name": "Acme"}
+    config["competitors"] = [{"name": name} for name in competitors]
+    config["analysis_settings"]["batch_analysis"] = False
+    config["analysis_settings"]["incremental_analysis"] = False
+    agent = HRAgent(config=config, db=DatabaseService("test.db"))
+
+    def search_batch(queries, num_results=3, strict=False):
+        return {q: [{"title": q, "link": f"https://example.com/{i}", "snippet": f"{q}: resultado"}] for i, q in enumerate(queries)}
+
+    async def asearch_batch(queries, num_results=3, strict=False):
+        return search_batch(queries, num_results, strict)
+
+    async def aanalyze_structured(prompt, schema, **kwargs):
+        return None
+
+    agent.search_tool.search_batch = search_batch
+    agent.search_tool.asearch_batch = asearch_batch
+    agent.sentiment_tool.analyze_structured = lambda prompt, schema, **kwargs: None
+    agent.sentiment_tool.aanalyze_structured = aanalyze_structured
+    agent._detect_leaders = lambda prompt, max_name_length=40: list(leaders)
+    return agent
+
+
+def test_targets_are_unique_including_my_company():
+    agent = offline_agent(leaders=["acme", "Beta", "Gamma"], competitors=["Beta"])
+    df = agent.run_analysis(extra_competitors=["ACME", "beta"])
+
+    assert list(df["Entidad"]) == ["Acme", "Beta", "Gamma"]
+    assert df.loc[df["Entidad"] == "Acme", "Tipo"].item() == "Propia"
+    run = agent.db.get_run(df.attrs["run_id"])
+    assert run["status"] == "completed"
+    assert run["done"] == len(run["targets"]) == 3
+
+
+def test_resume_runs_leader_detection_that_never_finished():
+    agent = offline_agent(leaders=["Beta"])
+    # A run created for overlapped detection that crashed before the leaders were stored
+    run_id, targets, _, leaders_pending = agent._start_run(None, None, print, detect_leaders=False)
+    assert leaders_pending and [t["name"] for t in targets] == ["Acme"]
+
+    df = agent.run_analysis(run_id=run_id)
+
+    assert list(df["Entidad"]) == ["Acme", "Beta"]
+    run = agent.db.get_run(run_id)
+    assert run["leaders_done"] and run["status"] == "completed"
+
+
+def test_run_without_rows_assembles_to_an_empty_frame():
+    agent = offline_agent()
+    agent.db.create_run("empty", [{"name": "Acme"}])
+
+    df = agent.assemble_run("empty")
+
+    assert df.empty and df.attrs["run_id"] == "empty"
+
+
+def test_async_run_persists_entities_off_the_event_loop():
+    agent = offline_agent(leaders=["Beta"])
+    finalize = agent._finalize_checkpoint
+    threads = []
+
+    def recording_finalize(*args):
+        threads.append(threading.current_thread())
+        return finalize(*args)
+
+    agent._finalize_checkpoint = recording_finalize
+    df = asyncio.run(agent.run_analysis_async())
+
+    assert list(df["Entidad"]) == ["Acme", "Beta"]
+    assert len(threads) == 2 and threading.main_thread() not in threads
+
+
+def test_snippets_are_packed_once_per_entity(monkeypatch):
+    agent = offline_agent(competitors=["Beta"])
+    agent.config["analysis_settings"]["batch_analysis"] = True
+    agent.config["analysis_settings"]["incremental_analysis"] = True
+    packed = []
+
+    def pack_snippets(results, name, **kwargs):
+        packed.append(name)
+        return pack(results, name, **kwargs)
+
+    pack = agent_module.pack_snippets
+    monkeypatch.setattr(agent_module, "pack_snippets", pack_snippets)
+    agent.run_analysis()
+
+    assert sorted(packed) == ["Acme", "Beta"]
@@ -0,0 +1,24 @@
+import pytest
+
+from api import app as api
+
+
+@pytest.fixture
+def client():
+    api.app.config["TESTING"] = True
+    yield api.app.test_client()
+    api.state.is_running = False
+    if api._engine is not None:
+        api._engine.close()
+        api._engine = None
+
+
+def test_hr_endpoints_share_one_state(client):
+    api._get_engine()
+    assert api.domain_states["hr"] is api.state
+
+    assert api.state.start()
+    assert not api.state.start()
+    assert client.post("/api/v1/analyze").status_code == 409
+    assert client.post("/api/v1/domains/hr/analyze").status_code == 409
+    assert client.get("/api/v1/domains/hr/status").get_json()["is_running"]
@@ -0,0 +1,126 @@
+import itertools
+
+import pytest
+
+import services.cache_service as cache_service
+import shared.tools.sentiment_tool as sentiment_module
+from services.cache_service import LLMResponseCache, SearchCache, classify_query
+from shared.model_router import ModelRouter
+from shared.tools.sentiment_tool import SentimentTool, SentimentTopic
+
+VALID = '{"sentimiento": "Positivo", "tema": "Precio"}'
+RESULTS = [{"title": "Acme", "link": "https://example.com/a", "snippet": "Acme crece."}]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Strictly increasing time.time(), so last_access orders every write and read
+    ticks = itertools.count(1_000_000)
+    monkeypatch.setattr(cache_service.time, "time", lambda: next(ticks))
+
+
+def test_search_cache_normalizes_queries_and_expires_per_family():
+    cache = SearchCache(db_path="search.db", ttls={"news": 0})
+    cache.set("Acme  Opiniones", 3, "m", RESULTS)
+    cache.set("Acme noticias", 3, "m", RESULTS)
+
+    assert classify_query("Acme noticias") == "news" and classify_query("Acme opiniones") == "profile"
+    assert cache.get(" acme opiniones ", 3, "m") == RESULTS
+    assert cache.get("Acme opiniones", 5, "m") is None
+    assert cache.get("Acme noticias", 3, "m") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expired"], stats["size"]) == (1, 2, 1, 1)
+
+
+def test_search_cache_evicts_the_least_recently_used_entry(clock):
+    cache = SearchCache(db_path="search.db", max_entries=2)
+    cache.set("a", 3, "m", RESULTS)
+    cache.set("b", 3, "m", RESULTS)
+    cache.get("a", 3, "m")
+    cache.set("c", 3, "m", RESULTS)
+
+    assert cache.get("b", 3, "m") is None
+    assert cache.get("a", 3, "m") == cache.get("c", 3, "m") == RESULTS
+    assert cache.stats()["evictions"] == 1
+
+
+def test_llm_cache_evicts_by_bytes_in_lru_order(clock):
+    cache = LLMResponseCache(db_path="llm.db", max_bytes=10)
+    cache.set("m", "a", "12345")
+    cache.set("m", "b", "67890")
+    cache.get("m", "a")
+    cache.set("m", "c", "abcde")
+
+    assert cache.get("m", "b") is None
+    assert cache.get("m", "a") == "12345" and cache.get("m", "c") == "abcde"
+    assert cache.stats()["bytes"] == 10
+
+
+def test_llm_cache_keys_on_the_config_and_expires_per_caller():
+    from google.genai import types
+    cache = LLMResponseCache(db_path="llm.db", ttls={"report": 0})
+    config = types.GenerateContentConfig(temperature=0.0)
+    cache.set("m", "p", "classification", config, caller="classification")
+    cache.set("m", "p", "report", caller="report")
+
+    assert cache.get("m", "p", config) == "classification"
+    assert cache.get("m", "p", types.GenerateContentConfig(temperature=0.5)) is None
+    assert cache.get("m", "p") is None
+
+
+def test_llm_cache_bypassed_callers_are_counted():
+    cache = LLMResponseCache(db_path="llm.db", bypass=["report"])
+    assert not cache.active_for("report")
+    assert cache.active_for("classification")
+    assert cache.stats()["bypassed"] == 1
+    assert not LLMResponseCache(db_path="llm.db", enabled=False).active_for("classification")
+
+
+class Answer:
+    def __init__(self, text):
+        self.text = text
+
+
+class ScriptedModels:
+    """
+    genai `client.models` answering with `answers[model]`, counting the calls per model.
+    """
+    def __init__(self, answers):
+        self.answers = answers
+        self.calls = {}
+
+    def generate_content(self, *, model, contents, config=None):
+        self.calls[model] = self.calls.get(model, 0) + 1
+        return Answer(self.answers[model])
+
+
+@pytest.fixture
+def structured_tool(monkeypatch):
+    def build(answers):
+        models = ScriptedModels(answers)
+        monkeypatch.setattr(sentiment_module, "get_client", lambda **_: type("Client", (), {"models": models})())
+        cache = LLMResponseCache(db_path="llm.db")
+        return SentimentTool(project_id="test", router=ModelRouter(), cache=cache), models
+    return build
+
+
+def test_answers_failing_validation_are_not_cached(structured_tool):
+    flash, pro = ModelRouter().models("classification")
+    tool, models = structured_tool({flash: "no es JSON", pro: VALID})
+    config = tool._schema_config(SentimentTopic)
+
+    assert tool.analyze_structured("Acme", SentimentTopic).tema == "Precio"
+    assert tool.cache.get(flash, "Acme", config) is None
+    assert tool.cache.get(pro, "Acme", config) == VALID
+
+
+def test_cached_answer_failing_validation_is_dropped_and_requested_again(structured_tool):
+    flash, _ = ModelRouter().models("classification")
+    tool, models = structured_tool({flash: VALID})
+    config = tool._schema_config(SentimentTopic)
+    tool.cache.set(flash, "Acme", "no es JSON", config, caller="classification")
+
+    assert tool.analyze_structured("Acme", SentimentTopic).tema == "Precio"
+    assert models.calls == {flash: 1}
+    assert tool.cache.get(flash, "Acme", config) == VALID
+    assert tool.cache.stats()["rejected"] == 1
@@ -0,0 +1,115 @@
+import json
+from datetime import datetime, timedelta
+
+from agents.domain_agent.agent import DomainAgent, DomainEngine, PROFILE_ATTRIBUTES, load_profiles
+from agents.hr_agent.agent import HRAgent
+from services.db_service import DatabaseService
+from shared.visibility import SCORE_VERSION
+
+
+def test_every_profile_defines_the_domain_specifics():
+    profiles = load_profiles()
+    assert set(profiles) == {"hr", "fin", "payroll", "bpo"}
+    for domain, profile in profiles.items():
+        assert profile["domain"] == domain
+        assert all(key in profile for key in PROFILE_ATTRIBUTES)
+        assert {"BATCH_ANALYSIS_PROMPT", "MULTI_ENTITY_ANALYSIS_PROMPT", "CODI_REPORT_PROMPT"} <= set(profile["prompts"])
+        assert profile["my_company"]["name"]
+        # Every profile documents the same pipeline settings
+        assert set(profile["analysis_settings"]) >= set(profiles["hr"]["analysis_settings"]) - {"brand24_metrics", "search_keywords"}
+
+
+def test_deployment_agent_reads_its_profile():
+    agent = HRAgent()
+    assert isinstance(agent, DomainAgent)
+    assert agent.config["domain"] == "hr"
+    assert agent._search_queries("Acme")[0].startswith("Acme ")
+    assert agent._prompt("CODI_REPORT_PROMPT") == agent.config["prompts"]["CODI_REPORT_PROMPT"]
+    assert agent.db.db_path == agent.config["db_path"]
+
+
+def test_agent_uses_the_same_database_as_the_engine():
+    engine = DomainEngine()
+    try:
+        fin = DomainAgent(config=engine.profiles["fin"])
+        assert fin.db.db_path == engine.agent("fin").db.db_path == "fin_agent_data.db"
+    finally:
+        engine.close()
+
+
+def test_engine_shares_tools_and_pools_but_not_databases():
+    engine = DomainEngine()
+    try:
+        fin, bpo = engine.agent("fin"), engine.agent("bpo")
+        assert fin is engine.agent("fin")
+        assert fin.search_tool is bpo.search_tool and fin.sentiment_tool is bpo.sentiment_tool
+        assert fin.stage_pools is bpo.stage_pools
+        assert fin.db.db_path != bpo.db.db_path
+        assert fin.leader_prompt != bpo.leader_prompt
+    finally:
+        engine.close()
+
+
+def _unchanged_entity(agent):
+    entity = {"name": "Acme", "search_results": [
+        {"title": "Acme", "link": "https://example.com/a", "snippet": "Acme lanza una nueva plataforma de nómina."},
+        {"title": "Acme", "link": "https://example.com/b", "snippet": "Clientes de Acme critican el soporte."},
+    ]}
+    agent._check_unchanged(entity)
+    assert "carried_forward" not in entity
+    return entity
+
+
+def test_carried_forward_rows_do_not_extend_the_analysis_age():
+    agent = HRAgent(db=DatabaseService("test.db"))
+    entity = _unchanged_entity(agent)
+    now = datetime.now()
+    agent.db.save_competitor_snapshot("Acme", 40, "Positivo", "Producto", polarity=0.5,
+                                      timestamp=now - timedelta(days=8), fingerprint=entity["fingerprint"])
+    agent.db.save_competitor_snapshot("Acme", 40, "Positivo", "Producto", polarity=0.5,
+                                      timestamp=now - timedelta(days=1), fingerprint=entity["fingerprint"], carried_forward=True)
+
+    agent._check_unchanged(entity)
+    assert "carried_forward" not in entity
+
+
+def test_carried_forward_copies_the_per_snippet_scores():
+    agent = HRAgent(db=DatabaseService("test.db"))
+    entity = _unchanged_entity(agent)
+    timestamp = datetime.now() - timedelta(days=1)
+    scores = {1: (0.8, 0.9), 2: (-0.4, 0.6)}
+    agent.db.save_competitor_snapshot("Acme", 40, "Mixto", "Soporte", polarity=0.3, timestamp=timestamp,
+                                      fingerprint=entity["fingerprint"])
+    agent.db.save_sentiment_scores("Acme", scores, timestamp=timestamp)
+
+    agent._check_unchanged(entity)
+    assert entity["carried_forward"] == ("Mixto", "Soporte", scores)
+
+
+def test_visibility_delta_skips_snapshots_on_the_old_scale():
+    agent = HRAgent(db=DatabaseService("test.db"))
+    results = [{"title": "elpais.com", "link": "https://elpais.com/acme", "snippet": "Acme crece."}]
+    # Legacy rows scored results x 100
+    agent.db.save_competitor_snapshot("Acme", 300, "Positivo", "Producto")
+    assert agent._score_visibility("Acme", results)["delta"] is None
+
+    score = agent._score_visibility("Acme", results)["score"]
+    agent.db.save_competitor_snapshot("Acme", score - 10, "Positivo", "Producto", visibility_version=SCORE_VERSION)
+    assert agent._score_visibility("Acme", results)["delta"] == 10
+
+
+def test_batch_scores_are_stored_by_snippet_number_and_range_checked():
+    agent = HRAgent(db=DatabaseService("test.db"))
+    entity = _unchanged_entity(agent)
+    entity.update(type_label="Propia", vis_score=40, logs=[])
+    answer = json.dumps({"entities": [{"entity_id": 0, "sentimiento": "Mixto", "tema": "Soporte", "fragmentos": [
+        {"indice": 2, "polaridad": -0.5, "confianza": 0.8},
+        {"indice": 1, "polaridad": 0.9, "confianza": 0.7},
+        {"indice": 2, "polaridad": 0.3, "confianza": 0.9},
+        {"indice": 7, "polaridad": 1.0, "confianza": 1.0},
+    ]}]})
+    analysis = agent.sentiment_tool._handle_batch_response([("Acme", "")], answer)["Acme"]
+
+    assert not agent._finalize_entity(entity, analysis)["error"]
+    snapshot = agent.db.get_latest_scored_snapshot("Acme")
+    assert agent.db.get_sentiment_scores("Acme", snapshot["timestamp"]) == {1: (0.9, 0.7), 2: (-0.5, 0.8)}
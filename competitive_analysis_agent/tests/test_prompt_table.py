@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+from shared.prompt_table import describe_serialization, serialize_table
+
+
+def _df():
+    return pd.DataFrame([
+        {"Entidad": "Acme", "Tipo": "Propia", "Sentimiento": "Positivo", "Visibilidad": 40.25,
+         "Fuente_Top": "https://www.elpais.com/economia/acme.html", "Notas": None},
+        {"Entidad": "Beta", "Tipo": "Competidor", "Sentimiento": "Positivo", "Visibilidad": 25.0,
+         "Fuente_Top": "https://vertexaisearch.cloud.google.com/grounding-api-redirect/x", "Notas": None},
+        {"Entidad": "Gamma", "Tipo": "Competidor", "Sentimiento": "Negativo", "Visibilidad": 10.0,
+         "Fuente_Top": "No Web Results", "Notas": None},
+    ])
+
+
+def test_csv_is_compact_and_drops_empty_columns():
+    text, stats = serialize_table(_df(), abbreviate=False)
+
+    assert text.splitlines() == [
+        "Entidad,Tipo,Sentimiento,Visibilidad,Fuente_Top",
+        "Acme,Propia,Positivo,40.2,elpais.com",
+        "Beta,Competidor,Positivo,25,",
+        "Gamma,Competidor,Negativo,10,",
+    ]
+    assert stats["dropped_columns"] == ["Notas"]
+    assert stats["tokens_out"] < stats["tokens_in"]
+    assert "sin Notas" in describe_serialization(stats)
+
+
+def test_repeated_categories_are_abbreviated_with_a_legend():
+    df = pd.concat([_df()] * 3, ignore_index=True)
+    text, stats = serialize_table(df)
+
+    assert "Tipo: Com=Competidor, Pro=Propia" in text
+    # Codes for Sentimiento would save fewer tokens than its legend line costs
+    assert text.splitlines()[1].startswith("Acme,Pro,Positivo,")
+    assert stats["abbreviated_columns"] == ["Tipo"]
+
+
+def test_markdown_format_and_unknown_formats():
+    text, _ = serialize_table(_df(), fmt="markdown", abbreviate=False)
+    assert text.splitlines()[:2] == ["| Entidad | Tipo | Sentimiento | Visibilidad | Fuente_Top |", "|---|---|---|---|---|"]
+    with pytest.raises(ValueError):
+        serialize_table(_df(), fmt="json")
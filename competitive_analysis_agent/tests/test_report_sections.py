@@ -0,0 +1,110 @@
+import pandas as pd
+import pytest
+
+import shared.tools.sentiment_tool as sentiment_module
+from agents.hr_agent.agent import HRAgent
+from services.db_service import DatabaseService
+from shared.model_router import ModelRouter
+from shared.report_sections import SectionedReport, harmonize_section
+from shared.tools.sentiment_tool import SentimentTool
+
+PROMPT = """Contexto del cliente y datos.
+
+### ESTRUCTURA OBLIGATORIA
+#### 1. Resumen Ejecutivo
+Resume la posición competitiva.
+#### 2. Riesgos
+Enumera los riesgos.
+
+**Formato:** Markdown.
+"""
+
+ANSWERS = {
+    "1": "```markdown\n## 1. Resumen Ejecutivo\n\nLa empresa lidera el mercado.\n\n# Detalle\nCrece un 10%.\n```",
+    "2": "**2. Riesgos**\n- Precio\n- Soporte\n\n",
+}
+
+
+class Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModels:
+    """
+    genai `client.models` answering each section prompt with ANSWERS, streamed in small chunks.
+    Sections listed in `failing` raise on streaming, and also on plain generation if `hard`.
+    """
+    def __init__(self, failing=(), hard=False):
+        self.failing = failing
+        self.hard = hard
+
+    def _section(self, contents):
+        return next(n for n in ANSWERS if f'la sección "{n}.' in contents)
+
+    def generate_content_stream(self, *, model, contents, config=None):
+        number = self._section(contents)
+        if number in self.failing:
+            raise ConnectionError("stream reset")
+        text = ANSWERS[number]
+        return (Chunk(text[i:i + 8]) for i in range(0, len(text), 8))
+
+    def generate_content(self, *, model, contents, config=None):
+        number = self._section(contents)
+        if number in self.failing and self.hard:
+            raise ConnectionError("unavailable")
+        return Chunk(ANSWERS[number])
+
+
+class FakeClient:
+    def __init__(self, **kwargs):
+        self.models = FakeModels(**kwargs)
+
+
+@pytest.fixture
+def sentiment_tool(monkeypatch):
+    def build(**kwargs):
+        client = FakeClient(**kwargs)
+        monkeypatch.setattr(sentiment_module, "get_client", lambda **_: client)
+        return SentimentTool(project_id="test", router=ModelRouter())
+    return build
+
+
+def test_stream_forwards_section_tokens_and_matches_generate(sentiment_tool):
+    tool = sentiment_tool()
+    report = SectionedReport(tool)
+
+    chunks = list(report.stream(PROMPT, title="Informe"))
+
+    assert len(chunks) > 6
+    assert "".join(chunks) == report.generate(PROMPT, title="Informe")
+    assert len(tool.router._first_token[("report", tool.router.models("report")[0])]) == 2
+    assert "".join(chunks) == (
+        "# Informe\n\n## 1. Resumen Ejecutivo\n\nLa empresa lidera el mercado.\n\n### Detalle\nCrece un 10%."
+        "\n\n## 2. Riesgos\n\n- Precio\n- Soporte"
+    )
+
+
+def test_harmonize_section_matches_the_streamed_text():
+    section = {"number": "2", "title": "Riesgos"}
+    assert harmonize_section(section, ANSWERS["2"]) == "## 2. Riesgos\n\n- Precio\n- Soporte"
+
+
+def test_section_stream_failing_before_its_first_chunk_is_retried(sentiment_tool):
+    report = SectionedReport(sentiment_tool(failing=("2",)))
+    assert "".join(report.stream(PROMPT)).endswith("## 2. Riesgos\n\n- Precio\n- Soporte")
+
+
+def test_failed_section_fails_the_report_and_is_not_saved(sentiment_tool):
+    agent = HRAgent(db=DatabaseService("test.db"))
+    agent.sentiment_tool = sentiment_tool(failing=("2",), hard=True)
+    agent.db.save_prompt("CODI_REPORT_PROMPT", PROMPT)
+    df = pd.DataFrame([{"Entidad": "Acme", "Tipo": "Propia", "Visibilidad": 40}])
+
+    streamed = "".join(agent.generate_codi_report_stream(df))
+
+    assert "Error generating CODI report" in streamed
+    assert "no disponible" not in streamed
+    assert agent.db.get_history() == []
+    assert agent.generate_codi_report(df).startswith("Error generating CODI report")
+    assert agent.db.get_history() == []
@@ -0,0 +1,204 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+import shared.cassette as cassette_module
+import shared.resilience as resilience_module
+import shared.tools.sentiment_tool as sentiment_module
+from shared.cassette import Cassette
+from shared.model_router import ModelRouter
+from shared.prompt_table import serialize_table
+from shared.rate_limiter import AdaptiveRateLimiter, RateLimitError
+from shared.resilience import ResiliencePolicy, with_timeout
+from shared.tools.search_tool import WebSearchTool
+from shared.tools.sentiment_tool import SentimentTool
+
+
+class QuotaError(Exception):
+    code = 429
+
+
+class FakeModels:
+    """
+    Stands in for genai `client.models`: records every call and raises `error` if set.
+    """
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = []
+
+    def generate_content(self, *, model, contents, config=None):
+        self.calls.append(config)
+        if self.error:
+            raise self.error
+        raise AssertionError("unexpected successful call")
+
+
+class FakeClient:
+    def __init__(self, error=None):
+        self.models = FakeModels(error)
+
+
+def fast_search_tool(monkeypatch, client):
+    # No retries or back-off, and a private limiter so its pauses don't leak into other tests
+    tool = WebSearchTool()
+    monkeypatch.setattr(tool, "_get_client", lambda: client)
+    monkeypatch.setattr(tool, "_limiter", AdaptiveRateLimiter("test", max_retries=0))
+    for attr in ("_policy", "_batch_policy"):
+        monkeypatch.setattr(tool, attr, ResiliencePolicy(attr, timeout=getattr(tool, attr).timeout, max_retries=0, hedge=False))
+    return tool
+
+
+def test_rate_limit_waits_do_not_count_against_the_timeout():
+    limiter = AdaptiveRateLimiter("test", rpm=6000, max_retries=2)
+    policy = ResiliencePolicy("test", timeout=0.2, hedge=False)
+    calls = []
+
+    def fn(timeout):
+        calls.append(timeout)
+        # The retry-after alone outlasts the policy timeout
+        raise QuotaError("429 RESOURCE_EXHAUSTED retryDelay: '0.3s'")
+
+    start = time.monotonic()
+    with pytest.raises(RateLimitError):
+        policy.call(fn, limiter=limiter)
+    assert len(calls) == limiter.max_retries + 1
+    assert time.monotonic() - start >= 0.6
+    assert policy.stats()["timeouts"] == 0
+
+
+def test_each_attempt_receives_its_budget_as_http_timeout():
+    policy = ResiliencePolicy("test", timeout=5.0, hedge=False)
+    assert policy.call(lambda timeout: with_timeout(None, timeout)).http_options.timeout == 5000
+
+
+def test_call_timeout_lowers_the_policy_timeout():
+    policy = ResiliencePolicy("test", timeout=5.0, max_retries=0, hedge=False)
+    assert policy.call(lambda timeout: timeout, timeout=2.0) == 2.0
+    assert policy.call(lambda timeout: timeout, timeout=30.0) == 5.0
+
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        policy.call(lambda timeout: time.sleep(0.5), timeout=0.1)
+    assert time.monotonic() - start < 0.4
+
+
+def test_time_queued_for_a_worker_does_not_count_against_the_timeout(monkeypatch):
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(resilience_module, "_executor", pool)
+    policy = ResiliencePolicy("test", timeout=0.2, max_retries=0, hedge=False)
+
+    pool.submit(time.sleep, 0.4)
+    assert policy.call(lambda timeout: timeout) == 0.2
+    pool.shutdown()
+
+
+def test_limiter_slot_is_released_during_the_retry_backoff(monkeypatch):
+    limiter = AdaptiveRateLimiter("test", max_retries=0)
+    policy = ResiliencePolicy("test", timeout=5.0, max_retries=1, hedge=False)
+    in_flight = []
+    monkeypatch.setattr(policy, "_backoff", lambda attempt: 0.0)
+    monkeypatch.setattr(resilience_module.time, "sleep", lambda seconds: in_flight.append(limiter._in_flight))
+    attempts = []
+
+    def fn(timeout):
+        attempts.append(limiter._in_flight)
+        if len(attempts) == 1:
+            raise ConnectionError("reset")
+        return "ok"
+
+    assert policy.call(fn, limiter=limiter) == "ok"
+    assert attempts == [1, 1] and in_flight == [0]
+
+
+class Answer:
+    def __init__(self, text):
+        self.text = text
+
+
+class BudgetModels:
+    """
+    genai `client.models` that records the HTTP timeout (ms) of each request.
+    """
+    def __init__(self):
+        self.timeouts = []
+
+    def generate_content(self, *, model, contents, config=None):
+        self.timeouts.append(config.http_options.timeout)
+        if config.response_schema is not None:
+            return Answer('{"entities": [{"entity_id": 0, "sentimiento": "Positivo", "tema": "Precio"}]}')
+        return Answer("Positivo")
+
+    def generate_content_stream(self, *, model, contents, config=None):
+        self.timeouts.append(config.http_options.timeout)
+        return iter([Answer("Informe")])
+
+
+def test_route_latency_budgets_are_the_request_timeouts(monkeypatch):
+    models = BudgetModels()
+    monkeypatch.setattr(sentiment_module, "get_client", lambda **_: type("Client", (), {"models": models})())
+    router = ModelRouter()
+    tool = SentimentTool(project_id="test", router=router)
+
+    tool.analyze("Acme crece")
+    tool.analyze_batch([("Acme", "Acme crece")], "{entities}")
+    tool.generate("Informe")
+    list(tool.generate_stream("Informe en streaming"))
+
+    assert models.timeouts == [
+        router.latency_budget(route) * 1000 for route in ("classification", "batch_classification", "report", "report")
+    ]
+
+
+def test_search_surfaces_timeouts_instead_of_mock_data(monkeypatch):
+    client = FakeClient(TimeoutError("web_search exceeded 30s"))
+    tool = fast_search_tool(monkeypatch, client)
+
+    with pytest.raises(TimeoutError):
+        tool.search("Acme opiniones", strict=True)
+    assert tool.search("Acme opiniones") == []
+    assert client.models.calls[0].http_options.timeout == 30000
+
+
+def test_batch_search_surfaces_rate_limit_errors(monkeypatch):
+    tool = fast_search_tool(monkeypatch, FakeClient(RateLimitError("quota exhausted")))
+
+    with pytest.raises(RateLimitError):
+        tool.search_batch(["Acme opiniones", "Acme noticias"], strict=True)
+
+
+def test_cassette_key_ignores_the_http_timeout():
+    from google.genai import types
+    config = types.GenerateContentConfig(temperature=0.0)
+    assert Cassette.make_key("generate_content", "m", "hola", config) == \
+        Cassette.make_key("generate_content", "m", "hola", with_timeout(config, 12.5))
+
+
+def _codi_contents(trend, date, fmt):
+    df = pd.DataFrame([
+        {"Entidad": "Acme", "Visibilidad": 40, "Sentimiento": "Positivo", "Tendencia_Polaridad": trend},
+        {"Entidad": "Beta", "Visibilidad": 25, "Sentimiento": "Negativo", "Tendencia_Polaridad": -trend if trend else trend},
+    ])
+    table, _ = serialize_table(df, fmt=fmt)
+    return f"Informe para Acme, fecha {date}.\n\n{table}\n\nRedacta el informe."
+
+
+@pytest.mark.parametrize("fmt", ["csv", "markdown"])
+def test_cassette_key_ignores_the_report_date_and_history_columns(fmt):
+    recorded = Cassette.make_key("generate_content", "m", _codi_contents(0.2, "01-03-2026", fmt))
+    assert Cassette.make_key("generate_content", "m", _codi_contents(-0.35, "18-10-2026", fmt)) == recorded
+    # Without history the column is left out of the table altogether
+    assert Cassette.make_key("generate_content", "m", _codi_contents(None, "18-10-2026", fmt)) == recorded
+    assert Cassette.make_key("generate_content", "m", _codi_contents(0.2, "01-03-2026", fmt).replace("Acme", "Gamma")) != recorded
+
+
+def test_sentiment_tool_is_enabled_when_replaying_without_a_project(monkeypatch, tmp_path):
+    cassette_path = tmp_path / "genai.jsonl"
+    cassette_path.write_text("")
+    monkeypatch.delenv("GOOGLE_CLOUD_PROJECT", raising=False)
+    monkeypatch.setattr(cassette_module, "_configured", True)
+    monkeypatch.setattr(cassette_module, "_cassette", Cassette(str(cassette_path), mode="replay"))
+
+    assert SentimentTool().enabled
+
@@ -0,0 +1,47 @@
+import json
+
+from shared.tools.search_tool import WebSearchTool
+
+
+def _grounded_response(text, chunks):
+    from google.genai import types
+    return types.GenerateContentResponse(candidates=[types.Candidate(
+        content=types.Content(role="model", parts=[types.Part(text=text)]),
+        grounding_metadata=types.GroundingMetadata(grounding_chunks=[
+            types.GroundingChunk(web=types.GroundingChunkWeb(uri=uri, title=title)) for uri, title in chunks
+        ]),
+    )])
+
+
+def test_batch_links_come_from_the_grounding_chunks():
+    redirect = "https://vertexaisearch.cloud.google.com/grounding-api-redirect/abc"
+    answer = json.dumps({"queries": [
+        {"query_id": 0, "results": [
+            {"title": "Acme crece", "link": "https://elpais.com/economia/acme.html", "snippet": "Acme crece."},
+            {"title": "Inventado", "link": "https://no-existe.example/acme", "snippet": "Acme opina."},
+        ]},
+        {"query_id": 1, "results": [{"title": "Vacía", "link": "https://otro.example/x", "snippet": ""}]},
+    ]})
+    response = _grounded_response(answer, [(redirect, "elpais.com")])
+
+    results = WebSearchTool()._handle_batch_response([("Acme noticias", 3), ("Acme foros", 3)], response)
+
+    assert results == {"Acme noticias": [
+        {"title": "elpais.com", "link": redirect, "snippet": "Acme crece."},
+        {"title": "Inventado", "link": "", "snippet": "Acme opina."},
+    ]}
+
+
+def test_summaries_are_matched_to_their_grounding_chunk():
+    redirect = "https://vertexaisearch.cloud.google.com/grounding-api-redirect/"
+    answer = json.dumps({"results": [
+        {"title": "Expansión", "link": "https://www.expansion.com/acme.html", "snippet": "Acme ficha a un CEO."},
+        {"title": "El País", "link": "https://elpais.com/economia/acme.html", "snippet": "Acme crece."},
+    ]})
+    chunks = [(redirect + "a", "elpais.com"), (redirect + "b", "expansion.com"), (redirect + "c", "cincodias.com")]
+
+    results = WebSearchTool()._parse_response(_grounded_response(answer, chunks), 3)
+
+    assert [r["snippet"] for r in results[:2]] == ["Acme crece.", "Acme ficha a un CEO."]
+    # No summary for the third source: it falls back to the answer text
+    assert results[2]["snippet"] == answer[:200]
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from shared.single_flight import SingleFlight
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.01)
+
+
+def test_do_runs_one_call_per_key_and_hands_out_copies():
+    group = SingleFlight("test")
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait()
+        return [{"title": "Acme"}]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(group.do("acme", fn))) for _ in range(3)]
+    threads[0].start()
+    _wait_for(lambda: calls)
+    for t in threads[1:]:
+        t.start()
+    _wait_for(lambda: group.stats()["coalesced"] == 2)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1 and results == [[{"title": "Acme"}]] * 3
+    results[1][0]["title"] = "changed"
+    assert results[0][0]["title"] == results[2][0]["title"] == "Acme"
+    assert group.stats() == {"calls": 3, "executed": 1, "coalesced": 2, "in_flight": 0, "saved_calls": 2}
+
+
+def test_do_raises_the_leaders_error_in_every_waiter():
+    group = SingleFlight("test")
+    release = threading.Event()
+    errors = []
+
+    def fn():
+        release.wait()
+        raise ConnectionError("reset")
+
+    def call():
+        try:
+            group.do("acme", fn)
+        except ConnectionError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(2)]
+    for t in threads:
+        t.start()
+    _wait_for(lambda: group.stats()["calls"] == 2)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(errors) == 2
+    # The key is free again once the call failed
+    assert group.do("acme", lambda: "ok") == "ok"
+
+
+def test_ado_coalesces_concurrent_calls_on_one_loop():
+    group = SingleFlight("test")
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"results": [1, 2]}
+
+    async def main():
+        return await asyncio.gather(*(group.ado("acme", fetch) for _ in range(3)))
+
+    results = asyncio.run(main())
+
+    assert len(calls) == 1 and results == [{"results": [1, 2]}] * 3
+    assert results[0] is not results[1]
+    assert group.stats()["in_flight"] == 0
+
+
+def test_cancelling_the_leader_does_not_cancel_the_waiters():
+    group = SingleFlight("test")
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def main():
+        leader = asyncio.ensure_future(group.ado("acme", fetch))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(group.ado("acme", fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await waiter
+
+    assert asyncio.run(main()) == "ok"
+    assert len(calls) == 1
@@ -0,0 +1,49 @@
+from shared.snippet_packer import describe_packing, estimate_tokens, pack_snippets, snippet_fingerprint
+
+
+def _result(snippet, link="https://example.com/a"):
+    return {"title": "", "link": link, "snippet": snippet}
+
+
+def test_exact_and_near_duplicates_are_dropped():
+    results = [
+        _result("Acme lanza una nueva plataforma de nómina para pymes en España."),
+        _result("acme lanza una  nueva plataforma de nómina para pymes en España.", "https://example.com/b"),
+        _result("Acme lanza una nueva plataforma de nómina para pymes", "https://example.com/c"),
+        _result("Clientes de Acme critican el soporte.", "https://example.com/d"),
+        _result(""),
+    ]
+
+    snippets, stats = pack_snippets(results, "Acme")
+
+    assert snippets == [results[0]["snippet"], results[3]["snippet"]]
+    assert (stats["input"], stats["exact_duplicates"], stats["near_duplicates"]) == (4, 1, 1)
+    assert describe_packing(stats).startswith("4 → 2 snippets")
+
+
+def test_best_snippet_of_each_source_comes_first():
+    results = [
+        _result("Acme amplía su equipo de ventas en Madrid y Barcelona.", "https://elpais.com/a"),
+        _result("Acme abre oficina en Valencia con cuarenta empleos nuevos.", "https://elpais.com/b"),
+        _result("El mercado de nóminas crece un diez por ciento este año.", "https://expansion.com/c"),
+    ]
+
+    snippets, _ = pack_snippets(results, "Acme")
+
+    # The expansion.com snippet does not name Acme, but it is that source's best one
+    assert snippets == [results[0]["snippet"], results[2]["snippet"], results[1]["snippet"]]
+
+
+def test_snippets_over_the_token_budget_are_left_out():
+    results = [_result(f"Acme noticia número {i} sobre su negocio de nómina.", f"https://s{i}.com/x") for i in range(5)]
+    cost = estimate_tokens(results[0]["snippet"]) + 2
+
+    snippets, stats = pack_snippets(results, "Acme", max_tokens=cost * 2)
+
+    assert len(snippets) == 2 and stats["over_budget"] == 3
+    assert stats["tokens_out"] <= cost * 2 < stats["tokens_in"]
+
+
+def test_fingerprint_ignores_order_case_and_whitespace():
+    assert snippet_fingerprint(["Acme crece.", "Beta cae."]) == snippet_fingerprint(["beta  cae.", "ACME crece."])
+    assert snippet_fingerprint(["Acme crece."]) != snippet_fingerprint(["Acme cae."])
@@ -48,6 +48,58 @@ class DatabaseService:
                 products_json TEXT
             )
         ''')
+        # Numeric entity polarity (-1..1) next to the label; added to databases created before it
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(competitor_snapshots)")]
+        if "polarity" not in columns:
+            cursor.execute("ALTER TABLE competitor_snapshots ADD COLUMN polarity REAL")
+        # Fingerprint of the analysed snippet set, and whether the row reused the previous analysis
+        if "fingerprint" not in columns:
+            cursor.execute("ALTER TABLE competitor_snapshots ADD COLUMN fingerprint TEXT")
+        if "carried_forward" not in columns:
+            cursor.execute("ALTER TABLE competitor_snapshots ADD COLUMN carried_forward INTEGER DEFAULT 0")
+        # Formula version of visibility_score (shared/visibility.py); older rows are version 1
+        if "visibility_version" not in columns:
+            cursor.execute("ALTER TABLE competitor_snapshots ADD COLUMN visibility_version INTEGER DEFAULT 1")
+
+        # Per-snippet sentiment scores: narrow numeric table, one row per scored snippet,
+        # loaded whole into pandas for aggregation (shared/sentiment_trends.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sentiment_scores (
+                timestamp TIMESTAMP,
+                name TEXT,
+                snippet_index INTEGER,
+                polarity REAL,
+                confidence REAL
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_sentiment_scores_name ON sentiment_scores (name, timestamp)")
+
+        # Analysis runs and their per-entity checkpoints, so an interrupted run can be resumed
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS analysis_runs (
+                run_id TEXT PRIMARY KEY,
+                created_at TIMESTAMP,
+                finished_at TIMESTAMP,
+                status TEXT,
+                targets_json TEXT
+            )
+        ''')
+        # Whether the run's leader detection finished (runs created before it count as done)
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(analysis_runs)")]
+        if "leaders_done" not in columns:
+            cursor.execute("ALTER TABLE analysis_runs ADD COLUMN leaders_done INTEGER DEFAULT 1")
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS run_checkpoints (
+                run_id TEXT,
+                name TEXT,
+                position INTEGER,
+                status TEXT,
+                row_json TEXT,
+                logs_json TEXT,
+                updated_at TIMESTAMP,
+                PRIMARY KEY (run_id, name)
+            )
+        ''')
 
         conn.commit()
         conn.close()
@@ -102,14 +154,185 @@ class DatabaseService:
         return rows
 
     # --- Competitor Snapshots ---
-    def save_competitor_snapshot(self, name, visibility, sentiment, topic, products=None):
+    def save_competitor_snapshot(self, name, visibility, sentiment, topic, products=None, polarity=None, timestamp=None,
+                                 fingerprint=None, carried_forward=False, visibility_version=1):
         conn = self._get_connection()
         cursor = conn.cursor()
         products_json = json.dumps(products) if products else None
         
         cursor.execute("""
-            INSERT INTO competitor_snapshots (timestamp, name, visibility_score, sentiment, topic, products_json)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (datetime.now(), name, visibility, sentiment, topic, products_json))
+            INSERT INTO competitor_snapshots (timestamp, name, visibility_score, sentiment, topic, products_json, polarity, fingerprint,
+                                              carried_forward, visibility_version)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (timestamp or datetime.now(), name, visibility, sentiment, topic, products_json, polarity, fingerprint,
+              int(carried_forward), visibility_version))
+        conn.commit()
+        conn.close()
+
+    def get_latest_scored_snapshot(self, name):
+        """
+        Most recent snapshot of an entity that the model actually scored (carries a fingerprint
+        and was not carried forward), or None. Its timestamp is the age of the analysis.
+        """
+        conn = self._get_connection()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT * FROM competitor_snapshots WHERE lower(name) = lower(?) AND fingerprint IS NOT NULL "
+            "AND carried_forward = 0 ORDER BY timestamp DESC LIMIT 1",
+            (name,)
+        )
+        row = cursor.fetchone()
+        conn.close()
+        return dict(row) if row else None
+
+    def save_sentiment_scores(self, name, scores, timestamp=None):
+        """
+        Stores one run's per-snippet scores: `scores` is {snippet_index: (polarity, confidence)}.
+        """
+        if not scores:
+            return
+        timestamp = timestamp or datetime.now()
+        conn = self._get_connection()
+        conn.executemany(
+            "INSERT INTO sentiment_scores (timestamp, name, snippet_index, polarity, confidence) VALUES (?, ?, ?, ?, ?)",
+            [(timestamp, name, i, polarity, confidence) for i, (polarity, confidence) in sorted(scores.items())]
+        )
+        conn.commit()
+        conn.close()
+
+    def get_sentiment_scores(self, name, timestamp):
+        """
+        The per-snippet scores saved with one snapshot: {snippet_index: (polarity, confidence)}.
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT snippet_index, polarity, confidence FROM sentiment_scores WHERE lower(name) = lower(?) AND timestamp = ?",
+            (name, timestamp)
+        )
+        scores = {index: (polarity, confidence) for index, polarity, confidence in cursor.fetchall()}
+        conn.close()
+        return scores
+
+    def load_sentiment_scores(self):
+        """
+        All scored history as a DataFrame (timestamp, name, polarity, confidence). Snapshots
+        saved before per-snippet scoring contribute their label's polarity at LABEL_CONFIDENCE.
+        """
+        import pandas as pd
+        from shared.sentiment_trends import LABEL_POLARITY, LABEL_CONFIDENCE
+
+        conn = self._get_connection()
+        scores = pd.read_sql_query("SELECT timestamp, name, polarity, confidence FROM sentiment_scores", conn)
+        legacy = pd.read_sql_query(
+            "SELECT timestamp, name, sentiment FROM competitor_snapshots WHERE polarity IS NULL", conn
+        )
+        conn.close()
+
+        legacy["polarity"] = legacy["sentiment"].str.strip().str.lower().map(LABEL_POLARITY)
+        legacy["confidence"] = LABEL_CONFIDENCE
+        frame = pd.concat([scores, legacy.drop(columns="sentiment").dropna(subset=["polarity"])], ignore_index=True)
+        frame["timestamp"] = pd.to_datetime(frame["timestamp"], format="mixed")
+        return frame
+
+    # --- Analysis runs (checkpoints) ---
+    def create_run(self, run_id, targets, leaders_done=True):
+        conn = self._get_connection()
+        conn.execute(
+            "INSERT INTO analysis_runs (run_id, created_at, status, targets_json, leaders_done) VALUES (?, ?, 'running', ?, ?)",
+            (run_id, datetime.now(), json.dumps(targets, default=str), int(leaders_done))
+        )
         conn.commit()
         conn.close()
+
+    def update_run_targets(self, run_id, targets):
+        # Targets after the run's leader detection, which this records as finished
+        conn = self._get_connection()
+        conn.execute(
+            "UPDATE analysis_runs SET targets_json = ?, leaders_done = 1 WHERE run_id = ?",
+            (json.dumps(targets, default=str), run_id)
+        )
+        conn.commit()
+        conn.close()
+
+    def get_run(self, run_id):
+        """
+        The run with its `targets` decoded and `done` (entities checkpointed without error), or None.
+        """
+        conn = self._get_connection()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM analysis_runs WHERE run_id = ?", (run_id,))
+        row = cursor.fetchone()
+        if not row:
+            conn.close()
+            return None
+        run = dict(row)
+        cursor.execute("SELECT COUNT(*) FROM run_checkpoints WHERE run_id = ? AND status = 'done'", (run_id,))
+        run["done"] = cursor.fetchone()[0]
+        conn.close()
+        run["targets"] = json.loads(run.pop("targets_json") or "[]")
+        return run
+
+    def get_unfinished_runs(self, limit=5):
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT run_id FROM analysis_runs WHERE status = 'running' ORDER BY created_at DESC LIMIT ?", (limit,)
+        )
+        run_ids = [row[0] for row in cursor.fetchall()]
+        conn.close()
+        return [self.get_run(run_id) for run_id in run_ids]
+
+    def finish_run(self, run_id):
+        conn = self._get_connection()
+        conn.execute(
+            "UPDATE analysis_runs SET status = 'completed', finished_at = ? WHERE run_id = ?", (datetime.now(), run_id)
+        )
+        conn.commit()
+        conn.close()
+
+    def save_checkpoint(self, run_id, name, position, status, row, logs):
+        """
+        Stores one entity's finished report row; `status` is 'done' or 'error' (retried on resume).
+        """
+        conn = self._get_connection()
+        conn.execute("""
+            INSERT INTO run_checkpoints (run_id, name, position, status, row_json, logs_json, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(run_id, name) DO UPDATE SET
+                position=excluded.position, status=excluded.status, row_json=excluded.row_json,
+                logs_json=excluded.logs_json, updated_at=excluded.updated_at
+        """, (run_id, name, position, status, json.dumps(row, default=str), json.dumps(logs), datetime.now()))
+        conn.commit()
+        conn.close()
+
+    def get_checkpoints(self, run_id):
+        """
+        Checkpointed entities of a run in target order: [{name, position, status, row, logs}].
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT name, position, status, row_json, logs_json FROM run_checkpoints WHERE run_id = ? ORDER BY position",
+            (run_id,)
+        )
+        checkpoints = [
+            {"name": name, "position": position, "status": status, "row": json.loads(row_json), "logs": json.loads(logs_json)}
+            for name, position, status, row_json, logs_json in cursor.fetchall()
+        ]
+        conn.close()
+        return checkpoints
+
+    def get_competitor_history(self, name, limit=30):
+        conn = self._get_connection()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT * FROM competitor_snapshots WHERE lower(name) = lower(?) ORDER BY timestamp DESC LIMIT ?",
+            (name, limit)
+        )
+        rows = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        return rows
@@ -0,0 +1,94 @@
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from services.cache_service import normalize_query
+
+DEFAULT_MIN_SNIPPETS = 6
+DEFAULT_STRAGGLER_BUDGET = 3.0
+
+
+class SnippetBuffer:
+    """
+    Collects search results as each query completes. Once `min_snippets` distinct snippets
+    have arrived the buffer is ready: queries finishing within `straggler_budget` seconds
+    after that are folded in, later ones are dropped so analysis can start.
+    """
+    def __init__(self, min_snippets=DEFAULT_MIN_SNIPPETS, straggler_budget=DEFAULT_STRAGGLER_BUDGET):
+        self.min_snippets = min_snippets
+        self.straggler_budget = straggler_budget
+        self.results = []
+        self.completed = []
+        self.dropped = []
+        self.ready_at = None
+        self._seen = set()
+        self._started = time.monotonic()
+
+    def add(self, query, results):
+        self.completed.append(query)
+        for r in results:
+            self.results.append(r)
+            snippet = normalize_query(r.get('snippet') or "")
+            if snippet:
+                self._seen.add(snippet)
+        if self.ready_at is None and len(self._seen) >= self.min_snippets:
+            self.ready_at = time.monotonic()
+
+    @property
+    def distinct_snippets(self):
+        return len(self._seen)
+
+    def remaining(self):
+        """
+        Seconds left to wait for stragglers, or None while below the snippet threshold.
+        """
+        if self.ready_at is None:
+            return None
+        return max(0.0, self.ready_at + self.straggler_budget - time.monotonic())
+
+    def summary(self):
+        waited = (self.ready_at or time.monotonic()) - self._started
+        return (f"{self.distinct_snippets} snippets de {len(self.completed)} búsquedas en {waited:.1f}s"
+                + (f", {len(self.dropped)} descartadas por latencia" if self.dropped else ""))
+
+
+def stream_search(search_tool, queries, buffer, num_results=3, strict=False):
+    """
+    Yields (query, results) as each search finishes, fastest first. Stops early once
+    `buffer` is ready and its straggler budget runs out; unfinished queries are recorded in
+    `buffer.dropped` and left to complete in the background (their results still reach
+    the search cache).
+    """
+    executor = ThreadPoolExecutor(max_workers=max(1, len(queries)))
+    futures = {executor.submit(search_tool.search, q, num_results, strict): q for q in queries}
+    pending = set(futures)
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=buffer.remaining(), return_when=FIRST_COMPLETED)
+            if not done:
+                buffer.dropped = [futures[f] for f in pending]
+                return
+            for future in done:
+                yield futures[future], future.result()
+    finally:
+        executor.shutdown(wait=False)
+
+
+async def astream_search(search_tool, queries, buffer, bounded, num_results=3, strict=False):
+    """
+    Async iterator counterpart of `stream_search`; each search runs under `bounded`.
+    Stragglers past the budget are cancelled.
+    """
+    tasks = {asyncio.ensure_future(bounded(search_tool.asearch(q, num_results, strict))): q for q in queries}
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=buffer.remaining(), return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                buffer.dropped = [tasks[t] for t in pending]
+                return
+            for task in done:
+                yield tasks[task], task.result()
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,189 @@
+import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Workers per stage of run_analysis; overridden by analysis_settings.worker_pools.
+# Persistence defaults to one worker: SQLite serializes writes anyway. "leaders" runs the
+# grounded market-leader query next to the other stages.
+DEFAULT_STAGE_WORKERS = {"search": 5, "llm": 5, "persistence": 1, "leaders": 1}
+
+
+def stage_workers(overrides=None):
+    workers = dict(DEFAULT_STAGE_WORKERS)
+    for stage, count in (overrides or {}).items():
+        workers[stage] = max(1, int(count))
+    return workers
+
+
+class StagePool:
+    """
+    Thread pool for one stage, with the counters needed to see whether it is the bottleneck:
+    tasks waiting for a worker (queue depth), time spent waiting and time spent working.
+    """
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"stage-{name}")
+        self._created = time.monotonic()
+        self._closed = None
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "max_queue_depth": 0,
+                       "busy_seconds": 0.0, "wait_seconds": 0.0}
+
+    def submit(self, fn, *args):
+        queued_at = time.monotonic()
+        with self._lock:
+            self._queued += 1
+            self._stats["submitted"] += 1
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], self._queued)
+
+        def run():
+            started = time.monotonic()
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+                self._stats["wait_seconds"] += started - queued_at
+            failed = False
+            try:
+                return fn(*args)
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._stats["completed"] += 1
+                    self._stats["failed"] += failed
+                    self._stats["busy_seconds"] += time.monotonic() - started
+
+        return self._executor.submit(run)
+
+    def stats(self):
+        # Utilization over the pool's lifetime (a run for per-run pools, the process for shared ones)
+        elapsed = (self._closed or time.monotonic()) - self._created
+        with self._lock:
+            stats = dict(self._stats)
+            stats["queue_depth"] = self._queued
+            stats["active"] = self._active
+        stats["workers"] = self.workers
+        stats["utilization"] = round(stats["busy_seconds"] / (self.workers * elapsed), 3) if elapsed > 0 else 0.0
+        stats["avg_wait_seconds"] = round(stats["wait_seconds"] / stats["submitted"], 3) if stats["submitted"] else 0.0
+        stats["busy_seconds"] = round(stats["busy_seconds"], 2)
+        stats["wait_seconds"] = round(stats["wait_seconds"], 2)
+        return stats
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+        self._closed = time.monotonic()
+
+
+def create_stage_pools(workers=None):
+    """
+    One StagePool per stage, to be shared by several TaskGraphs (see TaskGraph `pools`).
+    """
+    return {stage: StagePool(stage, count) for stage, count in stage_workers(workers).items()}
+
+
+def _chain(source, target):
+    """
+    Copies the outcome of one future into another.
+    """
+    if source.cancelled():
+        target.cancel()
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+class TaskGraph:
+    """
+    Small DAG scheduler over per-stage pools. A task is submitted to a stage with the futures
+    it depends on (`after`); it is queued on its stage as soon as the last dependency finishes
+    and receives the dependency results after its own arguments. A failed dependency fails
+    the task without running it. Each stage keeps its own workers busy independently, so a slow
+    search no longer holds an LLM worker and vice versa. With `pools` (create_stage_pools) the
+    graph runs on shared pools and leaves them open on close; otherwise it owns its pools.
+
+        with TaskGraph("hr_analysis", {"search": 5, "llm": 5, "persistence": 1}) as graph:
+            found = graph.submit("search", collect, target)
+            scored = graph.submit("llm", analyze, after=[found])
+            saved = graph.submit("persistence", store, after=[found, scored])
+    """
+    def __init__(self, name, workers=None, pools=None):
+        self.name = name
+        self._owned = pools is None
+        self._stages = create_stage_pools(workers) if pools is None else pools
+        self._started = time.monotonic()
+        self._finished = None
+
+    def submit(self, stage, fn, *args, after=()):
+        if stage not in self._stages:
+            raise ValueError(f"Unknown stage '{stage}' (expected one of {list(self._stages)})")
+        pool = self._stages[stage]
+        after = list(after)
+        if not after:
+            return pool.submit(fn, *args)
+
+        result = Future()
+        remaining = [len(after)]
+        lock = threading.Lock()
+
+        def ready(_):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            failed = next((f for f in after if f.cancelled() or f.exception() is not None), None)
+            if failed is not None:
+                _chain(failed, result)
+                return
+            pool.submit(fn, *args, *[f.result() for f in after]).add_done_callback(lambda f: _chain(f, result))
+
+        for dependency in after:
+            dependency.add_done_callback(ready)
+        return result
+
+    def stats(self):
+        elapsed = (self._finished or time.monotonic()) - self._started
+        return {
+            "elapsed_seconds": round(elapsed, 2),
+            "stages": {stage: pool.stats() for stage, pool in self._stages.items()},
+        }
+
+    def close(self):
+        if self._owned:
+            for pool in self._stages.values():
+                pool.shutdown()
+        self._finished = time.monotonic()
+        _record(self.name, self.stats())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def describe_stages(stats):
+    return " | ".join(
+        f"{stage}: {s['workers']} hilos, uso {s['utilization']:.0%}, cola máx. {s['max_queue_depth']}, "
+        f"espera media {s['avg_wait_seconds']:.1f}s"
+        for stage, s in stats["stages"].items()
+    )
+
+
+# --- Process-wide registry (stage stats of the last finished run per graph) ---
+_last_runs = {}
+_registry_lock = threading.Lock()
+
+def _record(name, stats):
+    with _registry_lock:
+        _last_runs[name] = stats
+
+def get_task_graph_metrics():
+    with _registry_lock:
+        return dict(_last_runs)
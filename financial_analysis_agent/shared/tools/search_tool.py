@@ -1,118 +1,493 @@
 import os
 import json
+import asyncio
 import traceback
+from pydantic import BaseModel, Field, ValidationError
+
+from services.cache_service import SearchCache, get_llm_cache
+from shared.genai_client import get_client, get_async_client
+from shared.single_flight import get_single_flight
+from shared.rate_limiter import get_rate_limiter, RateLimitError
+from shared.resilience import get_policy, with_timeout
+from shared.model_router import get_model_router
+from shared.visibility import extract_domain
+
+# --- Batch search response schema ---
+class BatchSearchItem(BaseModel):
+    title: str = Field(default="", description="Título del resultado.")
+    link: str = Field(default="", description="URL del resultado.")
+    snippet: str = Field(default="", description="Resumen breve del contenido encontrado.")
+
+class BatchQueryResults(BaseModel):
+    query_id: int = Field(description="Índice de la consulta, tal como aparece en la lista.")
+    results: list[BatchSearchItem] = Field(default_factory=list)
+
+class BatchSearchResponse(BaseModel):
+    queries: list[BatchQueryResults]
+
+# --- Single search / grounded answer schemas ---
+class SearchResults(BaseModel):
+    results: list[BatchSearchItem] = Field(default_factory=list)
+
+class LeaderList(BaseModel):
+    names: list[str] = Field(description="Nombres de las empresas, solo el nombre comercial, sin descripciones.")
 
 class WebSearchTool:
     """
     Web search using Gemini's built-in Google Search grounding.
     No external API keys or CSE needed—uses the same Vertex AI / Gemini auth.
+    Results are cached on disk (see services/cache_service.py); set SEARCH_CACHE_ENABLED=0 to bypass.
     """
-    def __init__(self):
-        self._client = None
+    def __init__(self, cache=None, model="gemini-2.0-flash"):
+        self.model = model
+        if cache is None:
+            cache = SearchCache(enabled=os.getenv("SEARCH_CACHE_ENABLED", "1") == "1")
+        self.cache = cache
+        # Shared across instances: identical in-flight queries wait on one Gemini call
+        self._inflight = get_single_flight("web_search")
+        # Every grounded call goes through the per-model adaptive limiter
+        self._limiter = get_rate_limiter(self.model)
+        self._policy = get_policy("web_search")
+        self._batch_policy = get_policy("web_search_batch")
 
     def _get_client(self):
-        if self._client is None:
-            from google import genai
-            use_vertex = os.getenv("GOOGLE_GENAI_USE_VERTEXAI", "0") == "1"
-            if use_vertex:
-                self._client = genai.Client(
-                    vertexai=True,
-                    project=os.getenv("GOOGLE_CLOUD_PROJECT"),
-                    location=os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1")
-                )
-                print("[WebSearchTool] Initialized with Vertex AI.")
-            else:
-                self._client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
-                print("[WebSearchTool] Initialized with Gemini API Key.")
-        return self._client
+        # Shared, pooled client (see shared/genai_client.py)
+        return get_client()
+
+    def _get_async_client(self):
+        return get_async_client()
 
-    def search(self, query, num_results=5):
+    def search(self, query, num_results=5, strict=False):
         """
         Uses Gemini with Google Search grounding to search the web.
         Returns a list of dicts with keys: title, link, snippet.
+        With `strict=True` an exhausted Gemini quota (RateLimitError) or a search that ran out
+        of time (TimeoutError) raises instead of returning [].
         """
-        from google.genai import types
+        cached = self.cache.get(query, num_results, self.model)
+        if cached is not None:
+            print(f"[WebSearchTool] Cache hit: {query[:40]}")
+            return cached
+        try:
+            return self._search_uncached(query, num_results)
+        except (RateLimitError, TimeoutError) as e:
+            if strict:
+                raise
+            print(f"[WebSearchTool] {e}")
+            return []
 
-        client = self._get_client()
+    def _search_uncached(self, query, num_results):
+        key = SearchCache.make_key(query, num_results, self.model)
+        return self._inflight.do(key, lambda: self._search_remote(query, num_results))
 
-        prompt = (
-            f"Busca en la web información actual sobre: {query}\n\n"
-            f"Devuelve los {num_results} resultados más relevantes. "
-            f"Para cada resultado incluye: título, URL y un resumen breve del contenido encontrado. "
-            f"Responde SOLO con un array JSON válido con las claves: \"title\", \"link\", \"snippet\". "
-            f"Sin texto adicional, sin bloques de código markdown."
-        )
+    def search_batch(self, queries, num_results=3, strict=False):
+        """
+        Runs several searches in ONE grounded Gemini request.
+        `queries` is a list of query strings or (query, num_results) tuples.
+        Returns {query: [results]}. Cached queries are not re-sent, and any query the batch
+        answer leaves empty falls back to an individual `search` call.
+        """
+        try:
+            return self._search_batch(queries, num_results)
+        except (RateLimitError, TimeoutError) as e:
+            if strict:
+                raise
+            print(f"[WebSearchTool] {e}")
+            return {query: [] for query, _ in self._normalize_batch(queries, num_results)}
+
+    def _search_batch(self, queries, num_results):
+        specs = self._normalize_batch(queries, num_results)
+        results, pending = self._split_cached(specs)
+
+        if len(pending) == 1:
+            query, n = pending[0]
+            results[query] = self._search_uncached(query, n)
+        elif pending:
+            key = SearchCache.make_key(json.dumps(sorted(pending)), 0, self.model)
+            results.update(self._inflight.do(key, lambda: self._search_batch_remote(pending)))
+            for query, n in pending:
+                if not results.get(query):
+                    print(f"[WebSearchTool] Batch incomplete, falling back for: {query[:40]}")
+                    results[query] = self._search_uncached(query, n)
+
+        return {query: results.get(query, []) for query, _ in specs}
+
+    async def asearch_batch(self, queries, num_results=3, strict=False):
+        """
+        Async variant of `search_batch`; fallbacks for incomplete queries run concurrently.
+        """
+        try:
+            return await self._asearch_batch(queries, num_results)
+        except (RateLimitError, TimeoutError) as e:
+            if strict:
+                raise
+            print(f"[WebSearchTool] {e}")
+            return {query: [] for query, _ in self._normalize_batch(queries, num_results)}
+
+    async def _asearch_batch(self, queries, num_results):
+        specs = self._normalize_batch(queries, num_results)
+        results, pending = self._split_cached(specs)
+
+        if len(pending) == 1:
+            query, n = pending[0]
+            results[query] = await self._asearch_uncached(query, n)
+        elif pending:
+            key = SearchCache.make_key(json.dumps(sorted(pending)), 0, self.model)
+            results.update(await self._inflight.ado(key, lambda: self._asearch_batch_remote(pending)))
+            missing = [(query, n) for query, n in pending if not results.get(query)]
+            if missing:
+                print(f"[WebSearchTool] Batch incomplete, falling back for {len(missing)} queries")
+                fallback = await asyncio.gather(*(self._asearch_uncached(query, n) for query, n in missing))
+                results.update({query: r for (query, _), r in zip(missing, fallback)})
+
+        return {query: results.get(query, []) for query, _ in specs}
+
+    async def asearch(self, query, num_results=5, strict=False):
+        """
+        Async variant of `search` built on the genai async client (client.aio).
+        Shares the cache and the in-flight coalescing with the sync path.
+        """
+        cached = self.cache.get(query, num_results, self.model)
+        if cached is not None:
+            print(f"[WebSearchTool] Cache hit: {query[:40]}")
+            return cached
+        try:
+            return await self._asearch_uncached(query, num_results)
+        except (RateLimitError, TimeoutError) as e:
+            if strict:
+                raise
+            print(f"[WebSearchTool] {e}")
+            return []
+
+    async def _asearch_uncached(self, query, num_results):
+        key = SearchCache.make_key(query, num_results, self.model)
+        return await self._inflight.ado(key, lambda: self._asearch_remote(query, num_results))
+
+    def _search_remote(self, query, num_results):
+        """
+        Issues the grounded Gemini request. Runs once per in-flight key (see single_flight.py).
+        """
+        # A call that finished while we were queued may already have filled the cache
+        cached = self.cache.get(query, num_results, self.model, record_stats=False)
+        if cached is not None:
+            return cached
 
         try:
             print(f"[WebSearchTool] Gemini Grounded Search: {query[:70]}...")
-            response = client.models.generate_content(
-                model="gemini-2.0-flash",
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    tools=[types.Tool(google_search=types.GoogleSearch())],
-                    temperature=0.1,
-                )
-            )
-
-            results = []
-
-            # Method 1: Extract from grounding_metadata (most reliable)
-            if response.candidates and response.candidates[0].grounding_metadata:
-                gm = response.candidates[0].grounding_metadata
-                if hasattr(gm, 'grounding_chunks') and gm.grounding_chunks:
-                    for chunk in gm.grounding_chunks[:num_results]:
-                        if hasattr(chunk, 'web') and chunk.web:
-                            results.append({
-                                "title": getattr(chunk.web, 'title', '') or "",
-                                "link": getattr(chunk.web, 'uri', '') or "",
-                                "snippet": ""
-                            })
-
-            # Enrich snippets from the text response if we got grounding chunks
-            if results and response.text:
-                # Use the full text as context for all results
-                full_text = response.text[:1000]
-                # Distribute text across results as snippets
-                for i, r in enumerate(results):
-                    if not r["snippet"]:
-                        r["snippet"] = full_text[i*200:(i+1)*200] if len(full_text) > i*200 else full_text[:200]
-
-            # Method 2: If no grounding chunks, try to parse the text response
-            if not results and response.text:
-                text = response.text.strip()
-                # Remove markdown code fences if present
-                if text.startswith("```"):
-                    lines = text.split("\n")
-                    text = "\n".join(lines[1:])
-                    if text.endswith("```"):
-                        text = text[:-3]
-                    text = text.strip()
-
-                try:
-                    parsed = json.loads(text)
-                    if isinstance(parsed, list):
-                        for item in parsed[:num_results]:
-                            results.append({
-                                "title": item.get("title", ""),
-                                "link": item.get("link", item.get("url", "")),
-                                "snippet": item.get("snippet", item.get("summary", ""))
-                            })
-                except json.JSONDecodeError:
-                    # Use the raw text as a single result
-                    results.append({
-                        "title": "Resultado de búsqueda Gemini",
-                        "link": "gemini-grounded-search",
-                        "snippet": response.text[:500]
-                    })
-
-            print(f"[WebSearchTool] Found {len(results)} results for: {query[:40]}")
-            return results
+            response = self._generate(self._policy, self._build_prompt(query, num_results))
+            return self._handle_response(query, num_results, response)
 
+        except (RateLimitError, TimeoutError):
+            # An empty list would be replaced by simulated data; the caller must see these
+            raise
         except Exception as e:
             print(f"[WebSearchTool] Search error: {type(e).__name__}: {e}")
             traceback.print_exc()
             return []
 
+    async def _asearch_remote(self, query, num_results):
+        cached = self.cache.get(query, num_results, self.model, record_stats=False)
+        if cached is not None:
+            return cached
+
+        try:
+            print(f"[WebSearchTool] Gemini Grounded Search (async): {query[:70]}...")
+            response = await self._agenerate(self._policy, self._build_prompt(query, num_results))
+            return self._handle_response(query, num_results, response)
+
+        except (RateLimitError, TimeoutError):
+            raise
+        except Exception as e:
+            print(f"[WebSearchTool] Search error: {type(e).__name__}: {e}")
+            traceback.print_exc()
+            return []
+
+    def _normalize_batch(self, queries, num_results):
+        specs = []
+        for q in queries:
+            query, n = q if isinstance(q, (tuple, list)) else (q, num_results)
+            if query not in [s[0] for s in specs]:
+                specs.append((query, n))
+        return specs
+
+    def _split_cached(self, specs):
+        results, pending = {}, []
+        for query, n in specs:
+            cached = self.cache.get(query, n, self.model)
+            if cached is not None:
+                results[query] = cached
+            else:
+                pending.append((query, n))
+        return results, pending
+
+    def _search_batch_remote(self, pending):
+        try:
+            print(f"[WebSearchTool] Gemini Grounded Batch Search: {len(pending)} queries")
+            response = self._generate(self._batch_policy, self._build_batch_prompt(pending))
+            return self._handle_batch_response(pending, response)
+        except (RateLimitError, TimeoutError):
+            raise
+        except Exception as e:
+            print(f"[WebSearchTool] Batch search error: {type(e).__name__}: {e}")
+            return {}
+
+    async def _asearch_batch_remote(self, pending):
+        try:
+            print(f"[WebSearchTool] Gemini Grounded Batch Search (async): {len(pending)} queries")
+            response = await self._agenerate(self._batch_policy, self._build_batch_prompt(pending))
+            return self._handle_batch_response(pending, response)
+        except (RateLimitError, TimeoutError):
+            raise
+        except Exception as e:
+            print(f"[WebSearchTool] Batch search error: {type(e).__name__}: {e}")
+            return {}
+
+    def _build_batch_prompt(self, pending):
+        # Grounded calls cannot set response_schema, so the schema travels in the prompt
+        # and the answer is validated against it (BatchSearchResponse).
+        query_lines = "\n".join(f"{i}. {query} (máx. {n} resultados)" for i, (query, n) in enumerate(pending))
+        schema = json.dumps(BatchSearchResponse.model_json_schema(), ensure_ascii=False)
+        return (
+            f"Busca en la web información actual sobre CADA una de estas consultas, por separado:\n"
+            f"{query_lines}\n\n"
+            f"Para cada consulta devuelve sus resultados más relevantes con título, URL y un resumen breve. "
+            f"Responde SOLO con un objeto JSON válido que cumpla este JSON Schema, "
+            f"usando el número de la consulta como \"query_id\":\n{schema}\n"
+            f"Sin texto adicional, sin bloques de código markdown."
+        )
+
+    def _handle_batch_response(self, pending, response):
+        results = {}
+        try:
+            parsed = BatchSearchResponse.model_validate_json(self._strip_code_fences(response.text or ""))
+        except ValidationError as e:
+            print(f"[WebSearchTool] Batch response did not match schema: {e.error_count()} errors")
+            return results
+
+        sources = self._grounding_sources(response)
+        for entry in parsed.queries:
+            if not 0 <= entry.query_id < len(pending):
+                continue
+            query, n = pending[entry.query_id]
+            items = [self._grounded_item(item, sources) for item in entry.results]
+            items = [item for item in items if item["link"] or item["snippet"]][:n]
+            if items:
+                results[query] = items
+                self.cache.set(query, n, self.model, items)
+
+        print(f"[WebSearchTool] Batch answered {len(results)}/{len(pending)} queries")
+        return results
+
+    def _grounding_sources(self, response):
+        """
+        (uri, title, domain) of every grounding chunk: the pages the search actually returned.
+        """
+        sources = []
+        candidate = response.candidates[0] if response.candidates else None
+        gm = getattr(candidate, 'grounding_metadata', None)
+        for chunk in (getattr(gm, 'grounding_chunks', None) or []):
+            web = getattr(chunk, 'web', None)
+            if web and web.uri:
+                title = web.title or ""
+                sources.append((web.uri, title, extract_domain({"link": web.uri, "title": title})))
+        return sources
+
+    def _grounded_item(self, item, sources):
+        """
+        A batch result with its link taken from the grounding chunks: the chunk with the same
+        URI, else the chunk of the same domain. A link the model wrote without a matching
+        chunk may be invented, so it is dropped (the snippet is kept).
+        """
+        domain = extract_domain({"link": item.link, "title": ""}) if item.link else ""
+        match = next((s for s in sources if s[0] == item.link), None) or \
+            next((s for s in sources if domain and s[2] == domain), None)
+        if match is None:
+            return {"title": item.title, "link": "", "snippet": item.snippet}
+        uri, title, _ = match
+        return {"title": title or item.title, "link": uri, "snippet": item.snippet}
+
+    def _build_prompt(self, query, num_results):
+        return self._schema_prompt(
+            f"Busca en la web información actual sobre: {query}\n\n"
+            f"Devuelve los {num_results} resultados más relevantes. "
+            f"Para cada resultado incluye: título, URL y un resumen breve del contenido encontrado.",
+            SearchResults,
+        )
+
+    def _generate(self, policy, contents):
+        """
+        One grounded request: the resilience policy (timeout, retries, hedging) runs inside the
+        rate limiter, so quota waits are not counted against the timeout, and every attempt
+        carries the time left in its budget as the HTTP timeout.
+        """
+        client = self._get_client()
+        return policy.call(lambda timeout: client.models.generate_content(
+            model=self.model,
+            contents=contents,
+            config=with_timeout(self._build_config(), timeout)
+        ), limiter=self._limiter)
+
+    async def _agenerate(self, policy, contents):
+        client = self._get_async_client()
+        return await policy.acall(lambda timeout: client.models.generate_content(
+            model=self.model,
+            contents=contents,
+            config=with_timeout(self._build_config(), timeout)
+        ), limiter=self._limiter)
+
+    def _build_config(self):
+        from google.genai import types
+        return types.GenerateContentConfig(
+            tools=[types.Tool(google_search=types.GoogleSearch())],
+            temperature=0.1,
+        )
+
+    def _handle_response(self, query, num_results, response):
+        results = self._parse_response(response, num_results)
+        print(f"[WebSearchTool] Found {len(results)} results for: {query[:40]}")
+        if results:
+            self.cache.set(query, num_results, self.model, results)
+        return results
+
+    def _matched_summaries(self, sources, items):
+        """
+        {source index: snippet} pairing the typed answer's items with the grounding chunks
+        they describe: same URI first, then same domain. Each item is used once; the model's
+        item order says nothing about the chunk order.
+        """
+        summaries = {}
+        unused = list(items)
+        item_domain = lambda item: extract_domain({"link": item.link, "title": ""}) if item.link else ""
+        for same in (lambda item, s: item.link == s[0], lambda item, s: bool(s[2]) and item_domain(item) == s[2]):
+            for i, source in enumerate(sources):
+                if i in summaries:
+                    continue
+                match = next((item for item in unused if same(item, source)), None)
+                if match is not None:
+                    unused.remove(match)
+                    summaries[i] = match.snippet
+        return summaries
+
+    def _parse_response(self, response, num_results):
+        # Method 1: Extract from grounding_metadata (most reliable)
+        sources = self._grounding_sources(response)[:num_results]
+        results = [{"title": title, "link": uri, "snippet": ""} for uri, title, _ in sources]
+
+        # Enrich snippets from the text response if we got grounding chunks
+        if results and response.text:
+            # Summaries from the typed answer when it validates (no extraction call on this path)
+            try:
+                parsed = SearchResults.model_validate_json(self._strip_code_fences(response.text))
+                summaries = self._matched_summaries(sources, [item for item in parsed.results if item.snippet])
+            except ValidationError:
+                summaries = {}
+            # Use the full text as context for results no summary matched
+            full_text = response.text[:1000]
+            for i, r in enumerate(results):
+                if i in summaries:
+                    r["snippet"] = summaries[i]
+                else:
+                    r["snippet"] = full_text[i*200:(i+1)*200] if len(full_text) > i*200 else full_text[:200]
+
+        # Method 2: If no grounding chunks, read the text answer as SearchResults
+        if not results and response.text:
+            parsed = self._validate_or_extract(response.text, SearchResults, self.model)
+            results = [item.model_dump() for item in parsed.results if item.link or item.snippet][:num_results]
+
+        return results
+
+    def _schema_prompt(self, prompt, schema):
+        # Grounded calls cannot set response_schema, so the schema travels in the prompt
+        schema_json = json.dumps(schema.model_json_schema(), ensure_ascii=False)
+        return (
+            f"{prompt}\n\n"
+            f"Responde SOLO con un objeto JSON válido que cumpla este JSON Schema:\n{schema_json}\n"
+            f"Sin texto adicional, sin bloques de código markdown."
+        )
+
+    def _validate_or_extract(self, text, schema, model, timeout=None):
+        """
+        Validates a grounded answer against `schema`. An answer that does not validate is
+        converted by one schema-constrained (ungrounded) request on the same model, so the
+        caller always gets a typed object; a failed extraction raises.
+        """
+        try:
+            return schema.model_validate_json(self._strip_code_fences(text))
+        except ValidationError:
+            print(f"[WebSearchTool] Answer did not match {schema.__name__}; extracting with response_schema")
+
+        from google.genai import types
+        config = types.GenerateContentConfig(response_mime_type="application/json", response_schema=schema, temperature=0.0)
+        prompt = f"Extrae la información del siguiente texto en el formato indicado, sin inventar datos:\n\n{text}"
+        client = self._get_client()
+        response = get_policy("grounded_answer").call(
+            lambda timeout: client.models.generate_content(model=model, contents=prompt, config=with_timeout(config, timeout)),
+            limiter=get_rate_limiter(model),
+            timeout=timeout,
+        )
+        return schema.model_validate_json(response.text or "")
+
+    def _strip_code_fences(self, text):
+        text = text.strip()
+        # Remove markdown code fences if present
+        if text.startswith("```"):
+            lines = text.split("\n")
+            text = "\n".join(lines[1:])
+            if text.endswith("```"):
+                text = text[:-3]
+            text = text.strip()
+        return text
+
+    def answer(self, prompt, model=None, caller="leader_detection", use_cache=True, accept=None):
+        """
+        Free-text grounded answer (no result parsing), e.g. for leader detection.
+        Answers go through the LLM response cache under `caller`, and the request is cut off
+        at the latency budget of the model route of the same name; errors propagate so a
+        model router can escalate. With `accept(text)` only accepted answers are cached, and
+        a cached answer it rejects is dropped and requested again.
+        """
+        model = model or self.model
+        config = self._build_config()
+        llm_cache = get_llm_cache() if use_cache else None
+        if llm_cache and llm_cache.active_for(caller):
+            cached = llm_cache.get(model, prompt, config)
+            if cached is not None and accept is not None and not accept(cached):
+                llm_cache.delete(model, prompt, config)
+            elif cached is not None:
+                print(f"[WebSearchTool] Cached answer ({caller})")
+                return cached
+        else:
+            llm_cache = None
+
+        client = self._get_client()
+        response = get_policy("grounded_answer").call(
+            lambda timeout: client.models.generate_content(model=model, contents=prompt, config=with_timeout(config, timeout)),
+            limiter=get_rate_limiter(model),
+            timeout=get_model_router().latency_budget(caller),
+        )
+        text = response.text or ""
+        if llm_cache and text and (accept is None or accept(text)):
+            llm_cache.set(model, prompt, text, config, caller=caller)
+        return text
+
+    def answer_structured(self, prompt, schema, model=None, caller="leader_detection", use_cache=True, validate=None):
+        """
+        Grounded answer returned as a validated `schema` instance (a pydantic model), e.g.
+        LeaderList for leader detection. Errors and unusable answers raise, so a model router
+        can escalate. Only answers that match `schema` and pass `validate(result)` (the
+        router's check) are cached.
+        """
+        def accept(text):
+            try:
+                result = schema.model_validate_json(self._strip_code_fences(text))
+            except ValidationError:
+                return False
+            return validate is None or validate(result)
+
+        model = model or self.model
+        text = self.answer(self._schema_prompt(prompt, schema), model=model, caller=caller, use_cache=use_cache, accept=accept)
+        return self._validate_or_extract(text, schema, model, timeout=get_model_router().latency_budget(caller))
+
     def search_competitors(self, sector="consultoría RRHH gestión talento", location="España", year="2026"):
         """
         Searches for potential new competitors or market players.
@@ -120,11 +495,3 @@ class WebSearchTool:
         query = f"principales empresas y startups de {sector} en {location} {year} ranking comparativa"
         print(f"[WebSearchTool] Discovering players: {query}")
         return self.search(query, num_results=10)
-
-    def count_mentions(self, company_name):
-        """
-        Returns an approximate visibility score using grounded search.
-        """
-        query = f'"{company_name}" consultoría RRHH España noticias recientes'
-        results = self.search(query, num_results=10)
-        return len(results) * 100
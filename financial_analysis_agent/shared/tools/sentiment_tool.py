@@ -1,43 +1,404 @@
-import vertexai
-from vertexai.generative_models import GenerativeModel, Part
 import os
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from pydantic import BaseModel, Field, ValidationError
+
+from shared.genai_client import get_client, get_async_client
+from shared.cassette import get_cassette
+from shared.rate_limiter import get_rate_limiter, RateLimitError
+from shared.resilience import get_policy, with_timeout
+from shared.model_router import get_model_router
+from services.cache_service import get_llm_cache
+from shared.snippet_packer import estimate_tokens
+
+# Budget for one cross-entity analysis request (prompt side), and a cap on entities per request
+DEFAULT_BATCH_TOKENS = 30000
+DEFAULT_BATCH_ENTITIES = 8
+
+
+# --- Analysis response schemas ---
+class SnippetScore(BaseModel):
+    indice: int = Field(description="Número del fragmento, tal como aparece en la lista.")
+    polaridad: float = Field(description="Polaridad del fragmento: -1 muy negativo, 0 neutro, 1 muy positivo.")
+    confianza: float = Field(description="Confianza en la polaridad asignada, de 0 a 1.")
+
+class SentimentTopic(BaseModel):
+    sentimiento: str = Field(description="Sentimiento general de los fragmentos.")
+    tema: str = Field(description="Tema dominante en los fragmentos.")
+    fragmentos: list[SnippetScore] = Field(default_factory=list, description="Polaridad de cada fragmento.")
+
+class EntityAnalysis(BaseModel):
+    entity_id: int = Field(description="Índice de la empresa, tal como aparece en la lista.")
+    sentimiento: str = Field(description="Sentimiento general de los fragmentos de esa empresa.")
+    tema: str = Field(description="Tema dominante en los fragmentos de esa empresa.")
+    fragmentos: list[SnippetScore] = Field(default_factory=list, description="Polaridad de cada fragmento de esa empresa.")
+
+class BatchAnalysisResponse(BaseModel):
+    entities: list[EntityAnalysis]
+
+
+def snippet_scores(fragments):
+    """
+    {indice: (polarity, confidence)} keyed by the snippet number each score answers for,
+    clamped to [-1, 1] and [0, 1]. A number scored twice keeps its first score; the caller
+    drops numbers outside the snippets it actually sent.
+    """
+    scores = {}
+    for f in fragments:
+        scores.setdefault(f.indice, (max(-1.0, min(1.0, f.polaridad)), max(0.0, min(1.0, f.confianza))))
+    return scores
+
 
 class SentimentTool:
-    def __init__(self, project_id=None, location="us-central1"):
+    def __init__(self, project_id=None, location="us-central1", router=None, cache=None):
         self.project_id = project_id or os.getenv("GOOGLE_CLOUD_PROJECT")
         self.location = location
+        # Models come from the router: flash first for classification, pro for long-form reports
+        self.router = router or get_model_router()
+        # Identical (model, prompt, config) requests are answered from services/cache_service.py
+        self.cache = cache or get_llm_cache()
         
-        if self.project_id:
-            try:
-                vertexai.init(project=self.project_id, location=self.location)
-                # Updated to Gemini 3.0 as requested
-                # Updated to Gemini 2.5 Pro as requested (Feb 2026 stable)
-                self.model = GenerativeModel("gemini-2.5-pro")
-                self.enabled = True
-            except Exception as e:
-                print(f"Error initializing Vertex AI: {e}")
-                self.enabled = False
-        else:
+        # Replaying a cassette needs no project: answers come from the recording
+        cassette = get_cassette()
+        self.enabled = bool(self.project_id) or (cassette is not None and cassette.mode == "replay")
+        if not self.enabled:
             print("Warning: GOOGLE_CLOUD_PROJECT not set. Sentiment Tool disabled.")
-            self.enabled = False
 
-    def analyze(self, text, prompt_template=None):
+    @property
+    def client(self):
+        # Vertex AI client from the shared registry, built on the first request rather than
+        # at construction (the SDK import and client setup are paid only when analysis runs)
+        return get_client(vertexai=True, project=self.project_id, location=self.location)
+
+    def _cached(self, model, prompt, caller, config, use_cache, accept):
+        """
+        (cache, cached text) for a request. A cached answer that `accept` rejects is dropped
+        from the cache and not returned, so it is requested again.
+        """
+        cache = self.cache if use_cache and self.cache.active_for(caller) else None
+        if not cache:
+            return None, None
+        cached = cache.get(model, prompt, config)
+        if cached is not None and accept is not None and not accept(cached):
+            cache.delete(model, prompt, config)
+            cached = None
+        return cache, cached
+
+    def _complete(self, model, prompt, caller, policy="sentiment", config=None, use_cache=True, route=None, accept=None):
+        """
+        Response text for one request, served from the LLM response cache when possible.
+        `policy=None` skips the resilience policy (long reports are not hedged or retried).
+        The latency budget of `route` (default: `caller`) is the request timeout.
+        Only answers that pass `accept(text)` (the caller's validation) are cached.
+        """
+        cache, cached = self._cached(model, prompt, caller, config, use_cache, accept)
+        if cached is not None:
+            return cached
+
+        def request(timeout):
+            return self.client.models.generate_content(model=model, contents=prompt, config=with_timeout(config, timeout))
+
+        limiter = get_rate_limiter(model)
+        budget = self.router.latency_budget(route or caller)
+        if policy:
+            response = get_policy(policy).call(request, limiter=limiter, timeout=budget)
+        else:
+            response = limiter.call(lambda: request(budget))
+        text = response.text or ""
+        if cache and text and (accept is None or accept(text)):
+            cache.set(model, prompt, text, config, caller=caller)
+        return text
+
+    async def _acomplete(self, model, prompt, caller, policy="sentiment", config=None, use_cache=True, route=None, accept=None):
+        cache, cached = self._cached(model, prompt, caller, config, use_cache, accept)
+        if cached is not None:
+            return cached
+
+        client = get_async_client(vertexai=True, project=self.project_id, location=self.location)
+        response = await get_policy(policy).acall(
+            lambda timeout: client.models.generate_content(model=model, contents=prompt, config=with_timeout(config, timeout)),
+            limiter=get_rate_limiter(model),
+            timeout=self.router.latency_budget(route or caller),
+        )
+        text = response.text or ""
+        if cache and text and (accept is None or accept(text)):
+            cache.set(model, prompt, text, config, caller=caller)
+        return text
+
+    @staticmethod
+    def _stripped_accept(validate):
+        return (lambda text: validate(text.strip())) if validate else None
+
+    def analyze(self, text, prompt_template=None, validate=None, route="classification", use_cache=True):
         """
         Analyzes the sentiment of the provided text snippet.
         Returns: Positive, Negative, or Neutral.
+        Runs on the route's cheapest model; `validate(text)` returning False escalates to the next tier.
+        `use_cache=False` forces a fresh answer.
         """
         if not self.enabled:
             return "Neutral (Mock)"
 
-        if prompt_template:
-            prompt = prompt_template.replace("{text}", text)
-        else:
-            # Fallback default
-            prompt = f"Analyze sentiment of: {text}. Return Positive, Negative, or Neutral."
+        prompt = self._build_prompt(text, prompt_template)
         
         try:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
+            accept = self._stripped_accept(validate)
+            return self.router.run(
+                route, lambda model: self._complete(model, prompt, route, use_cache=use_cache, accept=accept).strip(), validate=validate
+            )
+        except RateLimitError:
+            # Quota exhaustion must reach the caller rather than look like a neutral answer
+            raise
         except Exception as e:
             print(f"Error analyzing sentiment: {e}")
             return "Error"
+
+    async def aanalyze(self, text, prompt_template=None, validate=None, route="classification", use_cache=True):
+        """
+        Async variant of `analyze`, so many analyses can share one event loop.
+        """
+        if not self.enabled:
+            return "Neutral (Mock)"
+
+        prompt = self._build_prompt(text, prompt_template)
+
+        accept = self._stripped_accept(validate)
+
+        async def complete(model):
+            return (await self._acomplete(model, prompt, route, use_cache=use_cache, accept=accept)).strip()
+
+        try:
+            return await self.router.arun(route, complete, validate=validate)
+        except RateLimitError:
+            raise
+        except Exception as e:
+            print(f"Error analyzing sentiment: {e}")
+            return "Error"
+
+    def analyze_structured(self, prompt, schema, route="classification", use_cache=True):
+        """
+        Schema-constrained generation: the request sets response_schema=`schema` (a pydantic
+        model) and the answer comes back as a validated `schema` instance. An answer that does
+        not validate escalates to the next model tier; None when every tier fails.
+        """
+        if not self.enabled:
+            return None
+        config = self._schema_config(schema)
+
+        def complete(model):
+            text = self._complete(model, prompt, route, config=config, use_cache=use_cache, accept=lambda t: self._matches(schema, t))
+            return self._validate(schema, text)
+
+        try:
+            return self.router.run(route, complete, validate=lambda result: result is not None)
+        except RateLimitError:
+            raise
+        except Exception as e:
+            print(f"Error in structured analysis: {e}")
+            return None
+
+    async def aanalyze_structured(self, prompt, schema, route="classification", use_cache=True):
+        """
+        Async variant of `analyze_structured`.
+        """
+        if not self.enabled:
+            return None
+        config = self._schema_config(schema)
+
+        async def complete(model):
+            text = await self._acomplete(model, prompt, route, config=config, use_cache=use_cache, accept=lambda t: self._matches(schema, t))
+            return self._validate(schema, text)
+
+        try:
+            return await self.router.arun(route, complete, validate=lambda result: result is not None)
+        except RateLimitError:
+            raise
+        except Exception as e:
+            print(f"Error in structured analysis: {e}")
+            return None
+
+    def _validate(self, schema, text):
+        try:
+            return schema.model_validate_json(text)
+        except ValidationError as e:
+            print(f"[SentimentTool] Answer did not match {schema.__name__}: {e.error_count()} errors")
+            return None
+
+    @staticmethod
+    def _matches(schema, text):
+        try:
+            schema.model_validate_json(text)
+            return True
+        except ValidationError:
+            return False
+
+    @staticmethod
+    def _covers(batch, text):
+        """
+        True when a batch answer parses and has an entry for every entity of the batch.
+        """
+        try:
+            parsed = BatchAnalysisResponse.model_validate_json(text)
+        except ValidationError:
+            return False
+        return {entry.entity_id for entry in parsed.entities} >= set(range(len(batch)))
+
+    def analyze_batch(self, entities, prompt_template, max_tokens=DEFAULT_BATCH_TOKENS, max_entities=DEFAULT_BATCH_ENTITIES):
+        """
+        Sentiment and topic for several entities with one structured-output request per batch.
+        `entities` is a list of (name, text); `prompt_template` must contain {entities}.
+        Batches are split by token budget and run concurrently; a batch escalates to the next
+        model tier when its answer does not cover every entity.
+        Returns {name: (sentimiento, tema, {indice: (polarity, confidence)})}; entities missing from the answer are left out
+        so the caller can fall back to `analyze`.
+        """
+        if not self.enabled or not entities:
+            return {}
+        batches = self._split_batches(entities, prompt_template, max_tokens, max_entities)
+        results = {}
+        with ThreadPoolExecutor(max_workers=len(batches)) as executor:
+            for answered in executor.map(lambda batch: self._analyze_batch(batch, prompt_template), batches):
+                results.update(answered)
+        return results
+
+    def _analyze_batch(self, batch, prompt_template):
+        prompt = self._build_batch_prompt(batch, prompt_template)
+
+        def complete(model):
+            text = self._complete(model, prompt, "classification", policy="sentiment_batch",
+                                  config=self._schema_config(BatchAnalysisResponse), route="batch_classification",
+                                  accept=lambda t: self._covers(batch, t))
+            return self._handle_batch_response(batch, text)
+
+        try:
+            return self.router.run("batch_classification", complete, validate=lambda answered: len(answered) == len(batch))
+        except RateLimitError:
+            raise
+        except Exception as e:
+            print(f"Error in batch analysis: {e}")
+            return {}
+
+    async def aanalyze_batch(self, entities, prompt_template, max_tokens=DEFAULT_BATCH_TOKENS, max_entities=DEFAULT_BATCH_ENTITIES):
+        """
+        Async variant of `analyze_batch`.
+        """
+        if not self.enabled or not entities:
+            return {}
+        batches = self._split_batches(entities, prompt_template, max_tokens, max_entities)
+        answered = await asyncio.gather(*(self._aanalyze_batch(batch, prompt_template) for batch in batches))
+        return {name: result for batch_results in answered for name, result in batch_results.items()}
+
+    async def _aanalyze_batch(self, batch, prompt_template):
+        prompt = self._build_batch_prompt(batch, prompt_template)
+
+        async def complete(model):
+            text = await self._acomplete(model, prompt, "classification", policy="sentiment_batch",
+                                         config=self._schema_config(BatchAnalysisResponse), route="batch_classification",
+                                         accept=lambda t: self._covers(batch, t))
+            return self._handle_batch_response(batch, text)
+
+        try:
+            return await self.router.arun("batch_classification", complete, validate=lambda answered: len(answered) == len(batch))
+        except RateLimitError:
+            raise
+        except Exception as e:
+            print(f"Error in batch analysis: {e}")
+            return {}
+
+    def _split_batches(self, entities, prompt_template, max_tokens, max_entities):
+        """
+        Greedy packing in input order; an entity larger than the budget gets a batch of its own.
+        """
+        base = estimate_tokens(prompt_template)
+        batches, current, used = [], [], base
+        for name, text in entities:
+            cost = estimate_tokens(text) + estimate_tokens(name) + 5
+            if current and (used + cost > max_tokens or len(current) >= max_entities):
+                batches.append(current)
+                current, used = [], base
+            current.append((name, text))
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    def _build_batch_prompt(self, batch, prompt_template):
+        blocks = "\n\n".join(f"[{i}] {name}\n{text}" for i, (name, text) in enumerate(batch))
+        return prompt_template.replace("{entities}", blocks)
+
+    def _schema_config(self, schema):
+        from google.genai import types
+        return types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=schema,
+            temperature=0.1,
+        )
+
+    def _handle_batch_response(self, batch, text):
+        try:
+            parsed = BatchAnalysisResponse.model_validate_json(text)
+        except ValidationError as e:
+            print(f"Batch analysis did not match schema: {e.error_count()} errors")
+            return {}
+        results = {}
+        for entry in parsed.entities:
+            if 0 <= entry.entity_id < len(batch):
+                results[batch[entry.entity_id][0]] = (entry.sentimiento.strip(), entry.tema.strip(), snippet_scores(entry.fragmentos))
+        print(f"[SentimentTool] Batch analysis answered {len(results)}/{len(batch)} entities")
+        return results
+
+    def generate(self, prompt, route="report", use_cache=True):
+        """
+        Plain generation with no post-processing (long-form reports).
+        """
+        return self.router.run(
+            route,
+            lambda model: self._complete(model, prompt, route, policy=None, use_cache=use_cache, accept=lambda text: bool(text.strip())),
+            validate=lambda text: bool(text and text.strip()),
+        )
+
+    def generate_stream(self, prompt, route="report", use_cache=True):
+        """
+        Streaming variant of `generate`: yields text chunks as the model produces them.
+        Runs on the route's first tier only (a partly shown answer cannot be escalated), with
+        the route's latency budget as the HTTP timeout.
+        Time to first chunk and total latency are recorded on the router; the full text is
+        cached once the stream completes, under the same key `generate` uses.
+        """
+        model = self.router.models(route)[0]
+        cache = self.cache if use_cache and self.cache.active_for(route) else None
+        if cache:
+            cached = cache.get(model, prompt)
+            if cached is not None:
+                yield cached
+                return
+
+        def open_stream():
+            # The request is sent on the first iteration, so the limiter covers up to the first chunk
+            config = with_timeout(None, self.router.latency_budget(route))
+            stream = iter(self.client.models.generate_content_stream(model=model, contents=prompt, config=config))
+            return stream, next(stream, None)
+
+        start = time.monotonic()
+        parts = []
+        try:
+            stream, chunk = get_rate_limiter(model).call(open_stream)
+            self.router.record_first_token(route, model, time.monotonic() - start)
+            while chunk is not None:
+                if chunk.text:
+                    parts.append(chunk.text)
+                    yield chunk.text
+                chunk = next(stream, None)
+        finally:
+            self.router.record(route, model, time.monotonic() - start)
+
+        text = "".join(parts)
+        if cache and text:
+            cache.set(model, prompt, text, caller=route)
+
+    def _build_prompt(self, text, prompt_template=None):
+        if prompt_template:
+            return prompt_template.replace("{text}", text)
+        # Fallback default
+        return f"Analyze sentiment of: {text}. Return Positive, Negative, or Neutral."
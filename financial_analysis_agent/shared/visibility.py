@@ -0,0 +1,80 @@
+import math
+from urllib.parse import urlparse
+
+# Domains counted as press / news coverage
+NEWS_DOMAINS = (
+    "elpais.com", "elmundo.es", "expansion.com", "cincodias.elpais.com", "eleconomista.es",
+    "abc.es", "lavanguardia.com", "europapress.es", "elconfidencial.com", "larazon.es",
+    "20minutos.es", "rrhhdigital.com", "equiposytalento.com", "observatoriorh.com",
+    "capitalhumano.es", "theobjective.com", "forbes.es", "businessinsider.es", "reuters.com",
+)
+
+# Domains counted as forums, reviews and social networks
+FORUM_DOMAINS = (
+    "reddit.com", "glassdoor.es", "glassdoor.com", "indeed.com", "indeed.es", "linkedin.com",
+    "twitter.com", "x.com", "facebook.com", "forocoches.com", "trustpilot.com", "quora.com",
+    "youtube.com", "instagram.com", "tiktok.com", "capterra.es", "g2.com",
+)
+
+# Grounded search returns redirect URIs; the chunk title carries the real domain
+REDIRECT_HOSTS = ("vertexaisearch.cloud.google.com",)
+
+# Fixed weights/scale keep scores comparable between runs (no per-run normalization)
+WEIGHTS = {"urls": 1.0, "domains": 2.0, "news": 1.5, "forums": 1.0}
+SCALE = 25.0
+# Stored with every snapshot; bump it whenever the formula or scale changes, so past scores
+# on another scale are left out of the delta (version 1: the old results x 100 score)
+SCORE_VERSION = 2
+
+
+def extract_domain(result):
+    """
+    Returns the bare domain of a search result, or "" when it has no usable link.
+    """
+    link = result.get("link") or ""
+    host = urlparse(link).netloc.lower() if "://" in link else ""
+    if not host or host in REDIRECT_HOSTS:
+        title = (result.get("title") or "").strip().lower()
+        host = title if "." in title and " " not in title else host
+    if host in REDIRECT_HOSTS:
+        return ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def _matches(domain, known):
+    return any(domain == d or domain.endswith("." + d) for d in known)
+
+
+def compute_visibility(results, history=None):
+    """
+    Scores web visibility (0-100) from results that were already fetched, at no API cost.
+    Counts distinct URLs, distinct domains and news vs. forum sources. If `history`
+    (past visibility scores of the current SCORE_VERSION, newest first) is given, also
+    returns the delta vs. their mean.
+    """
+    urls, domains, news, forums = set(), set(), set(), set()
+    for r in results:
+        link = r.get("link") or ""
+        if "://" not in link:
+            # Simulated/placeholder rows carry no real source
+            continue
+        urls.add(link)
+        domain = extract_domain(r)
+        if not domain:
+            continue
+        domains.add(domain)
+        if _matches(domain, NEWS_DOMAINS):
+            news.add(domain)
+        elif _matches(domain, FORUM_DOMAINS):
+            forums.add(domain)
+
+    counts = {"urls": len(urls), "domains": len(domains), "news": len(news), "forums": len(forums)}
+    raw = sum(WEIGHTS[k] * v for k, v in counts.items())
+    score = round(100 * (1 - math.exp(-raw / SCALE)), 1)
+
+    delta = None
+    past = [h for h in (history or []) if h is not None]
+    if past:
+        delta = round(score - sum(past) / len(past), 1)
+
+    return {"score": score, "delta": delta, **counts}
@@ -7,8 +7,7 @@ import pandas as pd
 # Add project root to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from agents.fin_agent.agent import FinAgent, load_config
-from agents.fin_agent.prompts import CODI_REPORT_PROMPT
+from agents.fin_agent.agent import FinAgent, load_profile
 
 # Page Config
 st.set_page_config(
@@ -31,8 +30,8 @@ with st.sidebar:
     
     # Load config
     try:
-        config_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'fin_competitors.yaml')
-        config = load_config(config_path)
+        # Domain profile: competitors, analysis settings and prompts (config/profiles/)
+        config = load_profile(FinAgent.domain)
         for comp in config.get('competitors', []):
             st.text(f"- {comp['name']}")
     except Exception as e:
@@ -55,10 +54,10 @@ with tab5:
     st.markdown("Ajusta los **System Prompts** para cambiar el comportamiento del agente.")
     
     if 'db' not in st.session_state:
-        from services.db_service import DatabaseService
-        st.session_state.db = DatabaseService()
+        # The agent's database (the profile's db_path), where its runs and reports are stored
+        st.session_state.db = st.session_state.agent.db
         
-    current_codi_prompt = st.session_state.db.get_prompt("CODI_REPORT_PROMPT", default_value=CODI_REPORT_PROMPT)
+    current_codi_prompt = st.session_state.db.get_prompt("CODI_REPORT_PROMPT", default_value=st.session_state.agent.prompts["CODI_REPORT_PROMPT"])
     
     new_prompt = st.text_area("Prompt para Informe CODI (Estratégico)", value=current_codi_prompt, height=300)
     
@@ -69,8 +68,7 @@ with tab5:
 with tab6:
     st.header("📜 Historial de Informes")
     if 'db' not in st.session_state:
-        from services.db_service import DatabaseService
-        st.session_state.db = DatabaseService()
+        st.session_state.db = st.session_state.agent.db
         
     history = st.session_state.db.get_history(limit=10)
     
@@ -83,7 +81,14 @@ with tab6:
         st.info("No hay informes guardados aún.")
 
 with tab1:
-    if st.button("Ejecutar Análisis Completo", use_container_width=True):
+    # A run interrupted by a rerun or a crash (or with failed entities) keeps its finished ones (checkpoints)
+    unfinished = st.session_state.agent.db.get_unfinished_runs(limit=1)
+    resume_run = unfinished[0] if unfinished else None
+    resume = False
+    if resume_run:
+        st.warning(f"Análisis incompleto ({resume_run['run_id']}): {resume_run['done']}/{len(resume_run['targets'])} entidades completadas.")
+        resume = st.button("Reanudar Análisis Incompleto", use_container_width=True)
+    if st.button("Ejecutar Análisis Completo", use_container_width=True) or resume:
         st.info("Iniciando motor de análisis de consultoría financiera...")
         status_box = st.empty()
         
@@ -92,8 +97,11 @@ with tab1:
             
         with st.spinner("Procesando datos en tiempo real..."):
             try:
-                extras = [extra_comp] if extra_comp else []
-                df = st.session_state.agent.run_analysis(extra_competitors=extras, status_callback=ui_callback)
+                if resume:
+                    df = st.session_state.agent.resume_analysis(run_id=resume_run['run_id'], status_callback=ui_callback)
+                else:
+                    extras = [extra_comp] if extra_comp else []
+                    df = st.session_state.agent.run_analysis(extra_competitors=extras, status_callback=ui_callback)
                 st.session_state.last_df = df
                 st.success("¡Análisis Estratégico Completado!")
                 status_box.empty()
@@ -117,11 +125,10 @@ with tab3:
     st.header("Informe Estratégico CODI - Consultoría Financiera")
     if st.button("Generar Informe Ejecutivo", use_container_width=True):
         if 'last_df' in st.session_state:
-            with st.spinner("Redactando informe estratégico de consultoría financiera..."):
-                report = st.session_state.agent.generate_codi_report(st.session_state.last_df)
-                st.markdown("### 📑 Informe Estratégico (CODI + Gap Analysis Financiero)")
-                st.markdown(report)
-                st.download_button("Descargar Informe (MD)", report, file_name="Informe_CODI_Financiero.md")
+            st.markdown("### 📑 Informe Estratégico (CODI + Gap Analysis Financiero)")
+            # Rendered chunk by chunk as the model writes it; saved to the history when complete
+            report = st.write_stream(st.session_state.agent.generate_codi_report_stream(st.session_state.last_df))
+            st.download_button("Descargar Informe (MD)", report, file_name="Informe_CODI_Financiero.md")
         else:
             st.warning("Por favor, ejecuta primero el análisis para generar datos.")
 
@@ -154,6 +161,12 @@ if 'last_df' in st.session_state:
         st.metric("Visibilidad Media Competencia", display_val)
     
     # Dataframe
+    if 'Polaridad' in st.session_state.last_df.columns:
+        own = st.session_state.last_df[st.session_state.last_df['Tipo'] == 'Propia']
+        if not own.empty and pd.notna(own['Polaridad'].iloc[0]):
+            delta = own['Tendencia_Polaridad'].iloc[0] if 'Tendencia_Polaridad' in own.columns else None
+            st.metric("Sentimiento Propio (-1 a 1)", f"{own['Polaridad'].iloc[0]:+.2f}",
+                      delta=f"{delta:+.2f} vs. análisis anterior" if pd.notna(delta) else None)
     st.dataframe(st.session_state.last_df, use_container_width=True)
     
     # Simple Chart
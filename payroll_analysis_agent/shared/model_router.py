@@ -0,0 +1,168 @@
+import os
+import time
+import threading
+from collections import deque
+
+from shared.rate_limiter import RateLimitError
+
+# Model tiers per task, cheapest first, with a latency budget (seconds) per call. The budget
+# is the call's timeout: a tier that runs over it fails and the task escalates to the next one.
+# Override the tiers with MODEL_ROUTE_<TASK>, e.g. MODEL_ROUTE_CLASSIFICATION="gemini-2.5-flash,gemini-2.5-pro".
+ROUTES = {
+    "classification": {"models": ("gemini-2.5-flash", "gemini-2.5-pro"), "latency_budget": 60.0},
+    # Batched classification (SentimentTool.analyze_batch): one call covers many entities
+    "batch_classification": {"models": ("gemini-2.5-flash", "gemini-2.5-pro"), "latency_budget": 180.0},
+    "leader_detection": {"models": ("gemini-2.5-flash", "gemini-2.5-pro"), "latency_budget": 60.0},
+    "report": {"models": ("gemini-2.5-pro",), "latency_budget": 240.0},
+    "chat": {"models": ("gemini-2.5-pro",), "latency_budget": 60.0},
+}
+
+
+def clean_names(names, max_name_length=40):
+    """
+    Company names from a structured leader list: trimmed, without trailing dots, and without
+    entries too long to be a name (descriptions that slipped into the list).
+    """
+    cleaned = [n.strip().strip('.').strip() for n in names or []]
+    return [n for n in cleaned if n and len(n) < max_name_length and "\n" not in n]
+
+
+class ModelRouter:
+    """
+    Runs a task on the first model of its route and escalates to the next tier when the
+    output fails validation or the call errors (rate-limit errors propagate instead).
+    The last tier's answer is returned even if invalid, so callers keep their own defaults.
+    Callers pass `latency_budget(route)` to the request as its timeout; latency is recorded
+    per route and model, and calls that still ran over the budget are counted.
+    """
+    def __init__(self, routes=None, window=200):
+        self.routes = {}
+        for name, route in {**ROUTES, **(routes or {})}.items():
+            override = os.getenv(f"MODEL_ROUTE_{name.upper()}")
+            models = tuple(m.strip() for m in override.split(",") if m.strip()) if override else tuple(route["models"])
+            self.routes[name] = {"models": models, "latency_budget": route["latency_budget"]}
+        self._window = window
+        self._lock = threading.Lock()
+        self._latencies = {}
+        self._first_token = {}
+        self._stats = {name: {"calls": 0, "escalations": 0, "validation_failures": 0, "errors": 0, "over_budget": 0}
+                       for name in self.routes}
+
+    def models(self, route):
+        return self.routes[route]["models"]
+
+    def latency_budget(self, route):
+        return self.routes[route]["latency_budget"]
+
+    def record(self, route, model, seconds):
+        """
+        Records one call's latency (also used for calls the router does not drive, e.g. ADK chat).
+        """
+        with self._lock:
+            self._latencies.setdefault((route, model), deque(maxlen=self._window)).append(seconds)
+            if seconds > self.routes[route]["latency_budget"]:
+                self._stats[route]["over_budget"] += 1
+
+    def record_first_token(self, route, model, seconds):
+        """
+        Records time to first chunk for streamed calls (see SentimentTool.generate_stream).
+        """
+        with self._lock:
+            self._first_token.setdefault((route, model), deque(maxlen=self._window)).append(seconds)
+
+    def _count(self, route, key):
+        with self._lock:
+            self._stats[route][key] += 1
+
+    def run(self, route, call, validate=None):
+        """
+        `call(model)` performs the request; `validate(result)` decides whether to escalate.
+        """
+        self._count(route, "calls")
+        tiers = self.models(route)
+        for i, model in enumerate(tiers):
+            last = i == len(tiers) - 1
+            start = time.monotonic()
+            try:
+                result = call(model)
+            except RateLimitError:
+                raise
+            except Exception as e:
+                self.record(route, model, time.monotonic() - start)
+                self._count(route, "errors")
+                if last:
+                    raise
+                print(f"[ModelRouter:{route}] {model} failed ({type(e).__name__}); escalating to {tiers[i + 1]}")
+                self._count(route, "escalations")
+                continue
+            self.record(route, model, time.monotonic() - start)
+            if last or validate is None or validate(result):
+                return result
+            self._count(route, "validation_failures")
+            self._count(route, "escalations")
+            print(f"[ModelRouter:{route}] {model} output failed validation; escalating to {tiers[i + 1]}")
+
+    async def arun(self, route, coro_fn, validate=None):
+        """
+        Async counterpart of `run`; `coro_fn(model)` returns a fresh coroutine.
+        """
+        self._count(route, "calls")
+        tiers = self.models(route)
+        for i, model in enumerate(tiers):
+            last = i == len(tiers) - 1
+            start = time.monotonic()
+            try:
+                result = await coro_fn(model)
+            except RateLimitError:
+                raise
+            except Exception as e:
+                self.record(route, model, time.monotonic() - start)
+                self._count(route, "errors")
+                if last:
+                    raise
+                print(f"[ModelRouter:{route}] {model} failed ({type(e).__name__}); escalating to {tiers[i + 1]}")
+                self._count(route, "escalations")
+                continue
+            self.record(route, model, time.monotonic() - start)
+            if last or validate is None or validate(result):
+                return result
+            self._count(route, "validation_failures")
+            self._count(route, "escalations")
+            print(f"[ModelRouter:{route}] {model} output failed validation; escalating to {tiers[i + 1]}")
+
+    @staticmethod
+    def _quantile(samples, q):
+        ordered = sorted(samples)
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))], 2) if ordered else None
+
+    def stats(self):
+        with self._lock:
+            latencies = {key: list(samples) for key, samples in self._latencies.items()}
+            first_token = {key: list(samples) for key, samples in self._first_token.items()}
+            stats = {route: dict(counts) for route, counts in self._stats.items()}
+        for route, route_stats in stats.items():
+            route_stats["models"] = list(self.models(route))
+            route_stats["latency_budget"] = self.routes[route]["latency_budget"]
+            route_stats["by_model"] = {
+                model: {"samples": len(samples), "p50": self._quantile(samples, 0.5), "p95": self._quantile(samples, 0.95)}
+                for (r, model), samples in latencies.items() if r == route
+            }
+            for (r, model), samples in first_token.items():
+                if r == route and model in route_stats["by_model"]:
+                    route_stats["by_model"][model]["ttft_p50"] = self._quantile(samples, 0.5)
+                    route_stats["by_model"][model]["ttft_p95"] = self._quantile(samples, 0.95)
+        return stats
+
+
+_router = None
+_lock = threading.Lock()
+
+def get_model_router():
+    global _router
+    with _lock:
+        if _router is None:
+            _router = ModelRouter()
+        return _router
+
+def get_model_router_metrics():
+    return get_model_router().stats()
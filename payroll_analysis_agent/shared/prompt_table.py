@@ -0,0 +1,131 @@
+import io
+import csv
+from urllib.parse import urlparse
+
+from shared.snippet_packer import estimate_tokens
+from shared.visibility import REDIRECT_HOSTS
+
+# Cell values that carry no information for the model (fallback rows, failed searches)
+PLACEHOLDER_VALUES = ("Simulated Data", "No Web Results", "Reporte Interno")
+MAX_CATEGORIES = 12
+FORMATS = ("csv", "markdown")
+
+
+def _is_placeholder(value):
+    return isinstance(value, str) and any(value.startswith(p) for p in PLACEHOLDER_VALUES)
+
+
+def _compact_cell(value):
+    """
+    URLs become their domain (grounding redirect URLs carry none and are dropped),
+    floats lose trailing precision, and missing values become empty cells.
+    """
+    if value is None or (isinstance(value, float) and value != value):
+        return ""
+    if isinstance(value, float):
+        return f"{value:.1f}".rstrip('0').rstrip('.')
+    text = " ".join(str(value).split())
+    if _is_placeholder(text):
+        return ""
+    if text.startswith(("http://", "https://")):
+        host = urlparse(text).netloc.lower().removeprefix("www.")
+        return "" if host in REDIRECT_HOSTS else host
+    return text
+
+
+def _codes(values):
+    """
+    Short unique codes for categorical values: "Competidor" -> "Com", "Positivo" -> "Pos".
+    """
+    codes = {}
+    for value in values:
+        size = 3
+        code = value[:size].capitalize()
+        while code in codes.values() and size < len(value):
+            size += 1
+            code = value[:size].capitalize()
+        codes[value] = code if code not in codes.values() else value
+    return codes
+
+
+def _abbreviate(columns, rows, keep):
+    """
+    Replaces repeated categorical values by short codes when that saves more tokens than
+    the legend costs. Returns the legend lines.
+    """
+    legend = []
+    for i, column in enumerate(columns):
+        if column in keep:
+            continue
+        values = [row[i] for row in rows if row[i]]
+        distinct = sorted(set(values))
+        if not distinct or len(distinct) > MAX_CATEGORIES or len(distinct) == len(values):
+            continue
+        codes = _codes([v for v in distinct if len(v) > 3])
+        if not codes:
+            continue
+        line = f"{column}: " + ", ".join(f"{code}={value}" for value, code in codes.items())
+        saved = sum(estimate_tokens(v) - estimate_tokens(codes[v]) for v in values if v in codes)
+        if saved <= estimate_tokens(line):
+            continue
+        for row in rows:
+            row[i] = codes.get(row[i], row[i])
+        legend.append(line)
+    return legend
+
+
+def _render(columns, rows, fmt):
+    if fmt == "markdown":
+        lines = ["| " + " | ".join(columns) + " |", "|" + "---|" * len(columns)]
+        lines += ["| " + " | ".join(cell.replace("|", "/") for cell in row) + " |" for row in rows]
+        return "\n".join(lines)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    writer.writerows(rows)
+    return buffer.getvalue().rstrip("\n")
+
+
+def serialize_table(df, fmt="csv", keep=None, abbreviate=True):
+    """
+    Renders the analysis DataFrame compactly for a prompt: CSV (default) or minimal markdown
+    instead of the whitespace-padded `to_string` dump. Placeholder cells are blanked, columns
+    left empty are dropped, URLs are cut to their domain and repeated categorical values are
+    abbreviated with a legend. `keep` (default: the first column) is never abbreviated.
+    Returns (text, stats) with the token estimates before and after.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown table format '{fmt}' (expected one of {FORMATS})")
+    columns = [str(c) for c in df.columns]
+    keep = set(keep if keep is not None else columns[:1])
+    rows = [[_compact_cell(v) for v in record] for record in df.itertuples(index=False, name=None)]
+
+    kept = [i for i in range(len(columns)) if any(row[i] for row in rows)]
+    dropped = [columns[i] for i in range(len(columns)) if i not in kept]
+    columns = [columns[i] for i in kept]
+    rows = [[row[i] for i in kept] for row in rows]
+
+    legend = _abbreviate(columns, rows, keep) if abbreviate else []
+    text = _render(columns, rows, fmt)
+    if legend:
+        text += "\n\nLeyenda:\n" + "\n".join(f"- {line}" for line in legend)
+
+    stats = {
+        "rows": len(rows),
+        "columns": len(columns),
+        "dropped_columns": dropped,
+        "abbreviated_columns": [line.split(":", 1)[0] for line in legend],
+        "tokens_in": estimate_tokens(df.to_string(index=False)),
+        "tokens_out": estimate_tokens(text),
+    }
+    return text, stats
+
+
+def describe_serialization(stats):
+    text = (f"{stats['rows']} filas x {stats['columns']} columnas, "
+            f"~{stats['tokens_in']} → {stats['tokens_out']} tokens")
+    if stats["dropped_columns"]:
+        text += f", sin {', '.join(stats['dropped_columns'])}"
+    if stats["abbreviated_columns"]:
+        text += f", abreviadas {', '.join(stats['abbreviated_columns'])}"
+    return text
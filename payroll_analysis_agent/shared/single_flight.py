@@ -0,0 +1,112 @@
+import asyncio
+import copy
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key: the first caller executes the function,
+    every caller arriving while it is in flight waits and receives a copy of the same result.
+    """
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        # Async futures are bound to their event loop, so they are keyed by (loop, key)
+        self._async_calls = {}
+        self._stats = {"calls": 0, "executed": 0, "coalesced": 0}
+
+    def do(self, key, fn):
+        with self._lock:
+            self._stats["calls"] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self._stats["coalesced"] += 1
+                is_leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._stats["executed"] += 1
+                is_leader = True
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            # Each waiter gets its own copy so callers can mutate results freely
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    async def ado(self, key, coro_fn):
+        """
+        Async counterpart of `do`: `coro_fn` returns a coroutine, awaited once per key and loop.
+        The shared call belongs to no caller: cancelling any of them, the first included,
+        leaves it running for the others, and the key is released when it completes.
+        """
+        loop_key = (asyncio.get_running_loop(), key)
+        with self._lock:
+            self._stats["calls"] += 1
+            future = self._async_calls.get(loop_key)
+            if future is not None:
+                self._stats["coalesced"] += 1
+                is_leader = False
+            else:
+                future = asyncio.ensure_future(coro_fn())
+                self._async_calls[loop_key] = future
+                future.add_done_callback(lambda f: self._release_async(loop_key, f))
+                self._stats["executed"] += 1
+                is_leader = True
+
+        # shield() keeps one cancelled caller from cancelling the shared call
+        result = await asyncio.shield(future)
+        return result if is_leader else copy.deepcopy(result)
+
+    def _release_async(self, loop_key, future):
+        with self._lock:
+            if self._async_calls.get(loop_key) is future:
+                del self._async_calls[loop_key]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls) + len(self._async_calls)
+        # Every coalesced call is a Gemini request that was not issued
+        stats["saved_calls"] = stats["coalesced"]
+        return stats
+
+
+# --- Process-wide registry ---
+_registry = {}
+_registry_lock = threading.Lock()
+
+def get_single_flight(name):
+    """
+    Returns the process-wide SingleFlight group for `name`, so every tool instance
+    (agent, news monitor, each Streamlit session) coalesces against the same in-flight calls.
+    """
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = SingleFlight(name)
+        return _registry[name]
+
+def get_single_flight_metrics():
+    with _registry_lock:
+        groups = list(_registry.values())
+    return {group.name: group.stats() for group in groups}
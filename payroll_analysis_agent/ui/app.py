@@ -6,8 +6,7 @@ import pandas as pd
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from agents.payroll_agent.agent import PayrollAgent, load_config
-from agents.payroll_agent.prompts import CODI_REPORT_PROMPT
+from agents.payroll_agent.agent import PayrollAgent, load_profile
 
 st.set_page_config(
     page_title="Agente de Inteligencia Competitiva - Nómina y Admin. Personal",
@@ -25,8 +24,8 @@ with st.sidebar:
     st.header("Configuración")
     st.write("Competidores configurados:")
     try:
-        config_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'payroll_competitors.yaml')
-        config = load_config(config_path)
+        # Domain profile: competitors, analysis settings and prompts (config/profiles/)
+        config = load_profile(PayrollAgent.domain)
         for comp in config.get('competitors', []):
             st.text(f"- {comp['name']}")
     except Exception as e:
@@ -44,9 +43,9 @@ with tab5:
     st.header("⚙️ Configuración del Agente")
     st.markdown("Ajusta los **System Prompts** para cambiar el comportamiento del agente.")
     if 'db' not in st.session_state:
-        from services.db_service import DatabaseService
-        st.session_state.db = DatabaseService()
-    current_codi_prompt = st.session_state.db.get_prompt("CODI_REPORT_PROMPT", default_value=CODI_REPORT_PROMPT)
+        # The agent's database (the profile's db_path), where its runs and reports are stored
+        st.session_state.db = st.session_state.agent.db
+    current_codi_prompt = st.session_state.db.get_prompt("CODI_REPORT_PROMPT", default_value=st.session_state.agent.prompts["CODI_REPORT_PROMPT"])
     new_prompt = st.text_area("Prompt para Informe CODI (Estratégico)", value=current_codi_prompt, height=300)
     if st.button("Guardar Configuración"):
         st.session_state.db.save_prompt("CODI_REPORT_PROMPT", new_prompt)
@@ -55,8 +54,7 @@ with tab5:
 with tab6:
     st.header("📜 Historial de Informes")
     if 'db' not in st.session_state:
-        from services.db_service import DatabaseService
-        st.session_state.db = DatabaseService()
+        st.session_state.db = st.session_state.agent.db
     history = st.session_state.db.get_history(limit=10)
     if history:
         for record in history:
@@ -67,15 +65,25 @@ with tab6:
         st.info("No hay informes guardados aún.")
 
 with tab1:
-    if st.button("Ejecutar Análisis Completo", use_container_width=True):
+    # A run interrupted by a rerun or a crash (or with failed entities) keeps its finished ones (checkpoints)
+    unfinished = st.session_state.agent.db.get_unfinished_runs(limit=1)
+    resume_run = unfinished[0] if unfinished else None
+    resume = False
+    if resume_run:
+        st.warning(f"Análisis incompleto ({resume_run['run_id']}): {resume_run['done']}/{len(resume_run['targets'])} entidades completadas.")
+        resume = st.button("Reanudar Análisis Incompleto", use_container_width=True)
+    if st.button("Ejecutar Análisis Completo", use_container_width=True) or resume:
         st.info("Iniciando motor de análisis de nómina y admin. personal...")
         status_box = st.empty()
         def ui_callback(msg):
             status_box.text(f"🚀 {msg}")
         with st.spinner("Procesando datos en tiempo real..."):
             try:
-                extras = [extra_comp] if extra_comp else []
-                df = st.session_state.agent.run_analysis(extra_competitors=extras, status_callback=ui_callback)
+                if resume:
+                    df = st.session_state.agent.resume_analysis(run_id=resume_run['run_id'], status_callback=ui_callback)
+                else:
+                    extras = [extra_comp] if extra_comp else []
+                    df = st.session_state.agent.run_analysis(extra_competitors=extras, status_callback=ui_callback)
                 st.session_state.last_df = df
                 st.success("¡Análisis Estratégico Completado!")
                 status_box.empty()
@@ -99,11 +107,10 @@ with tab3:
     st.header("Informe Estratégico CODI - Nómina y Admin. Personal")
     if st.button("Generar Informe Ejecutivo", use_container_width=True):
         if 'last_df' in st.session_state:
-            with st.spinner("Redactando informe estratégico de nómina..."):
-                report = st.session_state.agent.generate_codi_report(st.session_state.last_df)
-                st.markdown("### 📑 Informe Estratégico (CODI + Gap Analysis Nómina)")
-                st.markdown(report)
-                st.download_button("Descargar Informe (MD)", report, file_name="Informe_CODI_Nomina.md")
+            st.markdown("### 📑 Informe Estratégico (CODI + Gap Analysis Nómina)")
+            # Rendered chunk by chunk as the model writes it; saved to the history when complete
+            report = st.write_stream(st.session_state.agent.generate_codi_report_stream(st.session_state.last_df))
+            st.download_button("Descargar Informe (MD)", report, file_name="Informe_CODI_Nomina.md")
         else:
             st.warning("Ejecuta primero el análisis para generar datos.")
 
@@ -128,6 +135,12 @@ if 'last_df' in st.session_state:
         vis_series = pd.to_numeric(st.session_state.last_df[st.session_state.last_df['Tipo'] == 'Competidor']['Visibilidad'], errors='coerce')
         avg_vis = vis_series.mean()
         st.metric("Visibilidad Media Competencia", f"{avg_vis:.1f}" if pd.notna(avg_vis) else "N/A")
+    if 'Polaridad' in st.session_state.last_df.columns:
+        own = st.session_state.last_df[st.session_state.last_df['Tipo'] == 'Propia']
+        if not own.empty and pd.notna(own['Polaridad'].iloc[0]):
+            delta = own['Tendencia_Polaridad'].iloc[0] if 'Tendencia_Polaridad' in own.columns else None
+            st.metric("Sentimiento Propio (-1 a 1)", f"{own['Polaridad'].iloc[0]:+.2f}",
+                      delta=f"{delta:+.2f} vs. análisis anterior" if pd.notna(delta) else None)
     st.dataframe(st.session_state.last_df, use_container_width=True)
     if 'Visibilidad' in st.session_state.last_df.columns:
         st.bar_chart(st.session_state.last_df.set_index('Entidad')['Visibilidad'])